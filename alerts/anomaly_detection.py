@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import warnings
 from scipy import stats
 
 class AnomalyDetector:
@@ -87,3 +88,162 @@ class AnomalyDetector:
                 "explanation": f"Value {latest['y']:.2f} is {diff_pct:.0%} from {lookback_weeks}-week avg {baseline:.2f}"
             }
         return None
+
+    def score_history(self, window=None, lookback_weeks=4):
+        """
+        Batch mode: score every row as if it were the latest one (see score_history below).
+        window=None uses all rows up to each date, like check_zscore does for the latest day.
+        """
+        return score_history(self.df, ['y'], window=window, lookback_weeks=lookback_weeks)
+
+
+# Batch mode: score every timestamp of one or many metrics at once.
+
+MAD_SCALE = 1.482602218505602  # 1 / Phi^-1(3/4), same as scipy's scale='normal'
+
+def _trailing_windows(values, window):
+    """(T, S, window) view of the `window` rows ending at each row, NaN-padded at the start."""
+    pad = np.full((window - 1, values.shape[1]), np.nan)
+    padded = np.vstack([pad, values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+
+def rolling_median_mad(values, window, min_periods=5, last=None):
+    """
+    Median and scaled MAD of the `window` observations ending at each row (inclusive), per column.
+    values: 2-D array (time, series). Rows with fewer than min_periods observations are NaN.
+    With `last`, only the final `last` rows are computed and returned.
+    """
+    windows = _trailing_windows(values, window)
+    if last is not None:
+        windows = windows[-last:]
+    counts = np.sum(~np.isnan(windows), axis=-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # all-NaN windows
+        median = np.nanmedian(windows, axis=-1)
+        mad = np.nanmedian(np.abs(windows - median[..., None]), axis=-1) * MAD_SCALE
+    short = counts < min_periods
+    median[short] = np.nan
+    mad[short] = np.nan
+    return median, mad
+
+def same_weekday_mean(values, weekdays, lookback_weeks=4, min_periods=2):
+    """
+    Mean of the previous `lookback_weeks` rows falling on the same weekday (excluding the row itself).
+    values: 2-D array (time, series); weekdays: 1-D array of 0..6 per row.
+    """
+    baseline = np.full(values.shape, np.nan)
+    for dow in range(7):
+        idx = np.flatnonzero(weekdays == dow)
+        if len(idx) < 2:
+            continue
+        # Shift by one so each row only sees earlier same-weekday rows
+        prior = np.vstack([np.full((1, values.shape[1]), np.nan), values[idx[:-1]]])
+        windows = _trailing_windows(prior, lookback_weeks)
+        counts = np.sum(~np.isnan(windows), axis=-1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            mean = np.nanmean(windows, axis=-1)
+        mean[counts < min_periods] = np.nan
+        baseline[idx] = mean
+    return baseline
+
+def score_history(df, metrics, window=60, lookback_weeks=4, min_periods=5, last=None):
+    """
+    Score every row of a wide frame (one 'ds' column plus one column per metric).
+
+    For each timestamp and metric this computes what check_zscore and check_dow_baseline would
+    report if that timestamp were the latest one and the detector saw the `window` rows ending
+    there. Returns a long frame with columns:
+    ds, metric, value, median, mad, z_score, dow_baseline, dow_deviation_pct, lookback_weeks.
+    window=None widens the window to all earlier rows. With `last`, only the final `last` rows
+    are scored (the earlier rows still feed their windows).
+    """
+    df = df.sort_values('ds').reset_index(drop=True)
+    window = window or max(len(df), 1)
+    values = df[list(metrics)].to_numpy(dtype=float)
+    weekdays = pd.to_datetime(df['ds']).dt.dayofweek.to_numpy()
+
+    median, mad = rolling_median_mad(values, window, min_periods, last)
+    baseline = same_weekday_mean(values, weekdays, lookback_weeks)
+    ds = df['ds'].to_numpy()
+    if last is not None:
+        values, baseline, ds = values[-last:], baseline[-last:], ds[-last:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z_score = (values - median) / mad
+        z_score = np.where(mad == 0, np.where(values == median, 0.0, np.inf), z_score)
+        dow_deviation = np.where(baseline == 0, np.nan, (values - baseline) / baseline)
+
+    n, k = values.shape
+    return pd.DataFrame({
+        'ds': np.repeat(ds, k),
+        'metric': np.tile(np.asarray(metrics, dtype=object), n),
+        'value': values.ravel(),
+        'median': median.ravel(),
+        'mad': mad.ravel(),
+        'z_score': z_score.ravel(),
+        'dow_baseline': baseline.ravel(),
+        'dow_deviation_pct': dow_deviation.ravel(),
+        'lookback_weeks': lookback_weeks,
+    })
+
+def flag_anomalies(scored, rules):
+    """
+    Apply alert_rules.yml style rules to a score_history frame. Returns one row per alert with the
+    same fields as the check_* results (date, method, actual, expected, deviation_pct, score,
+    severity, explanation) plus metric_name and grain, and series_key when `scored` has one.
+    A method's optional min_expected skips series whose expected value is below it (quiet zones).
+    The dow_baseline explanation quotes the lookback_weeks the scores were computed with.
+    Re-run it to replay threshold changes.
+    """
+    frames = []
+    for rule in rules:
+        rows = scored[scored['metric'] == rule['metric']]
+        for method_conf in rule['methods']:
+            if method_conf['name'] == 'z_score':
+                threshold = method_conf['threshold']
+                hits = rows[(np.abs(rows['z_score']) > threshold)
+                            & (rows['median'] >= method_conf.get('min_expected', -np.inf))]
+                expected = hits['median']
+                score = hits['z_score']
+                severity = np.where(np.abs(score) > threshold * 1.5, 'critical', 'warning')
+                explanation = [
+                    f"Value {a:.2f} differs from constant baseline {e:.2f}" if np.isinf(s)
+                    else f"Value {a:.2f} is {s:.2f} sigma from median {e:.2f}"
+                    for a, e, s in zip(hits['value'], expected, score)
+                ]
+            elif method_conf['name'] == 'dow_baseline':
+                threshold = method_conf.get('threshold_pct', 0.2)
+                hits = rows[(np.abs(rows['dow_deviation_pct']) > threshold)
+                            & (rows['dow_baseline'] >= method_conf.get('min_expected', -np.inf))]
+                expected = hits['dow_baseline']
+                score = hits['dow_deviation_pct']
+                severity = np.where(np.abs(score) > threshold * 2, 'critical', 'warning')
+                explanation = [
+                    f"Value {a:.2f} is {d:.0%} from {w}-week avg {e:.2f}"
+                    for a, e, d, w in zip(hits['value'], expected, score, hits['lookback_weeks'])
+                ]
+            else:
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deviation = np.where(expected != 0, (hits['value'] - expected) / expected, 0.0)
+            frames.append(pd.DataFrame({
+                'date': hits['ds'].to_numpy(),
+                'series_key': hits['series_key'].to_numpy() if 'series_key' in hits else None,
+                'metric_name': rule['metric'],
+                'grain': rule.get('grain', 'daily'),
+                'method': method_conf['name'],
+                'actual': hits['value'].to_numpy(),
+                'expected': expected.to_numpy(),
+                'deviation_pct': deviation,
+                'score': score.to_numpy(),
+                'severity': severity,
+                'explanation': explanation,
+            }))
+    columns = ['date', 'metric_name', 'grain', 'method', 'actual', 'expected', 'deviation_pct',
+               'score', 'severity', 'explanation']
+    if 'series_key' in scored:
+        columns.insert(1, 'series_key')
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    order = ['date', 'series_key', 'metric_name', 'method'] if 'series_key' in scored else ['date', 'metric_name', 'method']
+    return pd.concat(frames, ignore_index=True)[columns].sort_values(order, ignore_index=True)
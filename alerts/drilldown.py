@@ -0,0 +1,241 @@
+"""
+Multi-dimensional drill-down over the hourly zone/payment cube (fact_trips_cube).
+
+For an alert date the cube is compared with the average of the same weekday over the previous
+weeks, and the change is attributed to segments of zone, borough, payment type and pickup hour
+and to their combinations (e.g. JFK Airport x card x 17h). Combinations are expanded level by
+level like an apriori search: a segment is only looked at if every coarser segment it belongs to
+already explains at least `min_share` of the day's change, so the search stays small even though
+the full space is 265 zones x 6 payment types x 24 hours.
+"""
+import json
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from alerts.root_cause import driver_metric
+
+CUBE_TABLE = "dbt_dev_marts.fact_trips_cube"
+ZONE_TABLE = "dbt_dev_marts.dim_taxi_zone"
+
+DIMENSIONS = ["borough", "zone", "payment_type", "pickup_hour"]
+# Finer dimension -> the coarser one it determines. They are never combined, and a zone segment
+# counts as a sub-segment of its borough's segment.
+NESTED = {"zone": "borough"}
+MEASURES = {"total_trips": "trips", "total_revenue": "revenue"}
+
+DEFAULT_CONFIG = {
+    "dimensions": DIMENSIONS,
+    "max_depth": 3,
+    "baseline_weeks": 4,
+    "min_share": 0.05,   # of the day's total change, in the direction of the change
+    "min_delta": 10,     # absolute change, in units of the measure
+    "specificity": 0.9,  # drop a segment when one of its sub-segments explains this much of it
+    "top_n": 10,
+}
+
+def baseline_dates(alert_date, weeks):
+    alert_date = pd.Timestamp(alert_date)
+    return [(alert_date - pd.Timedelta(weeks=w)).date() for w in range(1, weeks + 1)]
+
+def load_cube(engine, alert_dates, baseline_weeks=DEFAULT_CONFIG["baseline_weeks"]):
+    """Cube rows for the alert dates and their baseline dates, in one query."""
+    dates = sorted({pd.Timestamp(d).date() for d in alert_dates}
+                   | {b for d in alert_dates for b in baseline_dates(d, baseline_weeks)})
+    query = f"""
+        SELECT
+            c.pickup_date,
+            c.pickup_hour,
+            coalesce(z.borough, 'Unknown') as borough,
+            coalesce(z.zone, 'Zone ' || c.pickup_location_id) as zone,
+            c.payment_type,
+            sum(c.trip_count) as trips,
+            sum(c.sum_total_amount) as revenue
+        FROM {CUBE_TABLE} c
+        LEFT JOIN {ZONE_TABLE} z ON c.pickup_location_id = z.location_id
+        WHERE c.pickup_date = ANY(CAST(:dates AS date[]))
+        GROUP BY 1, 2, 3, 4, 5
+    """
+    frame = pd.read_sql(text(query), engine, params={"dates": dates})
+    return DrillDownCube(frame)
+
+class DrillDownCube:
+    def __init__(self, frame):
+        """
+        frame: one row per (pickup_date, pickup_hour, zone, payment_type) with borough, and the
+        measures in MEASURES. Dimension values are encoded once; explain() only works on arrays.
+        """
+        frame = frame.reset_index(drop=True)
+        self.dates = pd.to_datetime(frame["pickup_date"]).dt.date.to_numpy()
+        self.codes, self.labels = {}, {}
+        for dim in DIMENSIONS:
+            self.codes[dim], self.labels[dim] = pd.factorize(frame[dim], sort=True)
+        self.measures = {m: frame[m].to_numpy(dtype=float) for m in set(MEASURES.values())}
+
+        # Cells: distinct (zone, payment_type, pickup_hour); borough follows from zone
+        cell_keys = np.ravel_multi_index(
+            [self.codes[d] for d in ("zone", "payment_type", "pickup_hour")],
+            [len(self.labels[d]) for d in ("zone", "payment_type", "pickup_hour")],
+        )
+        cells, self.cell_of_row = np.unique(cell_keys, return_inverse=True)
+        first_row = np.zeros(len(cells), dtype=np.int64)
+        first_row[self.cell_of_row[::-1]] = np.arange(len(frame))[::-1]
+        self.cell_codes = {dim: self.codes[dim][first_row] for dim in DIMENSIONS}
+        self.n_cells = len(cells)
+        # code of the coarser dimension for each code of the finer one
+        self.parent_codes = {}
+        for fine, coarse in NESTED.items():
+            self.parent_codes[fine] = np.zeros(len(self.labels[fine]), dtype=np.int64)
+            self.parent_codes[fine][self.codes[fine]] = self.codes[coarse]
+
+    def _cell_totals(self, mask, measure):
+        return np.bincount(self.cell_of_row[mask], weights=self.measures[measure][mask], minlength=self.n_cells)
+
+    def explain(self, alert_date, metric_name, config=None):
+        """
+        Ranked segments explaining the change on `alert_date` of the measure behind `metric_name`.
+        Each segment is a dict with dims ({dimension: value}), baseline, current, delta, share of
+        the day's total change, baseline_share (the segment's share of the baseline volume) and
+        lift = share / baseline_share.
+        """
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        measure = MEASURES[driver_metric(metric_name)]
+        alert_date = pd.Timestamp(alert_date).date()
+
+        present = set(self.dates)
+        base_days = [d for d in baseline_dates(alert_date, config["baseline_weeks"]) if d in present]
+        if alert_date not in present or not base_days:
+            return []
+        current = self._cell_totals(self.dates == alert_date, measure)
+        baseline = self._cell_totals(np.isin(self.dates, base_days), measure) / len(base_days)
+        delta = current - baseline
+        total_delta, total_baseline = delta.sum(), baseline.sum()
+        if total_delta == 0:
+            return []
+
+        dims = [d for d in DIMENSIONS if d in config["dimensions"]]
+        sizes = {d: len(self.labels[d]) for d in dims}
+        levels = {}  # dimension tuple -> arrays of the segments that passed the thresholds
+        for depth in range(1, config["max_depth"] + 1):
+            for dimset in combinations(dims, depth):
+                if any(fine in dimset and coarse in dimset for fine, coarse in NESTED.items()):
+                    continue
+                parents = [p for p in combinations(dimset, depth - 1) if p]
+                if any(p not in levels or len(levels[p]["key"]) == 0 for p in parents):
+                    continue
+
+                # Only cells inside promising parent segments are aggregated
+                mask = np.ones(self.n_cells, dtype=bool)
+                for parent in parents:
+                    mask &= np.isin(self._keys(parent, sizes), levels[parent]["key"])
+                if not mask.any():
+                    continue
+                keys = self._keys(dimset, sizes)[mask]
+                n_keys = int(np.prod([sizes[d] for d in dimset]))
+                seg_current = np.bincount(keys, weights=current[mask], minlength=n_keys)
+                seg_baseline = np.bincount(keys, weights=baseline[mask], minlength=n_keys)
+                seg_delta = seg_current - seg_baseline
+                share = seg_delta / total_delta
+                keep = (share >= config["min_share"]) & (np.abs(seg_delta) >= config["min_delta"])
+                keep &= np.bincount(keys, minlength=n_keys) > 0
+                kept = np.flatnonzero(keep)
+                levels[dimset] = {
+                    "key": kept,
+                    "current": seg_current[kept],
+                    "baseline": seg_baseline[kept],
+                    "delta": seg_delta[kept],
+                    "share": share[kept],
+                    "n_keys": n_keys,
+                }
+        redundant = self._explained_by_children(levels, sizes, config["specificity"])
+        return self._top_segments(levels, redundant, sizes, total_baseline, config["top_n"])
+
+    def _keys(self, dimset, sizes):
+        """Segment key of every cell for a tuple of dimensions."""
+        return np.ravel_multi_index([self.cell_codes[d] for d in dimset], [sizes[d] for d in dimset])
+
+    def _parent_projections(self, child, child_codes):
+        """(parent dimension tuple, parent segment codes) for each direct parent of a child segment set."""
+        codes = dict(zip(child, child_codes))
+        for d in child:
+            if len(child) > 1:
+                rest = tuple(x for x in child if x != d)
+                yield rest, [codes[x] for x in rest]
+            if d in NESTED and NESTED[d] in DIMENSIONS:
+                coarse = NESTED[d]
+                parent = tuple(x for x in DIMENSIONS if x == coarse or (x in child and x != d))
+                yield parent, [self.parent_codes[d][codes[d]] if x == coarse else codes[x] for x in parent]
+
+    def _explained_by_children(self, levels, sizes, specificity):
+        """
+        Per dimension tuple, which segments one of their direct sub-segments explains almost
+        entirely (child share >= specificity x parent share); the sub-segment is the sharper answer.
+        """
+        redundant = {dimset: np.zeros(len(level["key"]), dtype=bool) for dimset, level in levels.items()}
+        for child, child_level in levels.items():
+            if len(child_level["key"]) == 0:
+                continue
+            child_codes = np.unravel_index(child_level["key"], [sizes[d] for d in child])
+            for parent, parent_codes in self._parent_projections(child, child_codes):
+                if parent not in levels:
+                    continue
+                level = levels[parent]
+                best_child = np.full(level["n_keys"], -np.inf)
+                np.maximum.at(best_child, np.ravel_multi_index(parent_codes, [sizes[d] for d in parent]),
+                              child_level["share"])
+                with np.errstate(invalid='ignore'):
+                    redundant[parent] |= best_child[level["key"]] >= specificity * level["share"]
+        return redundant
+
+    def _top_segments(self, levels, redundant, sizes, total_baseline, top_n):
+        """Order the remaining segments by share of the change, coarser segments first on ties."""
+        dimsets = list(levels)
+        if not dimsets:
+            return []
+        positions = [np.flatnonzero(~redundant[d]) for d in dimsets]
+        which = np.concatenate([np.full(len(idx), i) for i, idx in enumerate(positions)])
+        pos = np.concatenate(positions)
+        share = np.concatenate([levels[d]["share"][idx] for d, idx in zip(dimsets, positions)])
+        depth = np.concatenate([np.full(len(idx), len(d)) for d, idx in zip(dimsets, positions)])
+        order = np.lexsort((pos, which, depth, -share))[:top_n]
+
+        segments = []
+        for rank, o in enumerate(order, start=1):
+            dimset, j = dimsets[which[o]], pos[o]
+            level = levels[dimset]
+            codes = np.unravel_index(level["key"][j], [sizes[d] for d in dimset])
+            base_share = level["baseline"][j] / total_baseline if total_baseline else np.nan
+            segments.append({
+                "dims": {d: _plain(self.labels[d][codes[k]]) for k, d in enumerate(dimset)},
+                "baseline": float(level["baseline"][j]),
+                "current": float(level["current"][j]),
+                "delta": float(level["delta"][j]),
+                "share": float(level["share"][j]),
+                "baseline_share": float(base_share),
+                "lift": float(level["share"][j] / base_share) if base_share else float("inf"),
+                "rank": rank,
+            })
+        return segments
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def drilldown_drivers(cube, alerts, config=None):
+    """kpi_alert_drivers records for a run's alerts; the contribution is the share of the day's change."""
+    drivers = []
+    for alert in alerts:
+        if alert['grain'] != 'daily':
+            continue
+        for segment in cube.explain(alert['alert_date'], alert['metric_name'], config):
+            drivers.append({
+                "alert_id": alert['alert_id'],
+                "dimension": " x ".join(segment["dims"]),
+                "segment_value": " / ".join(str(v) for v in segment["dims"].values()),
+                "baseline_value": segment["baseline"],
+                "current_value": segment["current"],
+                "delta": segment["delta"],
+                "contribution_pct": segment["share"],
+                "rank": segment["rank"],
+                "details_json": json.dumps({k: segment[k] for k in ("dims", "baseline_share", "lift")}, default=str),
+            })
+    return drivers
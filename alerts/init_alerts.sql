@@ -2,7 +2,8 @@ CREATE TABLE IF NOT EXISTS kpi_alerts (
     alert_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     alert_date DATE NOT NULL,
     metric_name VARCHAR(100) NOT NULL,
-    grain VARCHAR(50) NOT NULL, -- daily, hourly
+    grain VARCHAR(50) NOT NULL, -- daily, hourly, zone_daily, zone_hourly
+    series_key VARCHAR(100), -- e.g. zone=132|hour=17; NULL for the daily grain
     metric_value NUMERIC,
     expected_value NUMERIC,
     deviation_pct NUMERIC,
@@ -12,4 +13,6 @@ CREATE TABLE IF NOT EXISTS kpi_alerts (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+ALTER TABLE kpi_alerts ADD COLUMN IF NOT EXISTS series_key VARCHAR(100);
+
 CREATE INDEX IF NOT EXISTS idx_kpi_alerts_date ON kpi_alerts(alert_date);
@@ -0,0 +1,10 @@
+CREATE SCHEMA IF NOT EXISTS quality;
+
+CREATE TABLE IF NOT EXISTS quality.detector_state (
+    metric_name VARCHAR(100) NOT NULL,
+    grain VARCHAR(50) NOT NULL, -- daily, hourly
+    watermark TIMESTAMP NOT NULL, -- newest row folded into the state
+    state JSONB NOT NULL, -- OnlineDetector.to_dict()
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (metric_name, grain)
+);
@@ -0,0 +1,268 @@
+"""
+Incremental version of the batch scores in anomaly_detection.score_history.
+
+Each metric keeps a small detector state: the last `window` values in arrival order, the same
+values in an indexable skiplist (O(log n) insert, delete and k-th smallest, so the median is
+O(log n) and the MAD O(log^2 n)), and one ring buffer per weekday for the same-weekday baseline.
+States are saved in quality.detector_state with a watermark, and each run only feeds rows newer
+than the watermark, instead of re-reading and re-scoring the whole window.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from collections import deque
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from alerts.anomaly_detection import MAD_SCALE, score_history
+
+INIT_SQL = os.path.join(os.path.dirname(__file__), "init_detector_state.sql")
+STATE_TABLE = "quality.detector_state"
+
+class IndexableSkiplist:
+    """Sorted multiset with O(log n) insert, remove and access by rank (widths on every link)."""
+
+    def __init__(self, expected_size=100):
+        self.max_levels = max(1, int(1 + math.log(expected_size, 2)))
+        self.head = [math.inf, [None] * self.max_levels, [1] * self.max_levels]  # value, next, width
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        node = self.head
+        i += 1
+        for level in reversed(range(self.max_levels)):
+            while node[1][level] is not None and node[2][level] <= i:
+                i -= node[2][level]
+                node = node[1][level]
+        return node[0]
+
+    def insert(self, value):
+        chain, steps_at_level = [None] * self.max_levels, [0] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node[1][level] is not None and node[1][level][0] <= value:
+                steps_at_level[level] += node[2][level]
+                node = node[1][level]
+            chain[level] = node
+        d = min(self.max_levels, 1 - int(math.log(random.random(), 2.0)))
+        new_node = [value, [None] * d, [0] * d]
+        steps = 0
+        for level in range(d):
+            prev = chain[level]
+            new_node[1][level] = prev[1][level]
+            prev[1][level] = new_node
+            new_node[2][level] = prev[2][level] - steps
+            prev[2][level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(d, self.max_levels):
+            chain[level][2][level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.max_levels
+        node = self.head
+        for level in reversed(range(self.max_levels)):
+            while node[1][level] is not None and node[1][level][0] < value:
+                node = node[1][level]
+            chain[level] = node
+        target = chain[0][1][0]
+        if target is None or target[0] != value:
+            raise KeyError(f"{value} not in skiplist")
+        for level in range(len(target[1])):
+            prev = chain[level]
+            prev[2][level] += target[2][level] - 1
+            prev[1][level] = target[1][level]
+        for level in range(len(target[1]), self.max_levels):
+            chain[level][2][level] -= 1
+        self.size -= 1
+
+def _kth_of_two(a, len_a, b, len_b, k):
+    """k-th smallest (0-based) of two ascending sequences given as index functions, O(log) accesses."""
+    # Binary search for i: how many of the k + 1 smallest come from `a`
+    lo, hi = max(0, k + 1 - len_b), min(k + 1, len_a)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if a(i) < b(k - i):
+            lo = i + 1
+        else:
+            hi = i
+    from_a = a(lo - 1) if lo > 0 else -math.inf
+    from_b = b(k - lo) if k - lo >= 0 else -math.inf
+    return max(from_a, from_b)
+
+class RollingMedianMAD:
+    """Median and scaled MAD of the non-missing values among the last `window` rows."""
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque()
+        self.sorted = IndexableSkiplist(window)
+        for value in values:
+            self.push(value)
+
+    def push(self, value):
+        """Add the next row; a missing value (None/NaN) still takes up a row of the window."""
+        value = math.nan if value is None else float(value)
+        self.values.append(value)
+        if not math.isnan(value):
+            self.sorted.insert(value)
+        if len(self.values) > self.window:
+            dropped = self.values.popleft()
+            if not math.isnan(dropped):
+                self.sorted.remove(dropped)
+
+    def __len__(self):
+        """Number of non-missing values in the window."""
+        return len(self.sorted)
+
+    def median(self):
+        n = len(self.sorted)
+        mid = n // 2
+        return self.sorted[mid] if n % 2 else (self.sorted[mid - 1] + self.sorted[mid]) / 2
+
+    def mad(self):
+        """Median of |x - median| without materialising the deviations (two sorted halves)."""
+        n = len(self.sorted)
+        m = self.median()
+        split = n // 2  # sorted[:split] <= m <= sorted[split:]
+        left = lambda i: m - self.sorted[split - 1 - i]  # ascending in i
+        right = lambda j: self.sorted[split + j] - m     # ascending in j
+        kth = lambda k: _kth_of_two(left, split, right, n - split, k)
+        mid = n // 2
+        mad = kth(mid) if n % 2 else (kth(mid - 1) + kth(mid)) / 2
+        return mad * MAD_SCALE
+
+class OnlineDetector:
+    """Streaming equivalent of score_history for one metric."""
+
+    def __init__(self, window=60, lookback_weeks=4, min_periods=5):
+        self.window = window
+        self.lookback_weeks = lookback_weeks
+        self.min_periods = min_periods
+        self.rolling = RollingMedianMAD(window)
+        self.same_weekday = {dow: deque(maxlen=lookback_weeks) for dow in range(7)}
+        self.watermark = None
+
+    def update(self, ds, y):
+        """Add one row newer than the watermark and return its scores (score_history columns)."""
+        ds = pd.Timestamp(ds)
+        if self.watermark is not None and ds <= self.watermark:
+            raise ValueError(f"{ds} is not newer than the watermark {self.watermark}")
+        y = float(y) if y is not None and not pd.isna(y) else math.nan
+
+        self.rolling.push(y)
+        median = mad = z_score = math.nan
+        if len(self.rolling) >= self.min_periods:
+            median, mad = self.rolling.median(), self.rolling.mad()
+            if mad == 0:
+                z_score = 0.0 if y == median else math.inf
+            else:
+                z_score = (y - median) / mad
+
+        prior = [v for v in self.same_weekday[ds.dayofweek] if not math.isnan(v)]
+        baseline = sum(prior) / len(prior) if len(prior) >= 2 else math.nan
+        deviation = (y - baseline) / baseline if baseline and not math.isnan(baseline) else math.nan
+        self.same_weekday[ds.dayofweek].append(y)
+
+        self.watermark = ds
+        return {"ds": ds, "value": y, "median": median, "mad": mad, "z_score": z_score,
+                "dow_baseline": baseline, "dow_deviation_pct": deviation, "lookback_weeks": self.lookback_weeks}
+
+    def advance(self, frame, column='y'):
+        """Feed the rows of `frame` ('ds' + column) newer than the watermark; returns their scores."""
+        rows = frame.sort_values('ds')
+        if self.watermark is not None:
+            rows = rows[pd.to_datetime(rows['ds']) > self.watermark]
+        return [self.update(ds, y) for ds, y in zip(rows['ds'], rows[column])]
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "lookback_weeks": self.lookback_weeks,
+            "min_periods": self.min_periods,
+            "values": [None if math.isnan(v) else v for v in self.rolling.values],
+            "same_weekday": {str(dow): [None if math.isnan(v) else v for v in buf] for dow, buf in self.same_weekday.items()},
+            "watermark": self.watermark.isoformat() if self.watermark is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        detector = cls(state["window"], state["lookback_weeks"], state["min_periods"])
+        detector.rolling = RollingMedianMAD(state["window"], state["values"])
+        for dow, values in state["same_weekday"].items():
+            detector.same_weekday[int(dow)].extend(math.nan if v is None else v for v in values)
+        detector.watermark = pd.Timestamp(state["watermark"]) if state["watermark"] else None
+        return detector
+
+def load_states(engine, metrics, grain="daily"):
+    """metric -> OnlineDetector for the metrics that have a saved state."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(open(INIT_SQL).read())
+        rows = conn.execute(
+            text(f"SELECT metric_name, state FROM {STATE_TABLE} WHERE grain = :grain AND metric_name = ANY(:metrics)"),
+            {"grain": grain, "metrics": list(metrics)},
+        ).fetchall()
+    return {r.metric_name: OnlineDetector.from_dict(r.state) for r in rows}
+
+def save_states(cursor, detectors, grain="daily"):
+    """Upsert detector states with a DB-API cursor (so they commit together with the alerts)."""
+    cursor.execute(open(INIT_SQL).read())
+    for metric, detector in detectors.items():
+        cursor.execute(
+            f"""
+            INSERT INTO {STATE_TABLE} (metric_name, grain, watermark, state, updated_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON CONFLICT (metric_name, grain) DO UPDATE
+            SET watermark = EXCLUDED.watermark, state = EXCLUDED.state, updated_at = NOW()
+            """,
+            (metric, grain, detector.watermark.to_pydatetime(), json.dumps(detector.to_dict())),
+        )
+
+def consistency_check(history, metrics, window=60, lookback_weeks=4, atol=1e-9):
+    """
+    Stream `history` (wide frame: ds + metrics) through fresh OnlineDetectors and compare every
+    score with score_history. Returns the largest absolute difference per score column.
+    """
+    batch = score_history(history, metrics, window=window, lookback_weeks=lookback_weeks)
+    online = []
+    for metric in metrics:
+        detector = OnlineDetector(window, lookback_weeks)
+        for row in detector.advance(history, column=metric):
+            online.append({**row, "metric": metric})
+    online = pd.DataFrame(online)
+    merged = batch.assign(ds=pd.to_datetime(batch['ds'])).merge(online, on=['ds', 'metric'], suffixes=('_batch', '_online'))
+    diffs = {}
+    for col in ['median', 'mad', 'z_score', 'dow_baseline', 'dow_deviation_pct']:
+        a, b = merged[f'{col}_batch'].to_numpy(float), merged[f'{col}_online'].to_numpy(float)
+        same = (np.isnan(a) & np.isnan(b)) | (a == b)
+        with np.errstate(invalid='ignore'):
+            gap = np.nan_to_num(np.abs(a - b), nan=np.inf)
+        diffs[col] = float(np.max(np.where(same, 0.0, gap), initial=0.0))
+    return diffs
+
+def main():
+    from alerts.alert_runner import DB_URL, fetch_daily_metrics, load_config
+
+    parser = argparse.ArgumentParser(description="Check that the online detector matches the batch scores")
+    parser.add_argument("--days", type=int, default=365, help="History to replay")
+    parser.add_argument("--window", type=int, default=60, help="Rolling window (rows)")
+    args = parser.parse_args()
+
+    metrics = sorted({rule['metric'] for rule in load_config()['rules'] if rule['grain'] == 'daily'})
+    history = fetch_daily_metrics(create_engine(DB_URL), metrics, days=args.days)
+    diffs = consistency_check(history, metrics, window=args.window)
+    for col, diff in diffs.items():
+        print(f"{col:>18}: max |online - batch| = {diff:.3g}")
+    if max(diffs.values()) > 1e-6:
+        print("❌ Online scores differ from the batch scores.")
+        sys.exit(1)
+    print(f"✅ Online detector matches score_history over {len(history)} days x {len(metrics)} metrics.")
+
+if __name__ == "__main__":
+    main()
@@ -1,115 +1,166 @@
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 
+# Breakdowns checked for every daily alert
+DIMENSIONS = [
+    {
+        "dimension_table": "dbt_dev_marts.mart_kpis_by_zone_daily",
+        "join_dim": "dbt_dev_marts.dim_taxi_zone",
+        "join_key": "location_id",
+        "fact_key": "pickup_location_id",
+        "dim_name_col": "zone",
+    },
+    {
+        "dimension_table": "dbt_dev_marts.mart_kpis_by_payment_daily",
+        "join_dim": None,
+        "join_key": None,
+        "fact_key": "payment_type",
+        "dim_name_col": "payment_type",
+    },
+]
+METRIC_COLS = ["total_trips", "total_revenue"]
+TOP_N = 3
+MIN_DELTA = 10
+
+def driver_metric(metric_name):
+    """Segment metric that explains an alert on `metric_name`."""
+    return "total_trips" if "trips" in metric_name else "total_revenue"
+
+def rank_drivers(alerts, segments, dimension):
+    """
+    Top drivers per alert from per-segment baselines.
+
+    alerts: frame with alert_id, alert_date, metric_name, metric_value, expected_value.
+    segments: frame with alert_date, segment_id, segment_name and baseline_<m> / current_<m> for
+    each of METRIC_COLS (missing segments already filled with 0).
+    Per alert, the TOP_N segments by |delta| are kept, those with |delta| < MIN_DELTA dropped, and
+    rank is the position within the top N (so ranks can skip after a dropped segment). Alerts are
+    told apart by position, so alerts without an alert_id are ranked too.
+    """
+    frames = []
+    alerts = alerts.assign(alert_index=np.arange(len(alerts)), metric_col=alerts['metric_name'].map(driver_metric))
+    for metric_col, group in alerts.groupby('metric_col'):
+        merged = group.merge(segments, on='alert_date')
+        if merged.empty:
+            continue
+        merged['baseline_value'] = merged[f'baseline_{metric_col}'].astype(float)
+        merged['current_value'] = merged[f'current_{metric_col}'].astype(float)
+        merged['delta'] = merged['current_value'] - merged['baseline_value']
+        merged['abs_delta'] = merged['delta'].abs()
+        merged = merged.sort_values(['alert_index', 'abs_delta', 'segment_id'], ascending=[True, False, True], kind='stable')
+        merged['rank'] = merged.groupby('alert_index', sort=False).cumcount() + 1
+        merged = merged[(merged['rank'] <= TOP_N) & (merged['abs_delta'] >= MIN_DELTA)]
+        total_gap = (merged['metric_value'].astype(float) - merged['expected_value'].astype(float)).abs()
+        merged['contribution_pct'] = np.where(total_gap > 0, merged['abs_delta'] / total_gap.where(total_gap > 0, 1), 0.0)
+        frames.append(merged)
+    if not frames:
+        return []
+    drivers = pd.concat(frames)
+    return [{
+        "alert_id": row.alert_id,
+        "dimension": dimension,
+        "segment_value": str(row.segment_name),
+        "baseline_value": float(row.baseline_value),
+        "current_value": float(row.current_value),
+        "delta": float(row.delta),
+        "contribution_pct": float(row.contribution_pct),
+        "rank": int(row.rank),
+    } for row in drivers.itertuples(index=False)]
+
 class RootCauseAnalyzer:
     def __init__(self, engine):
         self.engine = engine
-        
+
     def analyze(self, alert):
         """
         alert: dict with keys [alert_id, metric_name, alert_date, grain]
         """
-        drivers = []
-        
+        return self.analyze_batch([alert])
+
+    def analyze_batch(self, alerts):
+        """
+        Drivers for all of a run's alerts: one query per dimension covering every alert date,
+        ranked per alert in pandas. Same output as calling analyze() per alert.
+        """
         # Only support Daily for now
-        if alert['grain'] != 'daily':
+        alerts = [a for a in alerts if a['grain'] == 'daily']
+        if not alerts:
             return []
-            
-        print(f"🔎 Investigating drivers for {alert['metric_name']} on {alert['alert_date']}...")
-        
-        # 1. Zone Breakdown
-        zone_drivers = self._analyze_dimension(
-            alert, 
-            dimension_table="dbt_dev_marts.mart_kpis_by_zone_daily",
-            join_dim="dbt_dev_marts.dim_taxi_zone",
-            join_key="location_id",
-            fact_key="pickup_location_id",
-            dim_name_col="zone",
-            metric_col="total_trips" if "trips" in alert['metric_name'] else "total_revenue" 
-        )
-        drivers.extend(zone_drivers)
 
-        # 2. Payment Breakdown
-        payment_drivers = self._analyze_dimension(
-            alert,
-            dimension_table="dbt_dev_marts.mart_kpis_by_payment_daily",
-            join_dim=None,
-            join_key=None,
-            fact_key="payment_type",
-            dim_name_col="payment_type",
-            metric_col="total_trips" if "trips" in alert['metric_name'] else "total_revenue"
-        )
-        drivers.extend(payment_drivers)
-        
+        alert_df = pd.DataFrame({
+            "alert_id": [a.get('alert_id') for a in alerts],
+            "alert_date": pd.to_datetime([a['alert_date'] for a in alerts]).date,
+            "metric_name": [a['metric_name'] for a in alerts],
+            "metric_value": [a.get('metric_value', 0) for a in alerts],
+            "expected_value": [a.get('expected_value', 0) for a in alerts],
+        })
+        dates = sorted(set(alert_df['alert_date']))
+        print(f"🔎 Investigating drivers for {len(alerts)} alert(s) on {len(dates)} date(s)...")
+
+        drivers = []
+        for dimension in DIMENSIONS:
+            segments = self._segment_baselines(dates, **dimension)
+            if segments is not None:
+                drivers.extend(rank_drivers(alert_df, segments, dimension['dim_name_col']))
         return drivers
 
-    def _analyze_dimension(self, alert, dimension_table, join_dim, join_key, fact_key, dim_name_col, metric_col):
-        # Compare Alert Date vs Avg of Prev 4 same-weekdays
-        # Simple query to get delta per segment
-        
-        date_str = str(alert['alert_date'])
-        
+    def _segment_baselines(self, dates, dimension_table, join_dim, join_key, fact_key, dim_name_col):
+        """
+        Per (alert date, segment): current value and the average of the previous 4 same-weekdays
+        (28 days) for each of METRIC_COLS, for all dates in one query.
+        """
+        baseline_cols = ",\n                ".join(f"avg(f.{m}) as baseline_{m}" for m in METRIC_COLS)
+        current_cols = ",\n                ".join(f"f.{m} as current_{m}" for m in METRIC_COLS)
+        output_cols = ",\n            ".join(
+            f"coalesce(b.baseline_{m}, 0) as baseline_{m}, coalesce(c.current_{m}, 0) as current_{m}"
+            for m in METRIC_COLS
+        )
+        if join_dim:
+            segment_name = f"coalesce(d.{dim_name_col}, cast(coalesce(b.segment_id, c.segment_id) as varchar))"
+            join_clause = f"LEFT JOIN {join_dim} d ON coalesce(b.segment_id, c.segment_id) = d.{join_key}"
+        else:
+            segment_name = "cast(coalesce(b.segment_id, c.segment_id) as varchar)"
+            join_clause = ""
+
         query = f"""
-        WITH baseline AS (
-            SELECT 
-                {fact_key} as segment_id,
-                avg({metric_col}) as baseline_val
-            FROM {dimension_table}
-            WHERE pickup_date < '{date_str}'::date 
-              AND pickup_date >= '{date_str}'::date - INTERVAL '28 days'
-              AND extract(dow from pickup_date) = extract(dow from '{date_str}'::date)
-            GROUP BY 1
+        WITH alert_dates AS (
+            SELECT unnest(CAST(:dates AS date[])) as alert_date
+        ),
+        baseline AS (
+            SELECT
+                a.alert_date,
+                f.{fact_key} as segment_id,
+                {baseline_cols}
+            FROM alert_dates a
+            JOIN {dimension_table} f
+              ON f.pickup_date < a.alert_date
+             AND f.pickup_date >= a.alert_date - 28
+             AND extract(dow from f.pickup_date) = extract(dow from a.alert_date)
+            GROUP BY 1, 2
         ),
         current_day AS (
-            SELECT 
-                {fact_key} as segment_id,
-                {metric_col} as current_val
-            FROM {dimension_table}
-            WHERE pickup_date = '{date_str}'::date
+            SELECT
+                a.alert_date,
+                f.{fact_key} as segment_id,
+                {current_cols}
+            FROM alert_dates a
+            JOIN {dimension_table} f ON f.pickup_date = a.alert_date
         )
-        SELECT 
+        SELECT
+            coalesce(b.alert_date, c.alert_date) as alert_date,
             coalesce(b.segment_id, c.segment_id) as segment_id,
-            cast(coalesce(PLACEHOLDER_SEGMENT_NAME, cast(coalesce(b.segment_id, c.segment_id) as varchar)) as varchar) as segment_name,
-            coalesce(b.baseline_val, 0) as baseline,
-            coalesce(c.current_val, 0) as current,
-            coalesce(c.current_val, 0) - coalesce(b.baseline_val, 0) as delta
+            cast({segment_name} as varchar) as segment_name,
+            {output_cols}
         FROM baseline b
-        FULL OUTER JOIN current_day c ON b.segment_id = c.segment_id
+        FULL OUTER JOIN current_day c ON b.alert_date = c.alert_date AND b.segment_id = c.segment_id
+        {join_clause}
         """
-        
-        if join_dim:
-             segment_name_expresssion = f"d.{dim_name_col}"
-             query += f" LEFT JOIN {join_dim} d ON coalesce(b.segment_id, c.segment_id) = d.{join_key}"
-        else:
-             segment_name_expresssion = "cast(coalesce(b.segment_id, c.segment_id) as varchar)"
-             # Mock join not needed if we don't select from d, but let's keep it simple
-             
-        query = query.replace("PLACEHOLDER_SEGMENT_NAME", segment_name_expresssion)
 
-        query += " ORDER BY abs(coalesce(c.current_val, 0) - coalesce(b.baseline_val, 0)) DESC LIMIT 3"
-        
         try:
-            df = pd.read_sql(query, self.engine)
-            results = []
-            for idx, row in df.iterrows():
-                # Avoid noise
-                if abs(row['delta']) < 10: 
-                    continue
-                    
-                total_gap = abs(alert.get('metric_value', 0) - alert.get('expected_value', 0))
-                contrib = abs(row['delta']) / total_gap if total_gap > 0 else 0
-                
-                results.append({
-                    "alert_id": alert.get('alert_id'), # Might be None if not yet persisted, handled by runner
-                    "dimension": dim_name_col,
-                    "segment_value": str(row['segment_name']),
-                    "baseline_value": float(row['baseline']),
-                    "current_value": float(row['current']),
-                    "delta": float(row['delta']),
-                    "contribution_pct": contrib,
-                    "rank": idx + 1
-                })
-            return results
+            segments = pd.read_sql(text(query), self.engine, params={"dates": dates})
+            segments['alert_date'] = pd.to_datetime(segments['alert_date']).dt.date
+            return segments
         except Exception as e:
             print(f"❌ Error analyzing dimension {dimension_table}: {e}")
-            return []
+            return None
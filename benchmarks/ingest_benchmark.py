@@ -0,0 +1,217 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import pyarrow
+from sqlalchemy import create_engine, text
+
+from benchmarks.synthetic_tlc import generate_month
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "scripts"
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+DATA_DIR = "data/bench"
+
+# Same connection settings as the loader; runs go to a dedicated database so
+# benchmarks never touch the analytics raw schema
+DB_USER = os.getenv("POSTGRES_USER", "admin")
+DB_PASS = os.getenv("POSTGRES_PASSWORD", "adminparams")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+DB_NAME = os.getenv("POSTGRES_DB", "analytics")
+BENCH_DB = os.getenv("BENCH_POSTGRES_DB", "analytics_bench")
+TABLE = "yellow_trips"
+
+# Strategy -> load_files() arguments. "lake" loads LakeMonth sources instead of the monthly files.
+STRATEGIES = {
+    "to_sql": {"method": "to_sql", "workers": 1},
+    "copy": {"method": "copy", "workers": 1},
+    "copy_parallel": {"method": "copy", "workers": None},
+    "copy_lake": {"method": "copy", "workers": None, "lake": True},
+}
+DEFAULT_STRATEGIES = ["copy", "copy_parallel", "copy_lake"]
+
+def db_url(database):
+    return f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{database}"
+
+def ensure_bench_db():
+    engine = create_engine(db_url(DB_NAME), isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :db"), {"db": BENCH_DB}).scalar()
+        if not exists:
+            conn.execute(text(f'CREATE DATABASE "{BENCH_DB}"'))
+    engine.dispose()
+
+def reset_raw_schema(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS raw CASCADE"))
+        conn.execute(text("CREATE SCHEMA raw"))
+
+def table_bytes(engine):
+    """Total size (heap, TOAST, indexes) of raw.yellow_trips and its partitions, if partitioned."""
+    with engine.connect() as conn:
+        return int(conn.execute(text(
+            f"SELECT coalesce(sum(pg_total_relation_size(relid)), pg_total_relation_size('raw.{TABLE}')) "
+            f"FROM pg_partition_tree('raw.{TABLE}')"
+        )).scalar())
+
+def prepare_files(months, rows, seed, data_dir=DATA_DIR):
+    """Generate (or reuse) one synthetic file per month; files are keyed by size and seed."""
+    paths = []
+    for offset, month in enumerate(months):
+        path = os.path.join(data_dir, f"rows{rows}_seed{seed}", f"yellow_tripdata_{month}.parquet")
+        if not os.path.exists(path):
+            print(f"Generating {rows:,} synthetic trips for {month}...")
+            generate_month(path, rows, month, seed=seed + offset)
+        paths.append(path)
+    return paths
+
+def prepare_lake(files, lake_dir):
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from parquet_lake import build_month
+    for path in files:
+        build_month(path, lake_dir)
+
+def peak_rss_mb():
+    """Peak RSS of this process and its (pool worker) children, in MiB."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, child_rss) * scale / (1024 * 1024)
+
+def _run_strategy(strategy, files, lake_dir, queue):
+    """Child process entry point: load with one strategy and report timing and peak memory."""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from load_parquet_to_postgres import load_files
+    from parquet_lake import LakeMonth, month_from_path
+
+    options = STRATEGIES[strategy]
+    sources = files
+    if options.get("lake"):
+        sources = [LakeMonth(lake_dir, month_from_path(f), "yellow") for f in files]
+    start = time.perf_counter()
+    rows = load_files(sources, TABLE, workers=options["workers"], method=options["method"], force=True)
+    queue.put({"rows": rows, "seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()})
+
+def run_strategy(strategy, files, lake_dir):
+    """
+    Run one strategy in a fresh interpreter pointed at the benchmark database, so module
+    state, caches and peak RSS do not leak between strategies.
+    """
+    os.environ["POSTGRES_DB"] = BENCH_DB
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_strategy, args=(strategy, files, lake_dir, queue))
+        proc.start()
+        proc.join()
+    finally:
+        os.environ["POSTGRES_DB"] = DB_NAME
+    if proc.exitcode != 0:
+        raise RuntimeError(f"{strategy} failed with exit code {proc.exitcode}")
+    return queue.get()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results, baseline_path):
+    """Print rows/s and peak RSS changes against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {r["strategy"]: r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}:")
+    for r in results:
+        old = baseline.get(r["strategy"])
+        if not old:
+            continue
+        speed = (r["rows_per_s"] / old["rows_per_s"] - 1) * 100
+        rss = (r["peak_rss_mb"] / old["peak_rss_mb"] - 1) * 100
+        flag = "⚠️" if speed < -10 else "  "
+        print(f"{flag} {r['strategy']:<14} rows/s {speed:+6.1f}%   peak RSS {rss:+6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the load_parquet_to_postgres strategies on synthetic TLC data")
+    parser.add_argument("--rows", type=int, default=500_000, help="Synthetic rows per month")
+    parser.add_argument("--months", type=str, default="2024-01,2024-02", help="Comma-separated YYYY-MM")
+    parser.add_argument("--strategies", type=str, default=",".join(DEFAULT_STRATEGIES),
+                        help=f"Comma-separated, from {list(STRATEGIES)}")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per strategy (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--output", type=str, default=None, help="Results JSON path")
+    parser.add_argument("--baseline", type=str, default=None, help="Previous results JSON to compare against")
+
+    args = parser.parse_args()
+
+    months = [m.strip() for m in args.months.split(",")]
+    strategies = [s.strip() for s in args.strategies.split(",")]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        print(f"❌ Unknown strategies {unknown}; choose from {list(STRATEGIES)}")
+        sys.exit(1)
+
+    files = prepare_files(months, args.rows, args.seed)
+    lake_dir = os.path.join(os.path.dirname(files[0]), "lake")
+    if any(STRATEGIES[s].get("lake") for s in strategies):
+        prepare_lake(files, lake_dir)
+
+    ensure_bench_db()
+    engine = create_engine(db_url(BENCH_DB))
+
+    results = []
+    for strategy in strategies:
+        runs = []
+        for _ in range(args.repeat):
+            reset_raw_schema(engine)
+            run = run_strategy(strategy, files, lake_dir)
+            run["table_bytes"] = table_bytes(engine)
+            runs.append(run)
+        best = min(runs, key=lambda r: r["seconds"])
+        result = {
+            "strategy": strategy,
+            "rows": best["rows"],
+            "files": len(files),
+            "seconds": round(best["seconds"], 3),
+            "rows_per_s": round(best["rows"] / best["seconds"]),
+            "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+            "table_bytes": best["table_bytes"],
+            "bytes_per_row": round(best["table_bytes"] / best["rows"], 1) if best["rows"] else None,
+        }
+        results.append(result)
+        print(f"📊 {strategy:<14} {result['rows_per_s']:>9,} rows/s  peak RSS {result['peak_rss_mb']:,.0f} MiB  "
+              f"table {result['table_bytes'] / 1024 / 1024:,.0f} MiB ({result['bytes_per_row']} B/row)")
+    engine.dispose()
+
+    report = {
+        "benchmark": "ingest",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": {"rows_per_month": args.rows, "months": months, "seed": args.seed, "repeat": args.repeat},
+        "host": {
+            "cpus": os.cpu_count(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "pyarrow": pyarrow.__version__,
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"ingest-{report['created_at'][:19].replace(':', '')}-{report['git_commit'] or 'nogit'}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
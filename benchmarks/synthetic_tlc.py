@@ -0,0 +1,152 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Column layout of the 2024 TLC yellow trip files
+TLC_YELLOW_SCHEMA = pa.schema([
+    ("VendorID", pa.int32()),
+    ("tpep_pickup_datetime", pa.timestamp("us")),
+    ("tpep_dropoff_datetime", pa.timestamp("us")),
+    ("passenger_count", pa.int64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.int64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.int32()),
+    ("DOLocationID", pa.int32()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+    ("Airport_fee", pa.float64()),
+])
+
+NUM_ZONES = 265
+# Busiest Manhattan and airport pickup zones get the head of the popularity curve
+HOT_ZONES = [132, 237, 161, 236, 162, 138, 186, 230, 142, 170, 163, 239, 48, 68, 234, 79, 141, 107, 140, 100]
+AIRPORT_ZONES = [132, 138]
+
+# Relative pickup volume by hour of day (quiet 3-5am, evening peak)
+HOUR_WEIGHTS = np.array([
+    3.0, 2.0, 1.3, 0.9, 0.8, 1.0, 2.0, 3.5, 4.5, 4.6, 4.7, 4.9,
+    5.2, 5.3, 5.6, 5.9, 6.0, 6.6, 7.0, 6.6, 5.8, 5.5, 5.0, 4.0,
+])
+# Monday..Sunday
+DOW_WEIGHTS = np.array([0.85, 0.95, 1.05, 1.1, 1.1, 1.0, 0.85])
+
+# payment_type codes: 0 flex fare (nulls in passenger/ratecode), 1 card, 2 cash, 3 no charge, 4 dispute
+PAYMENT_TYPES = np.array([0, 1, 2, 3, 4])
+PAYMENT_WEIGHTS = np.array([0.06, 0.76, 0.16, 0.01, 0.01])
+
+STRAY_FRACTION = 1e-5  # share of trips with out-of-month pickup timestamps, as in the real files
+
+def zone_weights(seed):
+    """Zipf-like pickup popularity over zones 1..265 with HOT_ZONES at the head."""
+    rng = np.random.default_rng(seed)
+    others = rng.permutation([z for z in range(1, NUM_ZONES + 1) if z not in HOT_ZONES])
+    order = np.array(HOT_ZONES + list(others))
+    weights = np.empty(NUM_ZONES)
+    weights[order - 1] = 1.0 / np.arange(1, NUM_ZONES + 1) ** 1.1
+    return weights / weights.sum()
+
+def generate_chunk(rng, n, month_start, days, zone_p):
+    """One chunk of TLC-shaped trips as an Arrow table."""
+    day_dows = (np.arange(days) + month_start.dayofweek) % 7
+    day_p = DOW_WEIGHTS[day_dows] / DOW_WEIGHTS[day_dows].sum()
+    day = rng.choice(days, n, p=day_p)
+    hour = rng.choice(24, n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, n)
+    pickup = np.datetime64(month_start, "us") + seconds.astype("timedelta64[s]")
+    stray = rng.random(n) < STRAY_FRACTION
+    pickup[stray] -= np.timedelta64(400, "D")
+
+    pu = rng.choice(NUM_ZONES, n, p=zone_p) + 1
+    do = rng.choice(NUM_ZONES, n, p=zone_p) + 1
+    airport = np.isin(pu, AIRPORT_ZONES)
+
+    distance = np.round(np.where(airport, rng.lognormal(2.8, 0.3, n), rng.lognormal(0.5, 0.75, n)), 2)
+    speed_mph = np.clip(rng.normal(12, 4, n), 3, 45)
+    duration = np.maximum(60, distance / speed_mph * 3600 + rng.normal(120, 60, n)).astype("int64")
+    dropoff = pickup + duration.astype("timedelta64[s]")
+
+    payment = rng.choice(PAYMENT_TYPES, n, p=PAYMENT_WEIGHTS)
+    flex = payment == 0
+    passengers = pd.array(rng.choice([1, 1, 1, 1, 2, 2, 3, 4, 5, 6], n), dtype="Int64")
+    passengers[flex] = pd.NA
+    ratecode = pd.array(np.where(airport & (rng.random(n) < 0.5), 2, 1), dtype="Int64")
+    ratecode[flex] = pd.NA
+    flag = np.where(rng.random(n) < 0.005, "Y", "N").astype(object)
+    flag[flex] = None
+
+    fare = np.round(3.0 + 2.5 * distance + 0.7 * duration / 60, 2)
+    fare = np.where(ratecode.to_numpy(dtype=float, na_value=1) == 2, 70.0, fare)
+    extra = np.where((hour >= 20) | (hour < 6), 1.0, 0.0) + np.where((hour >= 16) & (hour < 20), 2.5, 0.0)
+    mta_tax = np.full(n, 0.5)
+    tip = np.where(payment == 1, np.round(fare * rng.choice([0.0, 0.15, 0.2, 0.25, 0.3], n), 2), 0.0)
+    tolls = np.where(airport & (rng.random(n) < 0.3), 6.94, 0.0)
+    improvement = np.full(n, 1.0)
+    congestion = np.where(rng.random(n) < 0.9, 2.5, 0.0)
+    airport_fee = np.where(airport, 1.75, 0.0)
+    total = np.round(fare + extra + mta_tax + tip + tolls + improvement + congestion + airport_fee, 2)
+
+    return pa.table({
+        "VendorID": rng.choice([1, 2], n, p=[0.25, 0.75]).astype("int32"),
+        "tpep_pickup_datetime": pickup,
+        "tpep_dropoff_datetime": dropoff,
+        "passenger_count": passengers,
+        "trip_distance": distance,
+        "RatecodeID": ratecode,
+        "store_and_fwd_flag": flag,
+        "PULocationID": pu.astype("int32"),
+        "DOLocationID": do.astype("int32"),
+        "payment_type": payment.astype("int64"),
+        "fare_amount": fare,
+        "extra": extra,
+        "mta_tax": mta_tax,
+        "tip_amount": tip,
+        "tolls_amount": tolls,
+        "improvement_surcharge": improvement,
+        "total_amount": total,
+        "congestion_surcharge": congestion,
+        "Airport_fee": airport_fee,
+    }, schema=TLC_YELLOW_SCHEMA)
+
+def generate_month(output_path, rows, month="2024-01", seed=0, chunk_rows=500_000):
+    """
+    Write `rows` synthetic yellow trips for `month` to `output_path`, one row group per chunk.
+    Each chunk has its own generator derived from (seed, chunk index), so the output is
+    deterministic and memory stays bounded by chunk_rows.
+    """
+    month_start = pd.Timestamp(f"{month}-01")
+    days = month_start.days_in_month
+    zone_p = zone_weights(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with pq.ParquetWriter(output_path, TLC_YELLOW_SCHEMA) as writer:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, i])
+            writer.write_table(generate_chunk(rng, min(chunk_rows, rows - start), month_start, days, zone_p))
+    return output_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic TLC yellow trip parquet files")
+    parser.add_argument("--months", type=str, default="2024-01", help="Comma-separated YYYY-MM")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per month")
+    parser.add_argument("--output-dir", type=str, default="data/bench", help="Output directory")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    args = parser.parse_args()
+
+    for offset, month in enumerate(m.strip() for m in args.months.split(",")):
+        path = os.path.join(args.output_dir, f"yellow_tripdata_{month}.parquet")
+        generate_month(path, args.rows, month, seed=args.seed + offset)
+        print(f"✅ Wrote {args.rows:,} synthetic trips to {path}")
+
+if __name__ == "__main__":
+    main()
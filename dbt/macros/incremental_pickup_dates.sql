@@ -0,0 +1,59 @@
+{#
+    Row filter for incremental models keyed on pickup_date (delete+insert).
+
+    On an incremental run it keeps the pickup dates that need rebuilding:
+      - with `lineage_column` (models reading source files): dates touched by the upstream rows
+        of new loads, i.e. (file, loaded_at) pairs this model has not built yet (see new_loads);
+      - otherwise: the dates queued for this model in rebuild_dates by its parent;
+      - in both cases the trailing `incremental_lookback_days` before this model's newest
+        pickup_date, so late-arriving trips for recent days are picked up as well. Dates past
+        today or past dim_date's range (stray far-future pickups) do not count as newest.
+    Touched dates are rebuilt from all of their upstream rows, not just the new ones.
+    On a full refresh (or first build) it is a no-op.
+
+    When the orchestrator passes a partition window (vars pickup_date_start and
+    pickup_date_end, [start, end)), exactly those dates are rebuilt instead.
+    The hooks in rebuild_dates.sql delete the rebuilt dates first and queue them downstream.
+#}
+{% macro incremental_pickup_dates(upstream, date_expr='pickup_date', lineage_column=none) %}
+    {#- Resolved outside the branches so dbt records the dependency at parse time -#}
+    {%- set calendar = ref('dim_date') -%}
+    {%- if var('pickup_date_start', none) is not none -%}
+    (
+        {{ date_expr }} >= '{{ var("pickup_date_start") }}'::date
+        and {{ date_expr }} < '{{ var("pickup_date_end") }}'::date
+    )
+    {%- elif is_incremental() -%}
+    (
+        {%- if lineage_column is not none %}
+        {{ date_expr }} in (
+            select distinct {{ date_expr }}
+            from {{ upstream }}
+            where ({{ lineage_column }}, loaded_at) in ({{ new_loads(upstream, lineage_column) }})
+        )
+        {%- else %}
+        {{ date_expr }} in ({{ claimed_rebuild_dates() }})
+        {%- endif %}
+        or {{ date_expr }} >= (
+            select max(pickup_date) from {{ this }}
+            where pickup_date <= least(current_date, (select max(date_day) from {{ calendar }}))
+        ) - {{ var('incremental_lookback_days') }}
+    )
+    {%- else -%}
+    true
+    {%- endif -%}
+{% endmacro %}
+
+{#
+    (file, loaded_at) pairs of `upstream` that this model has not built yet. Compared per file
+    rather than against this model's newest loaded_at: loads running in parallel commit in any
+    order, so a file can show up after a file with a later loaded_at was already built.
+#}
+{% macro new_loads(upstream, lineage_column) -%}
+    select loads.{{ lineage_column }}, loads.loaded_at
+    from (select distinct {{ lineage_column }}, loaded_at from {{ upstream }}) loads
+    where not exists (
+        select 1 from {{ this }} built
+        where built.{{ lineage_column }} = loads.{{ lineage_column }} and built.loaded_at = loads.loaded_at
+    )
+{%- endmacro %}
@@ -0,0 +1,78 @@
+{#
+    Post-hook that keeps a model range-partitioned by pickup month on pickup_date.
+
+    dbt creates the model as a plain table on its first build (and on --full-refresh);
+    this hook then swaps it for a partitioned table with one partition per month of
+    dim_date plus a DEFAULT partition, copying the rows and indexes over. On incremental
+    runs the table is already partitioned and dbt's delete+insert is routed to the
+    partitions. Months that collect at least `partition_min_rows` rows in the DEFAULT
+    partition (data beyond the dim_date horizon) are moved into their own partition.
+#}
+{% macro partition_by_pickup_month(relation, calendar) %}
+    {%- set parent = relation.include(database=False) -%}
+    {%- set schema = relation.schema -%}
+    {%- set name = relation.identifier -%}
+do $$
+declare
+    month_start date;
+begin
+    if not exists (select 1 from pg_partitioned_table where partrelid = '{{ parent }}'::regclass) then
+        -- On --full-refresh the previous partitioned table is still around as __dbt_backup
+        -- and owns the partition names; dbt drops it after commit anyway
+        drop table if exists "{{ schema }}"."{{ name }}__dbt_backup" cascade;
+        alter table {{ parent }} rename to "{{ name }}__unpartitioned";
+        create table {{ parent }} (like "{{ schema }}"."{{ name }}__unpartitioned" including all)
+            partition by range (pickup_date);
+
+        for month_start in
+            select generate_series(date_trunc('month', min(date_day)), date_trunc('month', max(date_day)), interval '1 month')::date
+            from {{ calendar }}
+        loop
+            execute format(
+                'create table %I.%I partition of {{ parent }} for values from (%L) to (%L)',
+                '{{ schema }}', '{{ name }}_' || to_char(month_start, 'YYYY_MM'),
+                month_start, (month_start + interval '1 month')::date
+            );
+        end loop;
+        create table "{{ schema }}"."{{ name }}_default" partition of {{ parent }} default;
+
+        -- Insert in pickup order so the BRIN indexes stay tight
+        insert into {{ parent }} select * from "{{ schema }}"."{{ name }}__unpartitioned" order by pickup_datetime;
+        drop table "{{ schema }}"."{{ name }}__unpartitioned";
+        -- The marts' ANALYZE post-hook ran before this one, on the old table
+        analyze {{ parent }};
+    end if;
+
+    for month_start in
+        select date_trunc('month', pickup_date)::date
+        from "{{ schema }}"."{{ name }}_default"
+        where pickup_date is not null
+        group by 1
+        having count(*) >= {{ var('partition_min_rows') }}
+    loop
+        create temporary table moved_rows on commit drop as
+            select * from "{{ schema }}"."{{ name }}_default"
+            where pickup_date >= month_start and pickup_date < month_start + interval '1 month';
+        delete from "{{ schema }}"."{{ name }}_default"
+            where pickup_date >= month_start and pickup_date < month_start + interval '1 month';
+        execute format(
+            'create table %I.%I partition of {{ parent }} for values from (%L) to (%L)',
+            '{{ schema }}', '{{ name }}_' || to_char(month_start, 'YYYY_MM'),
+            month_start, (month_start + interval '1 month')::date
+        );
+        insert into {{ parent }} select * from moved_rows order by pickup_datetime;
+        drop table moved_rows;
+    end loop;
+end
+$$
+{% endmacro %}
+
+{#
+    Pre-hook that makes concurrent builds of a partitioned model (one Dagster run per day of a
+    backfill) take turns: the partition DDL above would otherwise race, and creating a partition
+    while another run holds row locks on the table can deadlock. The transaction-level advisory
+    lock is released when dbt commits the model.
+#}
+{% macro lock_pickup_month_partitions(relation) %}
+    select pg_advisory_xact_lock(hashtext('{{ relation.include(database=False) }}'))
+{% endmacro %}
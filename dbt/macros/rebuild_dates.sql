@@ -0,0 +1,83 @@
+{#
+    Hooks that keep incremental models keyed on pickup_date (see incremental_pickup_dates.sql)
+    in step when upstream rows are replaced or disappear.
+
+    A model that reads source files (`lineage_column`) records the pickup dates it changes in
+    <schema>.rebuild_dates, one row per incremental child model: the dates of the old rows of
+    files with a new load (see new_loads), which it then deletes, and the dates of the newly
+    loaded rows. A child claims its queued dates, deletes them, rebuilds them from its
+    upstream and passes them on to its own children. So a date that only lost rows (a reloaded file no longer has some
+    stray trips) is rebuilt all the way down, and a date that lost all of them is removed.
+
+    With a partition window (vars pickup_date_start / pickup_date_end) every model deletes
+    and rebuilds exactly the window and the queue is left alone.
+#}
+{% macro rebuild_dates_table(schema=none) -%}
+    "{{ schema or this.schema }}"."rebuild_dates"
+{%- endmacro %}
+
+{% macro ensure_rebuild_dates(schema=none) %}
+    create table if not exists {{ rebuild_dates_table(schema) }} (
+        model_name text not null,
+        pickup_date date not null,
+        claimed_by text
+    );
+{% endmacro %}
+
+{# Queue the dates of `dates_query` (a select with a pickup_date column) for every incremental child #}
+{% macro queue_rebuild_dates(dates_query) %}
+    {%- if execute %}
+    {%- for node in graph.nodes.values()
+        if node.resource_type == 'model' and model.unique_id in node.depends_on.nodes
+        and node.config.materialized == 'incremental' %}
+    {{ ensure_rebuild_dates(node.schema) }}
+    insert into {{ rebuild_dates_table(node.schema) }} (model_name, pickup_date)
+    select distinct '{{ node.alias }}', pickup_date
+    from ({{ dates_query }}) changed_dates
+    where pickup_date is not null;
+    {%- endfor %}
+    {%- endif %}
+{% endmacro %}
+
+{% macro claimed_rebuild_dates() -%}
+    select pickup_date from {{ rebuild_dates_table() }}
+    where model_name = '{{ this.identifier }}' and claimed_by = '{{ invocation_id }}'
+{%- endmacro %}
+
+{% macro before_pickup_date_rebuild(upstream, lineage_column=none) %}
+    {{ ensure_rebuild_dates() }}
+    {%- if not is_incremental() %}
+    select 1
+    {%- elif var('pickup_date_start', none) is not none %}
+    delete from {{ this }}
+    where pickup_date >= '{{ var("pickup_date_start") }}'::date
+      and pickup_date < '{{ var("pickup_date_end") }}'::date
+    {%- elif lineage_column is not none %}
+    {%- set reloaded -%}
+        select {{ lineage_column }} from ({{ new_loads(upstream, lineage_column) }}) reloads
+    {%- endset %}
+    {{ queue_rebuild_dates(
+        "select pickup_date from " ~ this ~ " where " ~ lineage_column ~ " in (" ~ reloaded ~ ")"
+        ~ " union all select pickup_date from " ~ upstream
+        ~ " where (" ~ lineage_column ~ ", loaded_at) in (" ~ new_loads(upstream, lineage_column) ~ ")"
+    ) }}
+    delete from {{ this }} where {{ lineage_column }} in ({{ reloaded }})
+    {%- else %}
+    update {{ rebuild_dates_table() }} set claimed_by = '{{ invocation_id }}'
+    where model_name = '{{ this.identifier }}';
+    delete from {{ this }} where pickup_date in ({{ claimed_rebuild_dates() }})
+    {%- endif %}
+{% endmacro %}
+
+{% macro after_pickup_date_rebuild() %}
+    {%- if should_full_refresh() %}
+    {{ queue_rebuild_dates("select distinct pickup_date from " ~ this) }}
+    delete from {{ rebuild_dates_table() }} where model_name = '{{ this.identifier }}'
+    {%- elif var('pickup_date_start', none) is none %}
+    {{ queue_rebuild_dates(claimed_rebuild_dates()) }}
+    delete from {{ rebuild_dates_table() }}
+    where model_name = '{{ this.identifier }}' and claimed_by = '{{ invocation_id }}'
+    {%- else %}
+    select 1
+    {%- endif %}
+{% endmacro %}
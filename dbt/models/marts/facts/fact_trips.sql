@@ -1,5 +1,22 @@
+{{ config(
+    indexes=[
+      {'columns': ['pickup_datetime'], 'type': 'brin'},
+      {'columns': ['pickup_date'], 'type': 'brin'},
+      {'columns': ['source_file'], 'type': 'brin'},
+    ],
+    pre_hook=[
+      "{{ lock_pickup_month_partitions(this) }}",
+      "{{ before_pickup_date_rebuild(ref('stg_yellow_trips'), lineage_column='source_file') }}",
+    ],
+    post_hook=[
+      "{{ partition_by_pickup_month(this, ref('dim_date')) }}",
+      "{{ after_pickup_date_rebuild() }}",
+    ]
+) }}
+
 with trips as (
     select * from {{ ref('stg_yellow_trips') }}
+    where {{ incremental_pickup_dates(ref('stg_yellow_trips'), lineage_column='source_file') }}
 ),
 dim_date as (
     select * from {{ ref('dim_date') }}
@@ -17,8 +34,8 @@ select
     trips.dropoff_datetime,
     
     -- Date/Time Dimensions
-    cast(trips.pickup_datetime as date) as pickup_date,
-    extract(hour from trips.pickup_datetime) as pickup_hour,
+    trips.pickup_date,
+    cast(extract(hour from trips.pickup_datetime) as smallint) as pickup_hour,
     
     -- Metrics
     trips.passenger_count,
@@ -34,13 +51,17 @@ select
     trips.payment_type,
     
     -- Derived Metrics
-    extract(epoch from (trips.dropoff_datetime - trips.pickup_datetime)) as duration_seconds,
+    trips.duration_seconds,
     
     case 
-        when extract(epoch from (trips.dropoff_datetime - trips.pickup_datetime)) > 0 
-        then trips.trip_distance / (extract(epoch from (trips.dropoff_datetime - trips.pickup_datetime)) / 3600)
+        when trips.duration_seconds > 0 
+        then cast(trips.trip_distance as numeric) * 3600 / trips.duration_seconds
         else 0
-    end as avg_speed_mph
+    end as avg_speed_mph,
+    
+    -- Lineage
+    trips.source_file,
+    trips.loaded_at
 
 from trips
 where trips.pickup_datetime IS NOT NULL
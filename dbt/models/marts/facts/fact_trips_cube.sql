@@ -0,0 +1,47 @@
+{{ config(
+    indexes=[
+      {'columns': ['pickup_date', 'pickup_location_id']},
+      {'columns': ['pickup_date', 'payment_type']},
+    ],
+    pre_hook="{{ before_pickup_date_rebuild(ref('fact_trips')) }}",
+    post_hook="{{ after_pickup_date_rebuild() }}"
+) }}
+
+-- Base rollup of fact_trips at (pickup_date, pickup_hour, pickup_location_id, payment_type) grain.
+-- Only additive measures (counts, sums, max) so every KPI mart can re-aggregate it exactly:
+-- averages are sum_x / x_count and ratios are ratios of sums.
+with trips as (
+    select * from {{ ref('fact_trips') }}
+    where {{ incremental_pickup_dates(ref('fact_trips')) }}
+)
+
+select
+    pickup_date,
+    pickup_hour,
+    pickup_location_id,
+    payment_type,
+    
+    -- Volume
+    count(*) as trip_count,
+    
+    -- Sums and their non-null counts
+    sum(fare_amount) as sum_fare_amount,
+    count(fare_amount) as fare_amount_count,
+    sum(total_amount) as sum_total_amount,
+    sum(tip_amount) as sum_tip_amount,
+    sum(cast(trip_distance as numeric)) as sum_trip_distance, -- real in fact_trips; sum exactly
+    count(trip_distance) as trip_distance_count,
+    sum(duration_seconds) as sum_duration_seconds,
+    count(duration_seconds) as duration_seconds_count,
+    
+    -- Counters
+    sum(case when payment_type = 2 then 1 else 0 end) as cash_trips,
+    sum(case when congestion_surcharge > 0 then 1 else 0 end) as congestion_trips,
+    sum(case when pickup_hour >= 22 or pickup_hour < 5 then 1 else 0 end) as late_night_trips,
+    
+    -- Freshness
+    max(pickup_datetime) as max_pickup_datetime,
+    max(loaded_at) as loaded_at
+
+from trips
+group by 1, 2, 3, 4
@@ -1,14 +1,23 @@
-with trips as (
-    select * from {{ ref('fact_trips') }}
+{{ config(
+    indexes=[{'columns': ['pickup_date', 'payment_type'], 'unique': true}],
+    pre_hook="{{ before_pickup_date_rebuild(ref('fact_trips_cube')) }}",
+    post_hook="{{ after_pickup_date_rebuild() }}"
+) }}
+
+with trip_cube as (
+    select * from {{ ref('fact_trips_cube') }}
+    where {{ incremental_pickup_dates(ref('fact_trips_cube')) }}
 )
 
 select
     pickup_date,
     payment_type,
     
-    count(*) as total_trips,
-    avg(fare_amount) as avg_fare,
-    sum(total_amount) as total_revenue
+    sum(trip_count)::bigint as total_trips,
+    sum(sum_fare_amount) / nullif(sum(fare_amount_count), 0) as avg_fare,
+    sum(sum_total_amount) as total_revenue,
+    
+    max(loaded_at) as loaded_at
 
-from trips
+from trip_cube
 group by 1, 2
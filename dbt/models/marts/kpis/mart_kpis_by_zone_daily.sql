@@ -1,5 +1,12 @@
-with trips as (
-    select * from {{ ref('fact_trips') }}
+{{ config(
+    indexes=[{'columns': ['pickup_date', 'pickup_location_id'], 'unique': true}],
+    pre_hook="{{ before_pickup_date_rebuild(ref('fact_trips_cube')) }}",
+    post_hook="{{ after_pickup_date_rebuild() }}"
+) }}
+
+with trip_cube as (
+    select * from {{ ref('fact_trips_cube') }}
+    where {{ incremental_pickup_dates(ref('fact_trips_cube')) }}
 ),
 
 zones as (
@@ -7,15 +14,17 @@ zones as (
 )
 
 select
-    trips.pickup_date,
-    trips.pickup_location_id,
+    trip_cube.pickup_date,
+    trip_cube.pickup_location_id,
     zones.zone,
     
-    count(*) as total_trips,
-    sum(trips.total_amount) as total_revenue,
-    avg(trips.trip_distance) as avg_distance,
-    avg(trips.duration_seconds) / 60.0 as avg_duration_minutes
+    sum(trip_cube.trip_count)::bigint as total_trips,
+    sum(trip_cube.sum_total_amount) as total_revenue,
+    sum(trip_cube.sum_trip_distance) / nullif(sum(trip_cube.trip_distance_count), 0) as avg_distance,
+    sum(trip_cube.sum_duration_seconds) / nullif(sum(trip_cube.duration_seconds_count), 0) / 60.0 as avg_duration_minutes,
+    
+    max(trip_cube.loaded_at) as loaded_at
 
-from trips
-left join zones on trips.pickup_location_id = zones.location_id
+from trip_cube
+left join zones on trip_cube.pickup_location_id = zones.location_id
 group by 1, 2, 3
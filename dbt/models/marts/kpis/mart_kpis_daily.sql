@@ -1,36 +1,44 @@
-with trips as (
-    select * from {{ ref('fact_trips') }}
+{{ config(
+    indexes=[{'columns': ['pickup_date'], 'unique': true}],
+    pre_hook="{{ before_pickup_date_rebuild(ref('fact_trips_cube')) }}",
+    post_hook="{{ after_pickup_date_rebuild() }}"
+) }}
+
+with trip_cube as (
+    select * from {{ ref('fact_trips_cube') }}
+    where {{ incremental_pickup_dates(ref('fact_trips_cube')) }}
 )
 
 select
     pickup_date,
     
     -- Volume
-    count(*) as total_trips,
+    sum(trip_count)::bigint as total_trips,
     
     -- Revenue & Efficiency
-    sum(total_amount) as total_revenue,
-    avg(fare_amount) as avg_fare,
-    sum(total_amount) / nullif(sum(trip_distance), 0) as revenue_per_mile,
-    sum(tip_amount) / nullif(sum(fare_amount), 0) as tip_rate,
+    sum(sum_total_amount) as total_revenue,
+    sum(sum_fare_amount) / nullif(sum(fare_amount_count), 0) as avg_fare,
+    sum(sum_total_amount) / nullif(sum(sum_trip_distance), 0) as revenue_per_mile,
+    sum(sum_tip_amount) / nullif(sum(sum_fare_amount), 0) as tip_rate,
     
     -- Operational
-    avg(trip_distance) as avg_trip_distance,
-    avg(duration_seconds) / 60.0 as avg_trip_duration_minutes,
+    sum(sum_trip_distance) / nullif(sum(trip_distance_count), 0) as avg_trip_distance,
+    sum(sum_duration_seconds) / nullif(sum(duration_seconds_count), 0) / 60.0 as avg_trip_duration_minutes,
     
     -- Load
-    count(*) / 24.0 as trips_per_hour_avg,
+    sum(trip_count) / 24.0 as trips_per_hour_avg,
     
     -- Dimensions/Mix
-    sum(case when payment_type = 2 then 1 else 0 end)::numeric / nullif(count(*), 0) as pct_cash_trips,
-    sum(case when congestion_surcharge > 0 then 1 else 0 end)::numeric / nullif(count(*), 0) as pct_congestion_trips,
+    sum(cash_trips)::numeric / nullif(sum(trip_count), 0) as pct_cash_trips,
+    sum(congestion_trips)::numeric / nullif(sum(trip_count), 0) as pct_congestion_trips,
     
     -- Late Night (10pm - 5am)
-    sum(case when pickup_hour >= 22 or pickup_hour < 5 then 1 else 0 end)::numeric / nullif(count(*), 0) as late_night_share,
+    sum(late_night_trips)::numeric / nullif(sum(trip_count), 0) as late_night_share,
     
     -- Freshness
-    max(pickup_datetime) as data_freshness_check_at
+    max(max_pickup_datetime) as data_freshness_check_at,
+    max(loaded_at) as loaded_at
 
-from trips
+from trip_cube
 group by 1
 order by 1 desc
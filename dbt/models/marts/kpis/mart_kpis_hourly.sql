@@ -1,16 +1,25 @@
-with trips as (
-    select * from {{ ref('fact_trips') }}
+{{ config(
+    indexes=[{'columns': ['pickup_date', 'pickup_hour'], 'unique': true}],
+    pre_hook="{{ before_pickup_date_rebuild(ref('fact_trips_cube')) }}",
+    post_hook="{{ after_pickup_date_rebuild() }}"
+) }}
+
+with trip_cube as (
+    select * from {{ ref('fact_trips_cube') }}
+    where {{ incremental_pickup_dates(ref('fact_trips_cube')) }}
 )
 
 select
     pickup_date,
     pickup_hour,
     
-    count(*) as total_trips,
-    sum(total_amount) as total_revenue,
-    avg(fare_amount) as avg_fare,
-    avg(trip_distance) as avg_distance
+    sum(trip_count)::bigint as total_trips,
+    sum(sum_total_amount) as total_revenue,
+    sum(sum_fare_amount) / nullif(sum(fare_amount_count), 0) as avg_fare,
+    sum(sum_trip_distance) / nullif(sum(trip_distance_count), 0) as avg_distance,
+    
+    max(loaded_at) as loaded_at
 
-from trips
+from trip_cube
 group by 1, 2
 order by 1 desc, 2 asc
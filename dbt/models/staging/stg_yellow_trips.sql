@@ -1,38 +1,69 @@
+-- Materialized once per loaded file (delete+insert on source_file) with compact types,
+-- so downstream models read narrow, pre-typed rows instead of re-casting raw on every build.
+-- A reloaded file gets a new load_timestamp and replaces its previous rows. New work is found
+-- per file, not with one global watermark: parallel loads commit in any order, so a file can
+-- become visible after one with a later load_timestamp was already built.
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='source_file',
+    indexes=[
+      {'columns': ['source_file', 'loaded_at']},
+      {'columns': ['pickup_date']},
+    ]
+) }}
+
 with source as (
     select * from {{ source('raw', 'yellow_trips') }}
+    {% if is_incremental() %}
+    where (filename, load_timestamp) in (
+        select loads.filename, loads.load_timestamp
+        from (select distinct filename, load_timestamp from {{ source('raw', 'yellow_trips') }}) loads
+        where not exists (
+            select 1 from {{ this }} built
+            where built.source_file = loads.filename and built.loaded_at = loads.load_timestamp
+        )
+    )
+    {% endif %}
 ),
 
 renamed as (
     select
         -- Identifiers
-        cast(vendorid as integer) as vendor_id,
-        cast(pulocationid as integer) as pickup_location_id,
-        cast(dolocationid as integer) as dropoff_location_id,
+        cast(vendorid as smallint) as vendor_id,
+        cast(pulocationid as smallint) as pickup_location_id,
+        cast(dolocationid as smallint) as dropoff_location_id,
         
         -- Timestamps
         cast(tpep_pickup_datetime as timestamp) as pickup_datetime,
         cast(tpep_dropoff_datetime as timestamp) as dropoff_datetime,
+        cast(tpep_pickup_datetime as date) as pickup_date,
+        cast(extract(epoch from (tpep_dropoff_datetime - tpep_pickup_datetime)) as integer) as duration_seconds,
         
         -- Trip info
-        cast(passenger_count as integer) as passenger_count,
-        cast(trip_distance as numeric) as trip_distance,
-        cast(store_and_fwd_flag as varchar) as store_and_fwd_flag,
-        cast(ratecodeid as integer) as rate_code_id,
+        cast(passenger_count as smallint) as passenger_count,
+        cast(trip_distance as real) as trip_distance,
+        cast(store_and_fwd_flag as char(1)) as store_and_fwd_flag,
+        cast(ratecodeid as smallint) as rate_code_id,
         
         -- Payment
-        cast(payment_type as integer) as payment_type,
-        cast(fare_amount as numeric) as fare_amount,
-        cast(extra as numeric) as extra,
-        cast(mta_tax as numeric) as mta_tax,
-        cast(tip_amount as numeric) as tip_amount,
-        cast(tolls_amount as numeric) as tolls_amount,
-        cast(improvement_surcharge as numeric) as improvement_surcharge,
-        cast(total_amount as numeric) as total_amount,
-        cast(congestion_surcharge as numeric) as congestion_surcharge,
-        cast(airport_fee as numeric) as airport_fee
+        cast(payment_type as smallint) as payment_type,
+        cast(fare_amount as numeric(10, 2)) as fare_amount,
+        cast(extra as numeric(10, 2)) as extra,
+        cast(mta_tax as numeric(10, 2)) as mta_tax,
+        cast(tip_amount as numeric(10, 2)) as tip_amount,
+        cast(tolls_amount as numeric(10, 2)) as tolls_amount,
+        cast(improvement_surcharge as numeric(10, 2)) as improvement_surcharge,
+        cast(total_amount as numeric(10, 2)) as total_amount,
+        cast(congestion_surcharge as numeric(10, 2)) as congestion_surcharge,
+        cast(airport_fee as numeric(10, 2)) as airport_fee,
+
+        -- Lineage
+        filename as source_file,
+        load_timestamp as loaded_at
 
     from source
 )
 
 select * from renamed
-where pickup_datetime >= '2000-01-01' -- Basic sanity filter
+where pickup_datetime >= '2000-01-01' -- Basic sanity filter (months loaded from the parquet lake are already trimmed to their month)
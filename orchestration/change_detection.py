@@ -0,0 +1,274 @@
+"""
+Decide which dbt nodes need rebuilding before invoking dbt.
+
+Three inputs are compared against the state saved after the last successful build of a scope:
+  - model code: a fingerprint per manifest node (file checksum, config and the macros it uses),
+  - raw.yellow_trips: the loaded files in raw.ingest_manifest (hash + load time, row counts)
+    and the table's partitions,
+  - raw.taxi_zone_lookup: row count and a hash of its contents.
+Changed nodes and sources are expanded to all their descendants. An empty selection means the
+run is a no-op. State lives in one JSON file per scope under DBT_STATE_DIR.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import create_engine, text
+
+REPO_ROOT = Path(__file__).parent.parent
+DBT_PROJECT_DIR = REPO_ROOT / "dbt"
+MANIFEST_PATH = DBT_PROJECT_DIR / "target" / "manifest.json"
+STATE_DIR = Path(os.getenv("DBT_STATE_DIR", DBT_PROJECT_DIR / "state"))
+
+DB_USER = os.getenv("POSTGRES_USER", "admin")
+DB_PASS = os.getenv("POSTGRES_PASSWORD", "adminparams")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+DB_NAME = os.getenv("POSTGRES_DB", "analytics")
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+YELLOW_SOURCE = "source.analytics.raw.yellow_trips"
+ZONES_SOURCE = "source.analytics.raw.taxi_zone_lookup"
+MONTH_PATTERN = re.compile(r"(\d{4})[-_](\d{2})")
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def _macro_closure(manifest, macro_ids):
+    """All macros reachable from macro_ids through macro depends_on."""
+    seen, stack = set(), list(macro_ids)
+    while stack:
+        macro_id = stack.pop()
+        if macro_id in seen or macro_id not in manifest["macros"]:
+            continue
+        seen.add(macro_id)
+        stack.extend(manifest["macros"][macro_id]["depends_on"]["macros"])
+    return sorted(seen)
+
+def node_fingerprints(manifest):
+    """unique_id -> hash of everything that changes what dbt would build for the node."""
+    fingerprints = {}
+    for unique_id, node in {**manifest["nodes"], **manifest["sources"]}.items():
+        digest = hashlib.sha256()
+        digest.update(node.get("checksum", {}).get("checksum", "").encode())
+        digest.update(json.dumps(node.get("config", {}), sort_keys=True, default=str).encode())
+        digest.update(json.dumps(node.get("columns", {}), sort_keys=True, default=str).encode())
+        for macro_id in _macro_closure(manifest, node.get("depends_on", {}).get("macros", [])):
+            digest.update(manifest["macros"][macro_id]["macro_sql"].encode())
+        fingerprints[unique_id] = digest.hexdigest()
+    return fingerprints
+
+def changed_nodes(previous, current):
+    """Nodes that are new or whose fingerprint differs from the previous state."""
+    return sorted(uid for uid, fp in current.items() if previous.get(uid) != fp)
+
+def descendants(manifest, unique_ids):
+    """unique_ids plus everything downstream of them in the manifest's child_map."""
+    seen, stack = set(), list(unique_ids)
+    while stack:
+        uid = stack.pop()
+        if uid in seen:
+            continue
+        seen.add(uid)
+        stack.extend(manifest["child_map"].get(uid, []))
+    return seen
+
+def raw_snapshot(engine):
+    """Current state of the raw sources (cheap: manifest rows, catalog and a 265-row lookup)."""
+    with engine.connect() as conn:
+        files = {}
+        if conn.execute(text("SELECT to_regclass('raw.ingest_manifest')")).scalar():
+            rows = conn.execute(text("""
+                SELECT filename, content_hash, row_count, updated_at FROM raw.ingest_manifest
+                WHERE table_name = 'yellow_trips' AND status = 'loaded'
+            """)).fetchall()
+            files = {r.filename: {"version": f"{r.content_hash}:{r.updated_at.isoformat()}", "rows": r.row_count}
+                     for r in rows}
+        yellow = {"files": files, "partitions": [], "rows": sum(f["rows"] or 0 for f in files.values())}
+        if conn.execute(text("SELECT to_regclass('raw.yellow_trips')")).scalar():
+            yellow["partitions"] = sorted(conn.execute(text(
+                "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'raw.yellow_trips'::regclass"
+            )).scalars())
+            if not files:
+                # Loaded without the manifest (to_sql): fall back to a count and the newest load
+                rows, newest = conn.execute(text(
+                    "SELECT count(*), max(load_timestamp) FROM raw.yellow_trips"
+                )).one()
+                yellow["rows"] = rows
+                yellow["files"] = {"*": {"version": str(newest), "rows": rows}}
+
+        zones = None
+        if conn.execute(text("SELECT to_regclass('raw.taxi_zone_lookup')")).scalar():
+            rows, digest = conn.execute(text("""
+                SELECT count(*), md5(coalesce(string_agg(z::text, '|' ORDER BY z::text), ''))
+                FROM raw.taxi_zone_lookup z
+            """)).one()
+            zones = {"rows": rows, "hash": digest}
+    return {"yellow_trips": yellow, "taxi_zone_lookup": zones}
+
+def file_month(name):
+    match = MONTH_PATTERN.search(name)
+    return f"{match.group(1)}-{match.group(2)}" if match else None
+
+def window_months(start, end):
+    """
+    Months whose raw files can hold trips picked up in [start, end): the window's own months
+    plus the month either side, since a TLC file carries a few trips across its boundaries.
+    Strays further away (e.g. 2002 trips in a 2024 file) are not covered; an unpartitioned
+    `dbt build` picks those files up.
+    """
+    first = (start.replace(day=1) - timedelta(days=1)).replace(day=1)
+    last = end - timedelta(days=1)
+    last = (last.replace(day=28) + timedelta(days=4)).replace(day=1)
+    months = set()
+    while first <= last:
+        months.add(first.strftime("%Y-%m"))
+        first = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return months
+
+def raw_changes(previous, current, months=None):
+    """
+    (changed source unique_ids, human-readable reasons). With `months`, yellow trip files and
+    partitions for other months are ignored; names without a month always count.
+    """
+    sources, reasons = [], []
+    prev_yellow, cur_yellow = previous["yellow_trips"], current["yellow_trips"]
+
+    def relevant(name):
+        month = file_month(name)
+        return months is None or month is None or month in months
+
+    changed_files = sorted(
+        name for name in set(prev_yellow["files"]) | set(cur_yellow["files"])
+        if prev_yellow["files"].get(name) != cur_yellow["files"].get(name) and relevant(name)
+    )
+    dropped = sorted(p for p in set(prev_yellow["partitions"]) - set(cur_yellow["partitions"]) if relevant(p))
+    if changed_files or dropped:
+        sources.append(YELLOW_SOURCE)
+        delta = cur_yellow["rows"] - prev_yellow["rows"]
+        reasons.append(f"raw.yellow_trips: {len(changed_files)} new/reloaded file(s) {changed_files[:5]}, "
+                       f"rows {delta:+,}")
+        if dropped:
+            reasons.append(f"raw.yellow_trips: partitions dropped {dropped}; rebuild with --full-refresh to remove their rows")
+
+    if previous["taxi_zone_lookup"] != current["taxi_zone_lookup"]:
+        sources.append(ZONES_SOURCE)
+        prev_rows = (previous["taxi_zone_lookup"] or {}).get("rows", 0)
+        cur_rows = (current["taxi_zone_lookup"] or {}).get("rows", 0)
+        reasons.append(f"raw.taxi_zone_lookup: contents changed (rows {prev_rows} -> {cur_rows})")
+    return sources, reasons
+
+def state_path(scope, state_dir=STATE_DIR):
+    return Path(state_dir) / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', scope)}.json"
+
+def load_state(scope, state_dir=STATE_DIR):
+    path = state_path(scope, state_dir)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(scope, plan, state_dir=STATE_DIR):
+    """Record what a successful build of `scope` was based on."""
+    path = state_path(scope, state_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "fingerprints": plan["fingerprints"],
+        "raw": plan["raw"],
+    }
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def in_selection(node, select):
+    """Whether a node falls under a space-separated list of fqn selectors like "staging marts.kpis"."""
+    path = node["fqn"][1:]
+    for selector in select.split():
+        if ":" in selector:
+            continue
+        parts = selector.split(".")
+        if path[:len(parts)] == parts:
+            return True
+    return False
+
+def plan_build(manifest, raw, state, months=None, select=None):
+    """
+    Decide what to build, restricted to the fqn selectors in `select` if given, and to raw files
+    of `months` if given. Returns a dict with:
+      select: space-separated dbt node names, or None when nothing changed,
+      exclude: the unaffected node names within `select`, or None,
+      affected: affected unique_ids, reasons: why,
+      fingerprints / raw: what to save as state once the build succeeds.
+    """
+    fingerprints = node_fingerprints(manifest)
+    plan = {"fingerprints": fingerprints, "raw": raw}
+    if state is None:
+        roots, reasons = list(fingerprints), ["no previous state: building everything"]
+    else:
+        roots = changed_nodes(state["fingerprints"], fingerprints)
+        reasons = [f"code changed: {', '.join(uid.split('.')[-1] for uid in roots[:10])}"] if roots else []
+        raw_sources, raw_reasons = raw_changes(state["raw"], raw, months)
+        roots += raw_sources
+        reasons += raw_reasons
+
+    affected = sorted(
+        uid for uid in descendants(manifest, roots)
+        if uid in manifest["nodes"] and not uid.startswith("test.")
+        and (select is None or in_selection(manifest["nodes"][uid], select))
+    )
+    plan["affected"] = affected
+    plan["reasons"] = reasons or ["nothing changed"]
+    # Tests come along through dbt's indirect selection
+    plan["select"] = " ".join(manifest["nodes"][uid]["name"] for uid in affected) or None
+    # The same decision as an exclusion list, for callers that already pass a --select
+    # (dbt unions repeated --select flags, but --exclude always subtracts)
+    unaffected = sorted(
+        node["name"] for uid, node in manifest["nodes"].items()
+        if uid not in affected and not uid.startswith("test.")
+        and (select is None or in_selection(node, select))
+    )
+    plan["exclude"] = " ".join(unaffected) or None
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description="Build only the dbt models affected by code or raw data changes")
+    parser.add_argument("--scope", type=str, default="cli", help="State scope name")
+    parser.add_argument("--manifest", type=str, default=str(MANIFEST_PATH), help="Current dbt manifest.json")
+    parser.add_argument("--dry-run", action="store_true", help="Print the decision without running dbt")
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.manifest):
+        print(f"❌ {args.manifest} not found, run `dbt parse` first.")
+        sys.exit(1)
+
+    manifest = load_manifest(args.manifest)
+    raw = raw_snapshot(create_engine(DATABASE_URL))
+    plan = plan_build(manifest, raw, load_state(args.scope))
+    for reason in plan["reasons"]:
+        print(f"🔎 {reason}")
+
+    if plan["select"] is None:
+        print("⏩ Nothing changed since the last build, skipping dbt.")
+        return
+    print(f"Selected {len(plan['affected'])} model(s): {plan['select']}")
+    if args.dry_run:
+        return
+
+    result = subprocess.run(["dbt", "build", "--select", plan["select"], "--profiles-dir", "."], cwd=DBT_PROJECT_DIR)
+    if result.returncode != 0:
+        print("❌ dbt build failed, state not saved.")
+        sys.exit(result.returncode)
+    save_state(args.scope, plan)
+    print("✅ Build state saved.")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,159 @@
-from dagster import Definitions, load_assets_from_modules, AssetExecutionContext
+from dagster import (
+    AssetExecutionContext,
+    AssetKey,
+    BackfillPolicy,
+    Config,
+    DailyPartitionsDefinition,
+    Definitions,
+    asset,
+)
 from dagster_dbt import DbtCliResource, dbt_assets, DbtProject
+from sqlalchemy import create_engine
 
+import json
+import os
+import subprocess
+import sys
+from datetime import timedelta
 from pathlib import Path
 
+from orchestration.change_detection import (DATABASE_URL, load_manifest, load_state, plan_build, raw_snapshot,
+                                           save_state, window_months)
+
 # Define paths
-DBT_PROJECT_DIR = Path(__file__).parent.parent / "dbt"
+REPO_ROOT = Path(__file__).parent.parent
+DBT_PROJECT_DIR = REPO_ROOT / "dbt"
 
 # Define dbt resource
 dbt_project = DbtProject(
     project_dir=DBT_PROJECT_DIR,
 )
 
-@dbt_assets(manifest=dbt_project.manifest_path)
-def analytics_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource):
-    yield from dbt.cli(["build"], context=context).stream()
+# One partition per pickup date. Backfills launch one run per day; how many run at once is
+# capped by the run queue (max_concurrent_runs in orchestration/dagster_home/dagster.yaml).
+# Concurrent runs take turns on fact_trips (lock_pickup_month_partitions in its pre-hook).
+daily_partitions = DailyPartitionsDefinition(start_date=os.getenv("PIPELINE_START_DATE", "2024-01-01"))
+
+# Models rebuilt per loaded file / in full (staging, dimensions, source tests)
+DBT_BASE_SELECT = "staging marts.dimensions source:*"
+# Models keyed on pickup_date that can rebuild a single day
+DBT_DAILY_SELECT = "marts.facts marts.kpis"
+
+# dbt asset keys are <schema>/<model>
+MART_KEYS = [
+    AssetKey(["marts", "mart_kpis_daily"]),
+    AssetKey(["marts", "mart_kpis_hourly"]),
+    AssetKey(["marts", "mart_kpis_by_zone_daily"]),
+    AssetKey(["marts", "mart_kpis_by_payment_daily"]),
+]
+
+def run_script(context, *args):
+    """Run one of the repo's CLI scripts from the repo root, streaming its output to the Dagster log."""
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    proc = subprocess.run(
+        [sys.executable, *args], cwd=REPO_ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    for line in proc.stdout.splitlines():
+        context.log.info(line)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args[0]} exited with {proc.returncode}")
+
+class IngestConfig(Config):
+    months: str = os.getenv("INGEST_MONTHS", "2024-01")
+    workers: int = 4
+
+# Keys match the dbt sources raw.yellow_trips / raw.taxi_zone_lookup, so the dbt models depend on them
+@asset(key=["raw", "yellow_trips"], group_name="ingestion")
+def raw_yellow_trips(context: AssetExecutionContext, config: IngestConfig):
+    """Download TLC months and load them into raw.yellow_trips (unchanged files are skipped)."""
+    run_script(context, "scripts/download_tlc_parquet.py", "--months", config.months, "--workers", str(config.workers))
+    run_script(context, "scripts/load_parquet_to_postgres.py", "--months", config.months,
+               "--workers", str(config.workers), "--table", "yellow_trips")
+
+@asset(key=["raw", "taxi_zone_lookup"], group_name="ingestion")
+def raw_taxi_zone_lookup(context: AssetExecutionContext):
+    run_script(context, "scripts/download_taxi_zones.py")
+    run_script(context, "scripts/load_parquet_to_postgres.py", "--zones", "data/raw/taxi_zone_lookup.csv")
+
+def dbt_build_args(plan):
+    # dagster-dbt already passes the asset's own --select, so skip unaffected nodes with --exclude
+    return ["build", "--exclude", plan["exclude"]] if plan["exclude"] else ["build"]
+
+def plan_dbt_build(context, scope, select, months=None):
+    """Work out which of this asset's dbt nodes changed since `scope` last built (see change_detection.py)."""
+    raw = raw_snapshot(create_engine(DATABASE_URL))
+    plan = plan_build(load_manifest(dbt_project.manifest_path), raw, load_state(scope), months=months, select=select)
+    for reason in plan["reasons"]:
+        context.log.info(f"[{scope}] {reason}")
+    if plan["select"] is None:
+        context.log.info(f"[{scope}] nothing affected, skipping dbt")
+    else:
+        context.log.info(f"[{scope}] building {len(plan['affected'])} model(s) and descendants: {plan['select']}")
+    return plan
+
+@dbt_assets(manifest=dbt_project.manifest_path, select=DBT_BASE_SELECT, name="analytics_dbt_base")
+def analytics_dbt_base_assets(context: AssetExecutionContext, dbt: DbtCliResource):
+    plan = plan_dbt_build(context, "analytics_dbt_base", DBT_BASE_SELECT)
+    if plan["select"] is None:
+        return
+    yield from dbt.cli(dbt_build_args(plan), context=context).stream()
+    save_state("analytics_dbt_base", plan)
+
+@dbt_assets(
+    manifest=dbt_project.manifest_path,
+    select=DBT_DAILY_SELECT,
+    name="analytics_dbt_daily",
+    partitions_def=daily_partitions,
+    backfill_policy=BackfillPolicy.multi_run(max_partitions_per_run=1),
+)
+def analytics_dbt_daily_assets(context: AssetExecutionContext, dbt: DbtCliResource):
+    # The incremental models rebuild exactly [start, end) (see dbt/macros/incremental_pickup_dates.sql)
+    window = context.partition_time_window
+    dbt_vars = {
+        "pickup_date_start": window.start.strftime("%Y-%m-%d"),
+        "pickup_date_end": window.end.strftime("%Y-%m-%d"),
+    }
+    # Only raw files of the partition's month(s) and their neighbours can change its days
+    scope = f"analytics_dbt_daily/{dbt_vars['pickup_date_start']}"
+    months = window_months(window.start.date(), window.end.date())
+    plan = plan_dbt_build(context, scope, DBT_DAILY_SELECT, months=months)
+    if plan["select"] is None:
+        return
+    yield from dbt.cli([*dbt_build_args(plan), "--vars", json.dumps(dbt_vars)], context=context).stream()
+    save_state(scope, plan)
+
+@asset(deps=MART_KEYS, group_name="monitoring")
+def kpi_alerts(context: AssetExecutionContext):
+    """Anomaly detection and root cause analysis over the KPI marts."""
+    run_script(context, "alerts/alert_runner.py")
+
+@asset(
+    deps=[AssetKey(["marts", "fact_trips"]), AssetKey(["marts", "mart_kpis_daily"])],
+    group_name="monitoring",
+    partitions_def=daily_partitions,
+)
+def data_quality(context: AssetExecutionContext):
+    """Validation suites over the partition's days only (scripts/validation_suites.yml)."""
+    window = context.partition_time_window
+    days = [(window.start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((window.end - window.start).days)]
+    run_script(context, "scripts/validate_partitions.py", "--suite", "fact_trips", "critical_integrity", "--dates", *days)
+
+@asset(deps=[AssetKey(["marts", "mart_kpis_daily"])], group_name="forecasting")
+def trip_forecast(context: AssetExecutionContext):
+    run_script(context, "scripts/forecast_trips.py")
 
 # Definitions
 defs = Definitions(
-    assets=[analytics_dbt_assets],
+    assets=[
+        raw_yellow_trips,
+        raw_taxi_zone_lookup,
+        analytics_dbt_base_assets,
+        analytics_dbt_daily_assets,
+        kpi_alerts,
+        data_quality,
+        trip_forecast,
+    ],
     resources={
         "dbt": DbtCliResource(project_dir=dbt_project),
     },
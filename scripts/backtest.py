@@ -0,0 +1,167 @@
+"""
+Rolling-origin backtesting of forecast model configurations.
+
+Folds are cut on a calendar grid (every `period` days from a fixed epoch) rather than counted from
+the end of the history, so when new days are appended the earlier folds keep exactly the same
+training data and their cached fits are reused. Uncached folds are fitted across a process pool.
+The fit itself is passed in (fit_fold(config, train, future_ds) -> yhat array), so this module
+does not depend on a model library.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(os.getenv("BACKTEST_CACHE_DIR", Path(__file__).resolve().parent.parent / "models" / "backtest"))
+EPOCH = pd.Timestamp("2000-01-02")  # a Sunday: weekly folds end on Sundays
+MIN_TRAIN_DAYS = 21
+MAX_FOLDS = 8
+
+def config_label(config):
+    return "/".join(f"{k}={v}" for k, v in sorted(config.items()))
+
+def rolling_origin_folds(ds, horizon=7, period=7, min_train=MIN_TRAIN_DAYS, max_folds=MAX_FOLDS):
+    """
+    Cutoff dates (last training day) of the latest `max_folds` folds: on the calendar grid, with
+    at least `min_train` days of training data and a full `horizon` of test days after them.
+    """
+    ds = pd.to_datetime(pd.Series(ds))
+    first, last = ds.min(), ds.max()
+    if pd.isna(first):
+        return []
+    earliest = first + pd.Timedelta(days=min_train - 1)
+    latest = last - pd.Timedelta(days=horizon)
+    if latest < earliest:
+        return []
+    # last grid date <= latest
+    cutoff = latest - pd.Timedelta(days=(latest - EPOCH).days % period)
+    cutoffs = []
+    while cutoff >= earliest and len(cutoffs) < max_folds:
+        cutoffs.append(cutoff)
+        cutoff -= pd.Timedelta(days=period)
+    return sorted(cutoffs)
+
+def fold_key(config, train, test_ds):
+    """
+    Hash of a fold's config, training rows and test dates: the fold cache key. The test dates are
+    part of it so a day backfilled into the test window changes the key (and the yhat length).
+    """
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode())
+    for ds, y in zip(pd.to_datetime(train['ds']), train['y']):
+        digest.update(f"{ds.date().isoformat()},{float(y)!r}\n".encode())
+    digest.update("test\n".encode())
+    for ds in pd.to_datetime(pd.Series(test_ds)):
+        digest.update(f"{ds.date().isoformat()}\n".encode())
+    return digest.hexdigest()
+
+class FoldCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def load(self, key):
+        path = self.cache_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self, key, result):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+def _timed_fit(fit_fold, config, train, future_ds):
+    started = time.perf_counter()
+    yhat = fit_fold(config, train, future_ds)
+    return {"yhat": [float(v) for v in yhat], "fit_seconds": time.perf_counter() - started}
+
+def backtest(df, candidates, fit_fold, horizon=7, period=7, min_train=MIN_TRAIN_DAYS,
+             max_folds=MAX_FOLDS, workers=None, cache=None):
+    """
+    Fold-level results of every candidate config on history `df` (ds, y): one row per config,
+    cutoff and test day with y, yhat, the fold's fit time and whether it came from the cache.
+    """
+    df = df.assign(ds=pd.to_datetime(df['ds'])).sort_values('ds').reset_index(drop=True)
+    cutoffs = rolling_origin_folds(df['ds'], horizon, period, min_train, max_folds)
+    tasks, rows = [], []
+    for config in candidates:
+        for cutoff in cutoffs:
+            train = df[df['ds'] <= cutoff]
+            test = df[(df['ds'] > cutoff) & (df['ds'] <= cutoff + pd.Timedelta(days=horizon))]
+            key = fold_key(config, train, test['ds'])
+            result = cache.load(key) if cache else None
+            if result is not None and len(result["yhat"]) != len(test):
+                result = None  # stale entry: refit
+            tasks.append({"config": config, "cutoff": cutoff, "train": train, "test": test, "key": key,
+                          "result": result})
+
+    pending = [t for t in tasks if t["result"] is None]
+    args = [(fit_fold, t["config"], t["train"], list(t["test"]['ds'])) for t in pending]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_timed_fit, *zip(*args)))
+    else:
+        results = [_timed_fit(*a) for a in args]
+    for task, result in zip(pending, results):
+        task["result"], task["fitted"] = result, True
+        if cache:
+            cache.save(task["key"], result)
+
+    for t in tasks:
+        rows.append(pd.DataFrame({
+            "config": config_label(t["config"]),
+            "cutoff": t["cutoff"],
+            "ds": t["test"]['ds'].to_numpy(),
+            "y": t["test"]['y'].to_numpy(dtype=float),
+            "yhat": t["result"]["yhat"],
+            "fit_seconds": t["result"]["fit_seconds"],
+            "cached": not t.get("fitted", False),
+        }))
+    if not rows:
+        return pd.DataFrame(columns=["config", "cutoff", "ds", "y", "yhat", "fit_seconds", "cached"])
+    return pd.concat(rows, ignore_index=True)
+
+def leaderboard(results):
+    """Per config: folds, RMSE, MAPE (over non-zero actuals) and mean fit time, best RMSE first."""
+    def score(group):
+        error = group['yhat'] - group['y']
+        nonzero = group['y'] != 0
+        folds = group.drop_duplicates('cutoff')
+        return pd.Series({
+            "folds": len(folds),
+            "cached_folds": int(folds['cached'].sum()),
+            "rmse": float(np.sqrt(np.mean(error ** 2))),
+            "mape": float(np.mean(np.abs(error[nonzero] / group['y'][nonzero]))) if nonzero.any() else np.nan,
+            "mean_fit_seconds": float(folds['fit_seconds'].mean()),
+        })
+    board = results.groupby('config', sort=False)[['cutoff', 'y', 'yhat', 'fit_seconds', 'cached']].apply(score)
+    return board.sort_values(['rmse', 'mape', 'mean_fit_seconds']).reset_index()
+
+def save_best_config(path, config, board):
+    """Persist the winning config (with the leaderboard it won) for the production run."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = {
+        "config": config,
+        "selected_at": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+        "leaderboard": json.loads(board.to_json(orient="records")),
+    }
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_best_config(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)["config"]
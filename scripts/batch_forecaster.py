@@ -0,0 +1,74 @@
+"""
+Seasonal regression forecaster that fits many series at once.
+
+All series share the same timestamps, so they share one design matrix X (intercept, linear
+trend, weekly and daily Fourier terms, a holiday indicator) and the fit is a single least-squares
+solve X @ B = Y for the (time x series) matrix Y. Prediction intervals come from each series'
+residual variance, widened by the leverage of the future rows. Thousands of series fit in well
+under a second, against ~0.1-1 s per series for Prophet.
+"""
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import USFederalHolidayCalendar
+
+def fourier_terms(hours, period_hours, order):
+    """sin/cos pairs of orders 1..order for a period, given hours since a fixed epoch."""
+    phase = 2 * np.pi * hours[:, None] / period_hours * np.arange(1, order + 1)[None, :]
+    return np.hstack([np.sin(phase), np.cos(phase)])
+
+class BatchSeasonalForecaster:
+    def __init__(self, weekly_order=3, daily_order=0, holidays=True, interval_width=0.8, log=False):
+        """
+        daily_order > 0 only makes sense for hourly timestamps. With log=True the series are fitted
+        on log1p scale (multiplicative seasonality) and must be >= 0.
+        """
+        self.weekly_order = weekly_order
+        self.daily_order = daily_order
+        self.holidays = holidays
+        self.interval_width = interval_width
+        self.log = log
+
+    def design(self, ds):
+        ds = pd.DatetimeIndex(ds)
+        hours = ((ds - pd.Timestamp("2000-01-01")) / pd.Timedelta(hours=1)).to_numpy(dtype=float)
+        span = max((self.end - self.start) / pd.Timedelta(hours=1), 1.0)
+        columns = [np.ones(len(ds)), (ds - self.start) / pd.Timedelta(hours=1) / span]
+        if self.weekly_order:
+            columns.append(fourier_terms(hours, 24 * 7, self.weekly_order))
+        if self.daily_order:
+            columns.append(fourier_terms(hours, 24, self.daily_order))
+        if self.holidays:
+            days = ds.normalize()
+            holidays = USFederalHolidayCalendar().holidays(days.min(), days.max())
+            columns.append(days.isin(holidays).astype(float))
+        return np.column_stack(columns)
+
+    def fit(self, ds, Y):
+        """ds: timestamps (T); Y: values (T x n_series) without missing values."""
+        Y = np.asarray(Y, dtype=float)
+        Y = Y[:, None] if Y.ndim == 1 else Y
+        if np.isnan(Y).any():
+            raise ValueError("Y has missing values; fill them (e.g. 0 trips) before fitting")
+        ds = pd.DatetimeIndex(ds)
+        self.start, self.end = ds.min(), ds.max()
+        X = self.design(ds)
+        target = np.log1p(Y) if self.log else Y
+        self.coef, _, rank, _ = np.linalg.lstsq(X, target, rcond=None)
+        residuals = target - X @ self.coef
+        dof = max(len(ds) - rank, 1)
+        self.sigma2 = (residuals ** 2).sum(axis=0) / dof
+        self.xtx_inv = np.linalg.pinv(X.T @ X)
+        return self
+
+    def predict(self, ds):
+        """yhat, yhat_lower, yhat_upper, each (len(ds) x n_series)."""
+        X = self.design(ds)
+        mean = X @ self.coef
+        leverage = np.einsum('ij,jk,ik->i', X, self.xtx_inv, X)
+        z = NormalDist().inv_cdf(0.5 + self.interval_width / 2)
+        half_width = z * np.sqrt(self.sigma2[None, :] * (1 + leverage[:, None]))
+        lower, upper = mean - half_width, mean + half_width
+        if self.log:
+            mean, lower, upper = np.expm1(mean), np.expm1(lower), np.expm1(upper)
+        return {"yhat": mean, "yhat_lower": lower, "yhat_upper": upper}
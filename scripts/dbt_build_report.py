@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+# Configuration
+DB_USER = os.getenv("POSTGRES_USER", "admin")
+DB_PASS = os.getenv("POSTGRES_PASSWORD", "adminparams")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+DB_NAME = os.getenv("POSTGRES_DB", "analytics")
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+RUN_RESULTS = "dbt/target/run_results.json"
+
+# Heap + TOAST + indexes, summed over partitions for partitioned tables; views are 0
+SIZE_SQL = text("""
+    SELECT coalesce(
+        (SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(CAST(:rel AS regclass))),
+        pg_total_relation_size(CAST(:rel AS regclass))
+    )
+""")
+# Planner row estimates (current after the marts' ANALYZE post-hook)
+ROWS_SQL = text("""
+    SELECT coalesce(
+        (SELECT sum(c.reltuples) FROM pg_partition_tree(CAST(:rel AS regclass)) t
+         JOIN pg_class c ON c.oid = t.relid WHERE t.isleaf AND c.reltuples > 0),
+        (SELECT greatest(reltuples, 0) FROM pg_class WHERE oid = CAST(:rel AS regclass))
+    )
+""")
+
+def model_timings(run_results_path):
+    """(model name, relation, seconds) for every model in a dbt run_results.json."""
+    with open(run_results_path) as f:
+        run_results = json.load(f)
+    for result in run_results["results"]:
+        if result["unique_id"].startswith("model.") and result.get("relation_name"):
+            yield result["unique_id"].split(".")[-1], result["relation_name"], result["execution_time"]
+
+def relation_stats(engine, relation):
+    """(bytes, estimated rows) of a relation; relation names are dbt's quoted db.schema.name."""
+    relation = ".".join(relation.split(".")[-2:])
+    with engine.connect() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:rel)"), {"rel": relation}).scalar()
+        if exists is None:
+            return None, None
+        size = conn.execute(SIZE_SQL, {"rel": relation}).scalar()
+        rows = conn.execute(ROWS_SQL, {"rel": relation}).scalar()
+    return int(size), int(rows)
+
+def build_report(run_results_path, engine):
+    report = []
+    for model, relation, seconds in model_timings(run_results_path):
+        size, rows = relation_stats(engine, relation)
+        report.append({
+            "model": model,
+            "relation": relation,
+            "seconds": round(seconds, 2),
+            "bytes": size,
+            "rows": rows,
+            "bytes_per_row": round(size / rows, 1) if size and rows else None,
+        })
+    return report
+
+def print_report(report, baseline=None):
+    baseline = {r["model"]: r for r in baseline or []}
+    print(f"{'model':<30} {'seconds':>8} {'MiB':>9} {'B/row':>7}" + ("   vs baseline" if baseline else ""))
+    for r in report:
+        mib = (r["bytes"] or 0) / 1024 / 1024
+        line = f"{r['model']:<30} {r['seconds']:>8.2f} {mib:>9.1f} {r['bytes_per_row'] or '':>7}"
+        old = baseline.get(r["model"])
+        if old:
+            time_delta = r["seconds"] - old["seconds"]
+            size_delta = ((r["bytes"] or 0) - (old["bytes"] or 0)) / 1024 / 1024
+            line += f"   {time_delta:+.2f}s {size_delta:+.1f} MiB"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build time and on-disk size of every model in the last dbt run")
+    parser.add_argument("--run-results", type=str, default=RUN_RESULTS, help="dbt run_results.json")
+    parser.add_argument("--output", type=str, help="Save the report as JSON")
+    parser.add_argument("--baseline", type=str, help="Earlier report JSON to compare against")
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.run_results):
+        print(f"❌ {args.run_results} not found, run dbt first.")
+        sys.exit(1)
+
+    engine = create_engine(DATABASE_URL)
+    report = build_report(args.run_results, engine)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,75 @@ import argparse
 import requests
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import pyarrow.parquet as pq
 
 # Constants
-BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
-CHUNK_SIZE = 8192
+BASE_URL = os.getenv("TLC_BASE_URL", "https://d37ci6vzurychx.cloudfront.net/trip-data")
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = 60
+PARQUET_MAGIC = b"PAR1"
+
+def validate_parquet(path, expected_size=None):
+    """
+    Check that `path` is a complete parquet file: expected size, magic bytes at both ends,
+    a readable footer and a row count that matches its row groups. Returns the row count.
+    """
+    size = os.path.getsize(path)
+    if expected_size is not None and size != expected_size:
+        raise ValueError(f"size {size} != expected {expected_size}")
+    with open(path, "rb") as f:
+        head = f.read(4)
+        f.seek(-4, os.SEEK_END)
+        tail = f.read(4)
+    if head != PARQUET_MAGIC or tail != PARQUET_MAGIC:
+        raise ValueError("missing parquet magic bytes (truncated or not parquet)")
+    metadata = pq.ParquetFile(path).metadata
+    row_group_rows = sum(metadata.row_group(i).num_rows for i in range(metadata.num_row_groups))
+    if metadata.num_rows <= 0 or row_group_rows != metadata.num_rows:
+        raise ValueError(f"footer reports {metadata.num_rows} rows, row groups hold {row_group_rows}")
+    return metadata.num_rows
 
 def download_file(url, output_path):
+    """
+    Download `url` to `output_path` via `<name>.part`, resuming a previous partial download with an
+    HTTP Range request. The file is renamed into place only after it validates as parquet.
+    """
+    output_path = Path(output_path)
     fn = output_path.name
-    print(f"Downloading {fn}...")
+    part_path = output_path.with_name(fn + ".part")
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    print(f"Downloading {fn}" + (f" (resuming at {offset:,} bytes)..." if offset else "..."))
     try:
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(output_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
-                    f.write(chunk)
-        print(f"✅ Downloaded {fn}")
+        with requests.get(url, stream=True, headers=headers, timeout=TIMEOUT) as r:
+            if r.status_code == 416:
+                # Nothing left to fetch: the partial file already holds the whole object
+                expected_size = offset
+            else:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    # Server ignored the Range header; start over
+                    offset = 0
+                length = r.headers.get("Content-Length")
+                expected_size = offset + int(length) if length is not None else None
+                with open(part_path, "ab" if offset else "wb", buffering=CHUNK_SIZE) as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+        received = part_path.stat().st_size
+        if expected_size is not None and received < expected_size:
+            # Connection closed early: keep the .part file so the next run resumes it
+            print(f"❌ {fn} incomplete ({received:,}/{expected_size:,} bytes), will resume on next run")
+            return False
+        try:
+            rows = validate_parquet(part_path, expected_size)
+        except Exception as e:
+            part_path.unlink(missing_ok=True)
+            print(f"❌ {fn} failed validation, discarded: {e}")
+            return False
+        os.replace(part_path, output_path)
+        print(f"✅ Downloaded {fn} ({rows:,} rows)")
         return True
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
@@ -26,35 +79,45 @@ def download_file(url, output_path):
             print(f"❌ Error downloading {url}: {e}")
         return False
     except Exception as e:
+        # Connection dropped mid-transfer: keep the .part file so the next run resumes it
         print(f"❌ Error: {e}")
         return False
 
+def fetch_month(month, trip_type, output_dir, base_url=BASE_URL):
+    """Ensure one month is present and valid in output_dir. Returns True on success."""
+    filename = f"{trip_type}_tripdata_{month}.parquet"
+    output_path = Path(output_dir) / filename
+    
+    if output_path.exists():
+        try:
+            validate_parquet(output_path)
+            print(f"⏩ Skipping {filename}, already exists.")
+            return True
+        except Exception as e:
+            print(f"⚠️ Existing {filename} is invalid ({e}), downloading again.")
+            output_path.unlink()
+    
+    return download_file(f"{base_url}/{filename}", output_path)
+
+def download_months(months, trip_type="yellow", output_dir="data/raw", workers=4, base_url=BASE_URL):
+    """Download months concurrently with a bounded thread pool. Returns the number that succeeded."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(months)))) as pool:
+        results = pool.map(lambda m: fetch_month(m, trip_type, output_dir, base_url), months)
+        return sum(results)
+
 def main():
     parser = argparse.ArgumentParser(description="Download NYC TLC Trip Data")
     parser.add_argument("--months", type=str, required=True, help="Comma-separated YYYY-MM (e.g., 2024-01,2024-02)")
     parser.add_argument("--type", type=str, default="yellow", choices=["yellow", "green", "fhv"], help="Trip type")
     parser.add_argument("--output-dir", type=str, default="data/raw", help="Output directory")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
     
     args = parser.parse_args()
     
-    output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
     months = [m.strip() for m in args.months.split(",")]
     
-    success_count = 0
-    for month in months:
-        filename = f"{args.type}_tripdata_{month}.parquet"
-        url = f"{BASE_URL}/{filename}"
-        output_path = output_dir / filename
-        
-        if output_path.exists():
-            print(f"⏩ Skipping {filename}, already exists.")
-            success_count += 1
-            continue
-            
-        if download_file(url, output_path):
-            success_count += 1
+    success_count = download_months(months, args.type, args.output_dir, args.workers)
             
     if success_count == len(months):
         print(f"🎉 All {len(months)} files ready.")
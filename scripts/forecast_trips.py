@@ -1,13 +1,29 @@
+import argparse
+import io
 import os
+import time
+import uuid
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from datetime import datetime, timedelta
+from batch_forecaster import BatchSeasonalForecaster
+from backtest import FoldCache, backtest, config_label, leaderboard, load_best_config, save_best_config
+from model_store import MODEL_DIR, ModelStore, config_key, plan_fit, series_fingerprint
+from reconciliation import hierarchy_series, is_coherent, reconcile_ols
 
 # Usage:
-# python scripts/forecast_trips.py
+# python scripts/forecast_trips.py                       # city-wide, last 90 days (cached / warm-started)
+# python scripts/forecast_trips.py --refit               # city-wide, ignore the model store
+# python scripts/forecast_trips.py --mode backtest --workers 8   # pick the best config for the city model
+# python scripts/forecast_trips.py --mode zones --model batch     # all zones in one least-squares fit
+# python scripts/forecast_trips.py --mode zone_hourly             # hourly per zone (batch model)
+# python scripts/forecast_trips.py --mode compare                 # batch model vs Prophet, city-wide backtest
+# python scripts/forecast_trips.py --mode zones --workers 8 --start 2024-01-01 --end 2024-03-31
 
 # Configure Logging
 logging.basicConfig(
@@ -25,17 +41,48 @@ DB_NAME = os.getenv("POSTGRES_DB", "analytics")
 
 DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-def fetch_history(engine):
+DEFAULT_WINDOW_DAYS = 90
+# Zones with fewer non-zero days than this get a same-weekday average instead of Prophet
+MIN_PROPHET_DAYS = 14
+ZONE_FORECAST_TABLE = "forecast_trips_by_zone"
+ZONE_HOUR_FORECAST_TABLE = "forecast_trips_by_zone_hour"
+FORECAST_TABLE = "forecast_trips"
+# Part of the model store key: changing any of these invalidates cached models
+MODEL_CONFIG = {
+    "seasonality_mode": "multiplicative",
+    "weekly_fourier_order": 3,
+    "holidays": "US",
+}
+# Configurations compared by --mode backtest; the winner replaces MODEL_CONFIG for the city model
+CANDIDATE_CONFIGS = [
+    {"seasonality_mode": mode, "weekly_fourier_order": order, "holidays": holidays}
+    for mode, order, holidays in product(["additive", "multiplicative"], [3, 5], ["US", None])
+]
+BEST_CONFIG_PATH = MODEL_DIR / "best_config.json"
+# Batched least-squares model (batch_forecaster.py), daily and hourly
+BATCH_CONFIG = {"engine": "batch", "weekly_order": 3, "daily_order": 0, "holidays": True, "log": True}
+BATCH_HOURLY_CONFIG = {**BATCH_CONFIG, "daily_order": 6}
+
+def resolve_window(engine, start=None, end=None):
+    """[start, end] dates; by default the last DEFAULT_WINDOW_DAYS days in the daily mart."""
+    if end is None:
+        with engine.connect() as conn:
+            end = conn.execute(text("SELECT max(pickup_date) FROM dbt_dev_marts.mart_kpis_daily")).scalar()
+    end = pd.Timestamp(end)
+    start = pd.Timestamp(start) if start else end - pd.Timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    return start.date(), end.date()
+
+def fetch_history(engine, start, end):
     """Fetch daily trip counts from the KPI Mart."""
-    logger.info("⏳ Fetching historical data...")
-    query = """
+    logger.info(f"⏳ Fetching historical data ({start} to {end})...")
+    query = text("""
     SELECT pickup_date as ds, total_trips as y
     FROM dbt_dev_marts.mart_kpis_daily
-    WHERE pickup_date BETWEEN '2024-01-01' AND '2024-01-31'
+    WHERE pickup_date BETWEEN :start AND :end
     ORDER BY pickup_date ASC;
-    """
+    """)
     try:
-        df = pd.read_sql(query, engine)
+        df = pd.read_sql(query, engine, params={"start": start, "end": end})
         df['ds'] = pd.to_datetime(df['ds'])
         logger.info(f"✅ Loaded {len(df)} days of history. Range: {df['ds'].min()} to {df['ds'].max()}")
         return df
@@ -43,81 +90,437 @@ def fetch_history(engine):
         logger.error(f"Failed to fetch history: {e}")
         raise
 
-def evaluate_model(model):
-    """Run cross-validation and return performance metrics."""
+def fit_fold(config, train, future_ds):
+    """Fit one backtest fold and predict its test days (runs in a worker process)."""
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    if config.get('engine') == 'batch':
+        return batch_model(config).fit(train['ds'], train['y']).predict(future_ds)['yhat'][:, 0]
+    m = build_model(config).fit(train)
+    return m.predict(pd.DataFrame({'ds': future_ds}))['yhat'].to_numpy()
+
+def evaluate_model(df, config, horizon=7, workers=None):
+    """Backtest one config over rolling-origin folds (cached per fold); returns RMSE/MAPE or None."""
     logger.info("📐 Running Cross-Validation (Backtesting)...")
-    try:
-        # We only have 31 days.
-        # Train on first 21 days (Jan 1-21)
-        # Test on next 3 days. Move forward by 3 days.
-        # This gives us adequate folds within a single month.
-        df_cv = cross_validation(model, initial='21 days', period='3 days', horizon='3 days')
-        df_p = performance_metrics(df_cv)
-        
-        # Log average metrics
-        avg_rmse = df_p['rmse'].mean()
-        avg_mape = df_p['mape'].mean()
-        
-        logger.info(f"📊 Model Performance -> RMSE: {avg_rmse:.2f}, MAPE: {avg_mape:.2%}")
-        return df_p
-    except ValueError as e:
-        logger.warning(f"⚠️ Could not run cross-validation (likely too little data): {e}")
+    results = backtest(df, [config], fit_fold, horizon=horizon, workers=workers, cache=FoldCache())
+    if results.empty:
+        logger.warning(f"⚠️ Could not run cross-validation: {len(df)} days is too little history for a {horizon}-day fold.")
         return None
+    board = leaderboard(results).iloc[0]
+    logger.info(f"📊 Model Performance -> RMSE: {board['rmse']:.2f}, MAPE: {board['mape']:.2%} "
+                f"({int(board['folds'])} folds, {int(board['cached_folds'])} cached)")
+    return {'rmse': board['rmse'], 'mape': board['mape'], 'folds': int(board['folds'])}
 
-def generate_forecast(df, days=7):
-    """Train Prophet model and forecast future days."""
-    logger.info(f"🔮 Training Prophet model (Forecast Horizon: {days} days)...")
-    
+def batch_model(config=BATCH_CONFIG):
+    return BatchSeasonalForecaster(**{k: v for k, v in config.items() if k != 'engine'})
+
+def compare_models(df, horizon=7, workers=None):
+    """Backtest the batch model against the city Prophet config on the same folds."""
+    candidates = [model_config(), BATCH_CONFIG]
+    logger.info("🏁 Backtesting the batch model against Prophet on the city-wide series...")
+    results = backtest(df, candidates, fit_fold, horizon=horizon, workers=workers, cache=FoldCache())
+    if results.empty:
+        logger.warning(f"⚠️ {len(df)} days is too little history for a {horizon}-day fold.")
+        return None
+    board = leaderboard(results)
+    print(board.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    return board
+
+def model_config():
+    """Config of the city model: the last backtest winner, else MODEL_CONFIG."""
+    return load_best_config(BEST_CONFIG_PATH) or MODEL_CONFIG
+
+def run_backtest(df, horizon=7, workers=None):
+    """Compare CANDIDATE_CONFIGS, print the leaderboard and persist the winner."""
+    logger.info(f"🏁 Backtesting {len(CANDIDATE_CONFIGS)} configs on {workers} worker(s)...")
+    started = time.perf_counter()
+    results = backtest(df, CANDIDATE_CONFIGS, fit_fold, horizon=horizon, workers=workers, cache=FoldCache())
+    if results.empty:
+        logger.warning(f"⚠️ {len(df)} days is too little history for a {horizon}-day fold, keeping the current config.")
+        return None
+    board = leaderboard(results)
+    fitted = results.drop_duplicates(['config', 'cutoff'])
+    logger.info(f"⏱️ {len(fitted)} folds ({(~fitted['cached']).sum()} fitted) in {time.perf_counter() - started:.1f}s wall")
+    print(board.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    best = CANDIDATE_CONFIGS[[config_label(c) for c in CANDIDATE_CONFIGS].index(board['config'].iloc[0])]
+    save_best_config(BEST_CONFIG_PATH, best, board)
+    logger.info(f"🏆 Best config {board['config'].iloc[0]} saved to {BEST_CONFIG_PATH}.")
+    return best
+
+def build_model(config=MODEL_CONFIG):
     # Initialize with specialized settings
     m = Prophet(
         daily_seasonality=False, 
         yearly_seasonality=False,
-        seasonality_mode='multiplicative' # Traffic swings are percentage-based usually
+        seasonality_mode=config['seasonality_mode'] # Traffic swings are percentage-based usually
     )
-    m.add_seasonality(name='weekly', period=7, fourier_order=3)
+    m.add_seasonality(name='weekly', period=7, fourier_order=config['weekly_fourier_order'])
     
     # Feature 1: US Holidays
-    m.add_country_holidays(country_name='US')
-    
-    m.fit(df)
+    if config['holidays']:
+        m.add_country_holidays(country_name=config['holidays'])
+    return m
+
+def fitted_params(m):
+    """Fitted Stan parameters of a Prophet model, as JSON-friendly values (usable as a fit init)."""
+    params = {name: float(m.params[name][0][0]) for name in ('k', 'm', 'sigma_obs')}
+    params.update({name: m.params[name][0].tolist() for name in ('delta', 'beta')})
+    return params
+
+def fit_model(df, init=None, config=MODEL_CONFIG):
+    """Fit Prophet, warm-started from `init` when its shapes still match the new design."""
+    m = build_model(config)
+    if init is None:
+        return m.fit(df)
+    init = {name: np.asarray(value) if isinstance(value, list) else value for name, value in init.items()}
+    try:
+        return m.fit(df, init=init)
+    except (RuntimeError, ValueError) as e:
+        # e.g. a new holiday in the window adds a regressor, so beta has a different length
+        logger.warning(f"⚠️ Warm start failed ({e}); fitting from scratch.")
+        return build_model(config).fit(df)
+
+def generate_forecast(df, days=7, store=None, refit=False, workers=None):
+    """
+    Forecast the next `days` days. With a model store the fit is skipped when the training series
+    is unchanged and warm-started when days were only appended. Returns (forecast, fit_mode,
+    data_fingerprint, model_key).
+    """
+    config = model_config()
+    key = config_key({**config, 'horizon': days})
+    entry = store.load(key) if store and not refit else None
+    fit_mode = plan_fit(entry, df)
+    if fit_mode == 'cached':
+        logger.info(f"♻️ Training data unchanged since {entry['fitted_at']}: serving cached forecast (model {key}).")
+        result = pd.DataFrame(entry['forecast'])
+        result['ds'] = pd.to_datetime(result['ds'])
+        return result, fit_mode, entry['data_fingerprint'], key
+
+    started = time.perf_counter()
+    if fit_mode == 'warm':
+        logger.info(f"🔥 New days appended since {entry['fitted_at']}: warm-starting Prophet (Forecast Horizon: {days} days)...")
+        m = fit_model(df, init=entry['params'], config=config)
+    else:
+        logger.info(f"🔮 Training Prophet model (Forecast Horizon: {days} days)...")
+        m = fit_model(df, config=config)
+    logger.info(f"⏱️ Fit in {time.perf_counter() - started:.2f}s ({fit_mode}).")
     
-    # Validate
-    evaluate_model(m)
+    # Validate (only folds not seen before are fitted)
+    metrics = evaluate_model(df, config, horizon=days, workers=workers)
     
     # Future Dataframe
     future = m.make_future_dataframe(periods=days)
     forecast = m.predict(future)
     
     # Keep key columns
-    result = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(days)
+    result = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(days).reset_index(drop=True)
+    if store:
+        store.save(key, df, fitted_params(m), result, metrics)
     logger.info("✅ Forecast generated.")
-    return result
+    return result, fit_mode, series_fingerprint(df), key
 
-def save_forecast(engine, forecast_df):
-    """Save forecast results to Postgres."""
+def latest_run_key(engine):
+    """(data_fingerprint, model_key) of the latest saved forecast run (None if there is none)."""
+    with engine.connect() as conn:
+        has_runs = conn.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = 'model_key'"
+        ), {"table": FORECAST_TABLE}).first()
+        if has_runs is None:
+            return None
+        row = conn.execute(text(
+            f"SELECT data_fingerprint, model_key FROM {FORECAST_TABLE} ORDER BY forecast_run_date DESC LIMIT 1"
+        )).first()
+        return tuple(row) if row is not None else None
+
+def save_forecast(engine, forecast_df, fit_mode, data_fingerprint, model_key):
+    """Append the forecast as a new run; the latest view points at it."""
     logger.info("💾 Saving forecast to DB...")
     # Add metadata
-    forecast_df['forecast_run_date'] = datetime.now()
-    
-    forecast_df.to_sql('forecast_trips', engine, if_exists='replace', index=False)
-    logger.info("✅ Forecast saved to table 'forecast_trips'.")
+    forecast_df = forecast_df.assign(
+        forecast_run_date=datetime.now(),
+        run_id=str(uuid.uuid4()),
+        data_fingerprint=data_fingerprint,
+        model_key=model_key,
+        fit_mode=fit_mode,
+    )
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"""
+            CREATE TABLE IF NOT EXISTS {FORECAST_TABLE} (
+                ds TIMESTAMP,
+                yhat DOUBLE PRECISION,
+                yhat_lower DOUBLE PRECISION,
+                yhat_upper DOUBLE PRECISION,
+                forecast_run_date TIMESTAMP
+            );
+            -- tables written before runs were versioned only have the columns above
+            ALTER TABLE {FORECAST_TABLE} ADD COLUMN IF NOT EXISTS run_id UUID;
+            ALTER TABLE {FORECAST_TABLE} ADD COLUMN IF NOT EXISTS data_fingerprint VARCHAR(64);
+            ALTER TABLE {FORECAST_TABLE} ADD COLUMN IF NOT EXISTS model_key VARCHAR(16);
+            ALTER TABLE {FORECAST_TABLE} ADD COLUMN IF NOT EXISTS fit_mode VARCHAR(10); -- cold, warm, cached
+            CREATE INDEX IF NOT EXISTS idx_{FORECAST_TABLE}_run_date ON {FORECAST_TABLE} (forecast_run_date);
+            CREATE OR REPLACE VIEW {FORECAST_TABLE}_latest AS
+            SELECT * FROM {FORECAST_TABLE}
+            WHERE forecast_run_date = (SELECT max(forecast_run_date) FROM {FORECAST_TABLE});
+        """)
+        forecast_df.to_sql(FORECAST_TABLE, conn, if_exists='append', index=False)
+    logger.info(f"✅ Forecast run {forecast_df['run_id'].iloc[0]} saved to table '{FORECAST_TABLE}' (latest: '{FORECAST_TABLE}_latest').")
+
+def fetch_zone_history(engine, start, end):
+    """Daily trips per zone with its borough, in one query."""
+    logger.info(f"⏳ Fetching zone history ({start} to {end})...")
+    query = text("""
+    SELECT z.pickup_date as ds, z.pickup_location_id as zone, coalesce(d.borough, 'Unknown') as borough,
+           z.total_trips as y
+    FROM dbt_dev_marts.mart_kpis_by_zone_daily z
+    LEFT JOIN dbt_dev_marts.dim_taxi_zone d ON z.pickup_location_id = d.location_id
+    WHERE z.pickup_date BETWEEN :start AND :end
+    """)
+    df = pd.read_sql(query, engine, params={"start": start, "end": end})
+    df['ds'] = pd.to_datetime(df['ds'])
+    logger.info(f"✅ Loaded {len(df):,} rows for {df['zone'].nunique()} zones.")
+    return df
+
+def seasonal_naive(dates, y, horizon):
+    """Same-weekday average of the last 4 weeks, with a +-2 sigma band from the day-to-day residuals."""
+    history = pd.Series(y, index=dates)
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    recent = history.iloc[-28:]
+    by_dow = recent.groupby(recent.index.dayofweek).mean()
+    yhat = np.array([by_dow.get(d.dayofweek, recent.mean()) for d in future])
+    sigma = (recent - recent.groupby(recent.index.dayofweek).transform('mean')).std()
+    sigma = 0.0 if np.isnan(sigma) else sigma
+    return yhat, yhat - 2 * sigma, yhat + 2 * sigma
+
+def fit_node(node, dates, y, horizon):
+    """Fit one node's base forecast (runs in a worker process). Returns arrays and the fit time."""
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    started = time.perf_counter()
+    method = 'prophet'
+    if np.count_nonzero(y) < MIN_PROPHET_DAYS:
+        method = 'seasonal_naive'
+        yhat, lower, upper = seasonal_naive(dates, y, horizon)
+    else:
+        try:
+            m = build_model()
+            m.fit(pd.DataFrame({'ds': dates, 'y': y}))
+            forecast = m.predict(m.make_future_dataframe(periods=horizon)).tail(horizon)
+            yhat, lower, upper = (forecast[c].to_numpy() for c in ('yhat', 'yhat_lower', 'yhat_upper'))
+        except Exception:
+            method = 'seasonal_naive'
+            yhat, lower, upper = seasonal_naive(dates, y, horizon)
+    return {
+        "node": node, "method": method, "yhat": yhat, "yhat_lower": lower, "yhat_upper": upper,
+        "fit_seconds": time.perf_counter() - started,
+    }
+
+def fit_nodes_batch(nodes, dates, values, horizon):
+    """Base forecasts of every node from one batched least-squares fit (fit time is shared equally)."""
+    started = time.perf_counter()
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    pred = batch_model(BATCH_CONFIG).fit(dates, values.T).predict(future)
+    fit_seconds = (time.perf_counter() - started) / len(nodes)
+    return [
+        {"node": node, "method": "batch", "yhat": pred['yhat'][:, i], "yhat_lower": pred['yhat_lower'][:, i],
+         "yhat_upper": pred['yhat_upper'][:, i], "fit_seconds": fit_seconds}
+        for i, node in enumerate(nodes)
+    ]
+
+def forecast_zones(zone_df, start, end, horizon=7, workers=None, model='prophet'):
+    """
+    Base forecasts for every zone, borough and the city, then OLS reconciled so zones sum to
+    boroughs and boroughs to the city. Intervals are shifted by the same adjustment as their point
+    forecast. model='prophet' fits one Prophet per node across a process pool, model='batch' fits
+    all nodes at once. Returns (forecast frame, per-node fit report).
+    """
+    nodes, S, dates, values = hierarchy_series(zone_df, start, end)
+    workers = workers or os.cpu_count() or 1
+    if model == 'batch':
+        logger.info(f"🔮 Fitting {len(nodes)} series ({S.shape[1]} zones) in one batched least-squares fit...")
+        fits = fit_nodes_batch(nodes, dates, values, horizon)
+    else:
+        logger.info(f"🔮 Fitting {len(nodes)} models ({S.shape[1]} zones) on {workers} worker(s)...")
+        args = [(node, dates, values[i], horizon) for i, node in enumerate(nodes)]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                fits = list(pool.map(fit_node, *zip(*args), chunksize=4))
+        else:
+            fits = [fit_node(*a) for a in args]
+
+    base = np.vstack([f['yhat'] for f in fits])
+    reconciled = reconcile_ols(S, base)
+    assert is_coherent(S, reconciled)
+    adjustment = reconciled - base
+
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq='D')
+    frames = []
+    for i, fit in enumerate(fits):
+        level, key = fit['node']
+        frames.append(pd.DataFrame({
+            'level': level,
+            'node': str(key),
+            'ds': future.date,
+            'yhat': reconciled[i],
+            'yhat_lower': fit['yhat_lower'] + adjustment[i],
+            'yhat_upper': fit['yhat_upper'] + adjustment[i],
+            'yhat_base': base[i],
+            'method': fit['method'],
+        }))
+    report = pd.DataFrame({
+        'level': [f['node'][0] for f in fits],
+        'node': [str(f['node'][1]) for f in fits],
+        'method': [f['method'] for f in fits],
+        'fit_seconds': [f['fit_seconds'] for f in fits],
+    })
+    return pd.concat(frames, ignore_index=True), report
+
+def copy_replace(engine, forecast_df, table, columns_ddl):
+    """Replace the contents of a forecast table with COPY in one transaction."""
+    forecast_df = forecast_df.assign(forecast_run_date=datetime.now())
+    buffer = io.StringIO()
+    forecast_df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns_ddl}, forecast_run_date TIMESTAMP)")
+            cursor.execute(f"TRUNCATE {table}")
+            cursor.copy_expert(f"COPY {table} ({', '.join(forecast_df.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def save_zone_forecast(engine, forecast_df):
+    logger.info(f"💾 Saving {len(forecast_df):,} zone forecast rows to DB...")
+    copy_replace(engine, forecast_df, ZONE_FORECAST_TABLE, """
+        level VARCHAR(20) NOT NULL, -- city, borough, zone
+        node VARCHAR(100) NOT NULL, -- 'all', borough name or zone id
+        ds DATE NOT NULL,
+        yhat NUMERIC,
+        yhat_lower NUMERIC,
+        yhat_upper NUMERIC,
+        yhat_base NUMERIC, -- before reconciliation
+        method VARCHAR(20)
+    """)
+    logger.info(f"✅ Forecast saved to table '{ZONE_FORECAST_TABLE}'.")
+
+def fetch_zone_hour_history(engine, start, end):
+    """Hourly trips per zone from the trips cube, in one query."""
+    logger.info(f"⏳ Fetching hourly zone history ({start} to {end})...")
+    query = text("""
+    SELECT pickup_date as ds, pickup_hour as hour, pickup_location_id as zone, sum(trip_count) as y
+    FROM dbt_dev_marts.fact_trips_cube
+    WHERE pickup_date BETWEEN :start AND :end
+    GROUP BY 1, 2, 3
+    """)
+    df = pd.read_sql(query, engine, params={"start": start, "end": end})
+    df['ds'] = pd.to_datetime(df['ds']) + pd.to_timedelta(df['hour'], unit='h')
+    logger.info(f"✅ Loaded {len(df):,} rows for {df['zone'].nunique()} zones.")
+    return df.drop(columns='hour')
+
+def forecast_zone_hours(zone_hour_df, start, end, horizon=7):
+    """Hourly forecasts for every zone for the next `horizon` days, from one batched fit."""
+    first = max(pd.Timestamp(start), zone_hour_df['ds'].min().normalize())
+    hours = pd.date_range(first, pd.Timestamp(end) + pd.Timedelta(hours=23), freq='h')
+    wide = zone_hour_df.pivot_table(index='ds', columns='zone', values='y', aggfunc='sum').reindex(hours).fillna(0)
+    future = pd.date_range(hours[-1] + pd.Timedelta(hours=1), periods=24 * horizon, freq='h')
+    started = time.perf_counter()
+    pred = batch_model(BATCH_HOURLY_CONFIG).fit(hours, wide.to_numpy(dtype=float)).predict(future)
+    logger.info(f"⏱️ {wide.shape[1]} hourly series x {len(hours):,} hours fitted in {time.perf_counter() - started:.2f}s")
+    n_zones = wide.shape[1]
+    return pd.DataFrame({
+        'zone': np.tile(wide.columns.to_numpy(), len(future)),
+        'ds': np.repeat(future.to_numpy(), n_zones),
+        **{col: np.clip(pred[col], 0, None).ravel() for col in ('yhat', 'yhat_lower', 'yhat_upper')},
+    })
+
+def save_zone_hour_forecast(engine, forecast_df):
+    logger.info(f"💾 Saving {len(forecast_df):,} hourly zone forecast rows to DB...")
+    copy_replace(engine, forecast_df, ZONE_HOUR_FORECAST_TABLE, """
+        zone INTEGER NOT NULL,
+        ds TIMESTAMP NOT NULL,
+        yhat NUMERIC,
+        yhat_lower NUMERIC,
+        yhat_upper NUMERIC
+    """)
+    logger.info(f"✅ Forecast saved to table '{ZONE_HOUR_FORECAST_TABLE}'.")
+
+def log_fit_report(report, wall_seconds, workers):
+    zones = report[report['level'] == 'zone']
+    logger.info(
+        f"⏱️ Per-zone fit: mean {zones['fit_seconds'].mean():.2f}s, p95 {zones['fit_seconds'].quantile(0.95):.2f}s, "
+        f"max {zones['fit_seconds'].max():.2f}s; {(zones['method'] == 'seasonal_naive').sum()} zone(s) on the seasonal-naive fallback"
+    )
+    for row in report.nlargest(5, 'fit_seconds').itertuples():
+        logger.info(f"   slowest: {row.level} {row.node} {row.fit_seconds:.2f}s ({row.method})")
+    serial = report['fit_seconds'].sum()
+    logger.info(
+        f"⏱️ {len(report)} models in {wall_seconds:.1f}s wall on {workers} worker(s) / {os.cpu_count()} core(s); "
+        f"sum of fit times {serial:.1f}s, speedup {serial / wall_seconds:.1f}x"
+    )
 
 def main():
+    parser = argparse.ArgumentParser(description="Forecast daily trips city-wide or per zone")
+    parser.add_argument("--mode", choices=["city", "zones", "zone_hourly", "backtest", "compare"], default="city",
+                        help="city: one model on mart_kpis_daily; zones: per-zone models reconciled with boroughs and city; "
+                             "zone_hourly: hourly per-zone batch model; backtest: compare candidate configs for the city "
+                             "model and keep the best; compare: batch model vs Prophet on the city series")
+    parser.add_argument("--model", choices=["prophet", "batch"], default="prophet", help="Model for --mode zones")
+    parser.add_argument("--start", type=str, help="First history date (default: end - 89 days)")
+    parser.add_argument("--end", type=str, help="Last history date (default: latest date in the mart)")
+    parser.add_argument("--horizon", type=int, default=7, help="Days to forecast")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes fitting zone models and backtest folds")
+    parser.add_argument("--model-dir", type=str, default=str(MODEL_DIR), help="Model store directory (city mode)")
+    parser.add_argument("--refit", action="store_true", help="Ignore the model store and fit from scratch")
+    args = parser.parse_args()
+
     try:
         engine = create_engine(DATABASE_URI)
+        start, end = resolve_window(engine, args.start, args.end)
+
+        if args.mode == "zones":
+            started = time.perf_counter()
+            zone_df = fetch_zone_history(engine, start, end)
+            forecast_df, report = forecast_zones(zone_df, start, end, args.horizon, args.workers, args.model)
+            log_fit_report(report, time.perf_counter() - started, args.workers)
+            print(forecast_df[forecast_df['level'] != 'zone'])
+            save_zone_forecast(engine, forecast_df)
+            return
+
+        if args.mode == "zone_hourly":
+            zone_hour_df = fetch_zone_hour_history(engine, start, end)
+            forecast_df = forecast_zone_hours(zone_hour_df, start, end, args.horizon)
+            save_zone_hour_forecast(engine, forecast_df)
+            return
         
         # 1. Get Data
-        history_df = fetch_history(engine)
+        history_df = fetch_history(engine, start, end)
+
+        if args.mode == "backtest":
+            run_backtest(history_df, args.horizon, args.workers)
+            return
+
+        if args.mode == "compare":
+            compare_models(history_df, args.horizon, args.workers)
+            return
         
         if len(history_df) < 14:
             logger.warning("⚠️ Not enough data to forecast reliably (need 2+ weeks). Running anyway for demo.")
         
         # 2. Forecast
-        forecast_df = generate_forecast(history_df, days=7)
+        forecast_df, fit_mode, fingerprint, model_key = generate_forecast(
+            history_df, days=args.horizon, store=ModelStore(args.model_dir), refit=args.refit, workers=args.workers)
         print(forecast_df)
         
-        # 3. Save
-        save_forecast(engine, forecast_df)
+        # 3. Save (a cached forecast is already the latest run unless the table was reset
+        #    or a run of another model config was saved since)
+        if fit_mode == 'cached' and latest_run_key(engine) == (fingerprint, model_key):
+            logger.info("✅ Latest forecast run is already up to date, nothing to save.")
+            return
+        save_forecast(engine, forecast_df, fit_mode, fingerprint, model_key)
         
     except Exception as e:
         logger.error(f"❌ Forecasting failed: {e}")
@@ -1,8 +1,10 @@
 import os
-import pandas as pd
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.sql import text
+from pathlib import Path
+import pyarrow.parquet as pq
+from download_tlc_parquet import fetch_month
+from load_parquet_to_postgres import load_files
+from sampling import sample_parquet
 
 # Configuration
 YEAR = 2024
@@ -10,14 +12,11 @@ MONTH = 1
 # 10% Sample ensures we fit comfortably in 500MB limit (300k rows)
 SAMPLE_FRACTION = 0.1 
 BASE_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data"
-
-# Database Connection
-DB_USER = os.getenv("POSTGRES_USER", "admin")
-DB_PASS = os.getenv("POSTGRES_PASSWORD", "adminparams")
-DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
-DB_PORT = os.getenv("POSTGRES_PORT", "5432")
-DB_NAME = os.getenv("POSTGRES_DB", "analytics")
-DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+RAW_DIR = "data/raw"
+# Keep at least this many trips for every (pickup date, pickup zone) so small zones survive sampling
+MIN_PER_STRATUM = 1
+# The sample keeps the monthly filename so it replaces that month's partition in raw.yellow_trips
+SAMPLE_DIR = "data/raw/production_sample"
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -26,35 +25,40 @@ def get_url(year, month):
     return f"{BASE_URL}/yellow_tripdata_{year}-{month:02d}.parquet"
 
 def main():
-    engine = create_engine(DATABASE_URI)
-    
     logger.info(f"🚀 Starting Production Snapshot Ingestion ({YEAR}-{MONTH:02d})")
     logger.info(f"🎯 Sampling Rate: {SAMPLE_FRACTION*100}% (Optimized for Free Tier)")
 
     url = get_url(YEAR, MONTH)
     try:
-        logger.info(f"   ⬇️ Downloading data from {url}...")
-        df = pd.read_parquet(url)
+        # Downloads (or resumes) only if the local copy is missing or fails validation
+        logger.info(f"   ⬇️ Fetching data from {url}...")
+        Path(RAW_DIR).mkdir(parents=True, exist_ok=True)
+        if not fetch_month(f"{YEAR}-{MONTH:02d}", "yellow", RAW_DIR):
+            raise RuntimeError(f"Download of {url} failed")
+        source_path = Path(RAW_DIR) / f"yellow_tripdata_{YEAR}-{MONTH:02d}.parquet"
         
-        # Sample
-        original_len = len(df)
-        df_sampled = df.sample(frac=SAMPLE_FRACTION, random_state=42)
-        sampled_len = len(df_sampled)
+        # Sample: stream row groups through a seeded Bernoulli draw, stratified by date and zone
+        original_len = pq.ParquetFile(source_path).metadata.num_rows
+        sample = sample_parquet(
+            source_path,
+            fraction=SAMPLE_FRACTION,
+            stratify_by=["pickup_date", "pickup_zone"],
+            min_per_stratum=MIN_PER_STRATUM,
+            seed=42,
+        )
+        sampled_len = sample.num_rows
         
         logger.info(f"   ✂️ Reduced rows from {original_len:,} to {sampled_len:,}")
         
-        # Clean Columns
-        df_sampled.columns = [c.lower() for c in df_sampled.columns]
-        
-        # Load Strategy: Drop Cascade (Kill Old Schema) -> Replace (New Schema)
-        # This handles the migration from MixedCase to lowercase columns
-        with engine.begin() as conn:
-            logger.info("   🔥 Dropping table 'raw.yellow_trips' (CASCADE) to allow schema update...")
-            conn.execute(text("DROP TABLE IF EXISTS raw.yellow_trips CASCADE;"))
+        # Load Strategy: write the sample as the month's file and let the loader swap that
+        # month's partition. The manifest makes re-runs of an identical sample a no-op,
+        # and dbt views on raw.yellow_trips are left in place.
+        os.makedirs(SAMPLE_DIR, exist_ok=True)
+        sample_path = os.path.join(SAMPLE_DIR, f"yellow_tripdata_{YEAR}-{MONTH:02d}.parquet")
+        pq.write_table(sample, sample_path)
         
-        logger.info(f"   💾 Loading {len(df_sampled):,} rows to Postgres (Chunked)...")
-        # Use replace since we just dropped it, but 'replace' handles creation.
-        df_sampled.to_sql('yellow_trips', engine, schema='raw', if_exists='replace', index=False, chunksize=10000) 
+        logger.info(f"   💾 Loading {sampled_len:,} rows to Postgres (partition replace)...")
+        load_files([sample_path], "yellow_trips")
         
         logger.info("✅ Snapshot Ingestion Complete. Ready for Production.")
         
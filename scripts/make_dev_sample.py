@@ -1,32 +1,60 @@
 import argparse
-import pandas as pd
+import pyarrow.parquet as pq
 from pathlib import Path
 import os
+from sampling import sample_batches, sample_parquet, STRATA
+from parquet_lake import iter_lake_batches
 
 def main():
     parser = argparse.ArgumentParser(description="Create a dev sample from a parquet file")
-    parser.add_argument("--input", type=str, required=True, help="Input parquet file path")
+    parser.add_argument("--input", type=str, help="Input parquet file path")
+    parser.add_argument("--lake", type=str, help="Sample from this parquet lake instead of --input")
+    parser.add_argument("--start", type=str, default=None, help="With --lake: first pickup date (inclusive)")
+    parser.add_argument("--end", type=str, default=None, help="With --lake: last pickup date (exclusive)")
     parser.add_argument("--output", type=str, default="data/raw/yellow_tripdata_sample.parquet", help="Output sample path")
     parser.add_argument("--rows", type=int, default=100000, help="Number of rows to sample")
+    parser.add_argument("--columns", type=str, default=None, help="Comma-separated columns to keep (default: all)")
+    parser.add_argument("--stratify", type=str, default=None, help=f"Comma-separated strata to preserve: {', '.join(STRATA)}")
+    parser.add_argument("--min-per-stratum", type=int, default=1, help="Rows always kept per stratum when stratifying")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
     
     args = parser.parse_args()
     
-    if not os.path.exists(args.input):
+    if not args.lake and not (args.input and os.path.exists(args.input)):
         print(f"❌ Input file {args.input} does not exist.")
         exit(1)
+    
+    columns = args.columns.split(",") if args.columns else None
+    stratify_by = args.stratify.split(",") if args.stratify else None
         
-    print(f"Reading {args.input}...")
+    print(f"Streaming {args.lake or args.input}...")
     try:
-        # Use pyarrow to read efficiently, but pandas read_parquet is usually fine for 1 month
-        df = pd.read_parquet(args.input)
-        
-        sample_size = min(len(df), args.rows)
-        print(f"Sampling {sample_size} rows from {len(df)} total rows...")
-        
-        df_sample = df.sample(n=sample_size, random_state=42)
+        # Row groups are streamed through a seeded reservoir, so memory is bounded by the sample size
+        if args.lake:
+            # Only the partitions in [start, end) and the needed columns are read from the lake
+            read_columns = None
+            if columns:
+                read_columns = columns + [STRATA[s][0] for s in stratify_by or [] if STRATA[s][0] not in columns]
+            batches = iter_lake_batches(args.lake, columns=read_columns, start=args.start, end=args.end)
+            df_sample = sample_batches(
+                batches, rows=args.rows, columns=columns, stratify_by=stratify_by,
+                min_per_stratum=args.min_per_stratum, seed=args.seed,
+            )
+        else:
+            total_rows = pq.ParquetFile(args.input).metadata.num_rows
+            print(f"Sampling {min(total_rows, args.rows)} rows from {total_rows} total rows...")
+            df_sample = sample_parquet(
+                args.input,
+                rows=args.rows,
+                columns=columns,
+                stratify_by=stratify_by,
+                min_per_stratum=args.min_per_stratum,
+                seed=args.seed,
+            )
         
-        df_sample.to_parquet(args.output)
-        print(f"✅ Created sample at {args.output}")
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(df_sample, args.output)
+        print(f"✅ Created sample of {df_sample.num_rows} rows at {args.output}")
         
     except Exception as e:
         print(f"❌ Error creating sample: {e}")
@@ -0,0 +1,77 @@
+"""
+File-based store of fitted forecast models, one JSON entry per model configuration.
+
+An entry keeps the training series, the fitted parameters, the forecast and its backtest
+metrics. The next run compares its training series with the entry:
+  - same series: the stored forecast is served, nothing is fitted;
+  - the old series plus newly appended days (the window may also have slid forward): the fit is
+    warm-started from the stored parameters;
+  - anything else (history revised, config changed, no entry): full fit.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+MODEL_DIR = Path(os.getenv("FORECAST_MODEL_DIR", Path(__file__).resolve().parent.parent / "models" / "forecast"))
+
+def series_fingerprint(df):
+    """SHA-256 over the (ds, y) rows of a training series."""
+    digest = hashlib.sha256()
+    for ds, y in zip(pd.to_datetime(df['ds']), df['y']):
+        digest.update(f"{ds.date().isoformat()},{float(y)!r}\n".encode())
+    return digest.hexdigest()
+
+def config_key(config):
+    """Short stable hash of a model configuration dict."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def plan_fit(entry, df):
+    """'cached', 'warm' or 'cold' for training series `df` given the stored entry (or None)."""
+    if entry is None:
+        return "cold"
+    if entry["data_fingerprint"] == series_fingerprint(df):
+        return "cached"
+    old = pd.Series(dict(entry["history"]), dtype=float)
+    old.index = pd.to_datetime(old.index)
+    new = pd.Series(df['y'].to_numpy(dtype=float), index=pd.to_datetime(df['ds']))
+    if new.index.min() < old.index.min() or new.index.max() <= old.index.max():
+        return "cold"
+    overlap = new[new.index <= old.index.max()]
+    if overlap.index.equals(old[old.index >= new.index.min()].index) and (overlap == old[overlap.index]).all():
+        return "warm"
+    return "cold"
+
+class ModelStore:
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = Path(model_dir)
+
+    def path(self, key):
+        return self.model_dir / f"{key}.json"
+
+    def load(self, key):
+        path = self.path(key)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def save(self, key, df, params, forecast, metrics=None):
+        """Replace the entry of `key` with a freshly fitted model (written atomically)."""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "fitted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "data_fingerprint": series_fingerprint(df),
+            "history": [[ds.date().isoformat(), float(y)] for ds, y in zip(pd.to_datetime(df['ds']), df['y'])],
+            "params": params,
+            "forecast": json.loads(forecast.to_json(orient="records", date_format="iso")),
+            "metrics": metrics,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        return entry
@@ -0,0 +1,164 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import shutil
+import sys
+import time
+from collections import namedtuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+# Local hive-partitioned copy of the TLC months:
+#   data/lake/yellow_trips/pickup_date=2024-01-15/vendor_id=2/2024-01-0.parquet
+LAKE_DIR = "data/lake/yellow_trips"
+PICKUP_COLUMN = "tpep_pickup_datetime"
+PARTITIONING = ds.partitioning(
+    pa.schema([("pickup_date", pa.date32()), ("vendor_id", pa.int32())]),
+    flavor="hive",
+)
+PARTITION_COLUMNS = PARTITIONING.schema.names
+COMPRESSION = "zstd"
+MAX_ROWS_PER_GROUP = 128 * 1024
+
+# A month of the lake used as a load source in place of the monthly file
+LakeMonth = namedtuple("LakeMonth", ["lake_dir", "month", "trip_type"])
+
+def month_bounds(month):
+    """[start, end) timestamps of a YYYY-MM month."""
+    start = pd.Timestamp(f"{month}-01")
+    return start, start + pd.offsets.MonthBegin(1)
+
+def month_from_path(file_path):
+    match = re.search(r"(\d{4}-\d{2})", os.path.basename(file_path))
+    if not match:
+        raise ValueError(f"Cannot infer YYYY-MM from {file_path}")
+    return match.group(1)
+
+def build_month(file_path, lake_dir=LAKE_DIR):
+    """
+    Rewrite one monthly TLC file into the lake, sorted by pickup time and zstd-compressed.
+    Trips whose pickup falls outside the file's month are dropped here. Re-running first
+    removes every pickup_date directory of the month, so dates or vendors missing from the
+    new file do not linger. Returns (rows written, rows dropped).
+    """
+    month = month_from_path(file_path)
+    start, end = month_bounds(month)
+    table = pq.read_table(file_path, memory_map=True)
+    pickup = table.column(PICKUP_COLUMN)
+    unit = pickup.type.unit
+    in_month = pc.and_(
+        pc.greater_equal(pickup, pa.scalar(start, type=pa.timestamp(unit))),
+        pc.less(pickup, pa.scalar(end, type=pa.timestamp(unit))),
+    )
+    kept = table.filter(in_month).sort_by(PICKUP_COLUMN)
+    kept = kept.append_column("pickup_date", pc.cast(kept.column(PICKUP_COLUMN), pa.date32()))
+    kept = kept.append_column("vendor_id", pc.cast(kept.column("VendorID"), pa.int32()))
+
+    for partition in glob.glob(os.path.join(lake_dir, f"pickup_date={month}-*")):
+        shutil.rmtree(partition)
+    ds.write_dataset(
+        kept,
+        lake_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"{month}-{{i}}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION),
+        max_rows_per_group=MAX_ROWS_PER_GROUP,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return kept.num_rows, table.num_rows - kept.num_rows
+
+def open_lake(lake_dir=LAKE_DIR):
+    """Open the lake as a pyarrow dataset over memory-mapped local files."""
+    return ds.dataset(
+        lake_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+def date_filter(start=None, end=None):
+    """Partition filter for pickup dates in [start, end)."""
+    expr = None
+    if start is not None:
+        expr = ds.field("pickup_date") >= pd.Timestamp(start).date()
+    if end is not None:
+        upper = ds.field("pickup_date") < pd.Timestamp(end).date()
+        expr = upper if expr is None else expr & upper
+    return expr
+
+def iter_lake_batches(lake_dir=LAKE_DIR, columns=None, start=None, end=None, batch_rows=100_000):
+    """
+    Stream record batches for pickup dates in [start, end), reading only matching partitions and
+    the requested columns. Without `columns`, the original TLC columns are returned (no partition
+    columns). Fragments are visited in path order so the stream is deterministic.
+    """
+    dataset = open_lake(lake_dir)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+    expr = date_filter(start, end)
+    fragments = sorted(dataset.get_fragments(filter=expr), key=lambda f: f.path)
+    for fragment in fragments:
+        scanner = ds.Scanner.from_fragment(
+            fragment, schema=dataset.schema, columns=columns, filter=expr, batch_size=batch_rows,
+        )
+        yield from scanner.to_batches()
+
+def scan_lake(columns=None, start=None, end=None, lake_dir=LAKE_DIR):
+    """Read a projected, date-filtered slice of the lake into one Arrow table (ad-hoc analysis)."""
+    return open_lake(lake_dir).to_table(columns=columns, filter=date_filter(start, end))
+
+def month_fragments(lake_month):
+    """Sorted data files holding one month of the lake."""
+    pattern = os.path.join(lake_month.lake_dir, f"pickup_date={lake_month.month}-*", "*", "*.parquet")
+    return sorted(glob.glob(pattern))
+
+def month_fingerprint(lake_month, chunk_size=1024 * 1024):
+    """SHA-256 over the relative paths and bytes of a month's data files."""
+    digest = hashlib.sha256()
+    for path in month_fragments(lake_month):
+        digest.update(os.path.relpath(path, lake_month.lake_dir).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def month_stats(lake_month):
+    """(rows, row groups) of a lake month, from parquet footers only."""
+    rows = row_groups = 0
+    for path in month_fragments(lake_month):
+        metadata = pq.ParquetFile(path).metadata
+        rows += metadata.num_rows
+        row_groups += metadata.num_row_groups
+    return rows, row_groups
+
+def iter_month_batches(lake_month, batch_rows=100_000):
+    start, end = month_bounds(lake_month.month)
+    return iter_lake_batches(lake_month.lake_dir, start=start, end=end, batch_rows=batch_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite downloaded TLC months into the local parquet lake")
+    parser.add_argument("--file", type=str, nargs="+", required=True, help="Monthly parquet file path(s) or glob(s)")
+    parser.add_argument("--lake-dir", type=str, default=LAKE_DIR, help="Lake root directory")
+
+    args = parser.parse_args()
+
+    files = sorted({f for pattern in args.file for f in glob.glob(pattern)})
+    if not files:
+        print(f"❌ No files match {args.file}")
+        sys.exit(1)
+
+    for file_path in files:
+        start = time.perf_counter()
+        rows, dropped = build_month(file_path, args.lake_dir)
+        print(f"✅ {os.path.basename(file_path)}: {rows:,} rows to {args.lake_dir} "
+              f"({dropped:,} out-of-month rows dropped) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# Forecast hierarchy: city -> borough -> zone. Nodes are ordered top-down:
+#   [("city", "all"), ("borough", b1), ..., ("zone", z1), ...]
+# Zones are the bottom level; every other node is a sum of zones.
+
+def hierarchy(zone_boroughs):
+    """
+    Node keys and summing matrix S (n_nodes x n_zones) for zones given as {zone: borough}.
+    Row i of S says which zones add up to node i.
+    """
+    zones = sorted(zone_boroughs)
+    boroughs = sorted(set(zone_boroughs.values()))
+    nodes = [("city", "all")] + [("borough", b) for b in boroughs] + [("zone", z) for z in zones]
+    S = np.zeros((len(nodes), len(zones)))
+    S[0, :] = 1
+    for j, zone in enumerate(zones):
+        S[1 + boroughs.index(zone_boroughs[zone]), j] = 1
+    S[1 + len(boroughs):, :] = np.eye(len(zones))
+    return nodes, S
+
+def hierarchy_series(zone_df, start, end):
+    """
+    History of every node of the city -> borough -> zone hierarchy on a full daily index from the
+    first day with data (later days without trips are 0). Returns (nodes, S, dates, values[node, day]).
+    """
+    dates = pd.date_range(max(pd.Timestamp(start), zone_df['ds'].min()), end, freq='D')
+    wide = zone_df.pivot_table(index='zone', columns='ds', values='y', aggfunc='sum').reindex(columns=dates).fillna(0)
+    zone_boroughs = zone_df.groupby('zone')['borough'].first().to_dict()
+    nodes, S = hierarchy(zone_boroughs)
+    bottom = wide.reindex(sorted(zone_boroughs)).to_numpy(dtype=float)
+    return nodes, S, dates, S @ bottom
+
+def reconcile_ols(S, base):
+    """
+    OLS reconciliation: project independent base forecasts (n_nodes x horizon) onto the space of
+    coherent forecasts, y~ = S (S'S)^-1 S' y^. The result sums up the hierarchy exactly and is
+    the coherent forecast closest to the base forecasts in the least-squares sense.
+    """
+    bottom, *_ = np.linalg.lstsq(S, base, rcond=None)
+    return S @ bottom
+
+def is_coherent(S, forecasts, atol=1e-6):
+    """Whether every aggregate node equals the sum of its zones."""
+    n_bottom = S.shape[1]
+    return np.allclose(S @ forecasts[-n_bottom:], forecasts, atol=atol)
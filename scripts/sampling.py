@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Rows decoded per step. Together with the sample size this bounds peak memory.
+BATCH_ROWS = 100_000
+
+# Stratum name -> (source column, derivation)
+STRATA = {
+    "pickup_date": ("tpep_pickup_datetime", lambda col: pc.cast(col, pa.date32())),
+    "pickup_zone": ("PULocationID", lambda col: col),
+}
+
+KEY_COL = "__sample_key"
+ROW_COL = "__sample_row"
+
+def _stratum_frame(table, stratify_by):
+    """Small pandas frame of (stratum columns, key, row) used to pick per-stratum rows."""
+    frame = pd.DataFrame({
+        name: STRATA[name][1](table.column(STRATA[name][0])).to_pandas()
+        for name in stratify_by
+    })
+    frame[KEY_COL] = table.column(KEY_COL).to_numpy()
+    return frame
+
+def _smallest_keys(table, n):
+    """Rows of `table` holding the n smallest sample keys."""
+    if table.num_rows <= n:
+        return table
+    keys = table.column(KEY_COL).to_numpy()
+    return table.take(np.argpartition(keys, n - 1)[:n])
+
+def _stratum_floor(table, stratify_by, per_stratum):
+    """Rows of `table` holding the per_stratum smallest keys of every stratum."""
+    frame = _stratum_frame(table, stratify_by)
+    keep = frame.sort_values(KEY_COL, kind="stable").groupby(stratify_by, dropna=False).head(per_stratum)
+    return table.take(keep.index.to_numpy())
+
+def iter_parquet_batches(path, columns=None, batch_rows=BATCH_ROWS):
+    """Stream record batches of a parquet file, decoding only the projected columns."""
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    yield from parquet_file.iter_batches(batch_size=batch_rows, columns=columns)
+
+def sample_batches(batches, rows=None, fraction=None, columns=None, stratify_by=None,
+                   min_per_stratum=1, seed=42):
+    """
+    Sample a stream of Arrow record batches in one pass.
+
+    Every row gets a uniform random key from a seeded generator. With `rows`, the rows with the
+    `rows` smallest keys are kept (reservoir sampling via priorities); with `fraction`, rows whose
+    key is below `fraction` are kept (Bernoulli). With `stratify_by`, the `min_per_stratum` rows with
+    the smallest keys in every stratum are always kept as well, so small zones and quiet days
+    survive; in `rows` mode they count towards the total.
+
+    Memory is bounded by the sample plus one batch. The result is deterministic for a given seed
+    and batch order, and keeps the input row order.
+    """
+    if (rows is None) == (fraction is None):
+        raise ValueError("Pass exactly one of rows or fraction")
+    stratify_by = list(stratify_by or [])
+    unknown = [s for s in stratify_by if s not in STRATA]
+    if unknown:
+        raise ValueError(f"Unknown strata {unknown}; choose from {list(STRATA)}")
+
+    rng = np.random.default_rng(seed)
+    picked = None  # rows kept by the global reservoir / Bernoulli draw
+    floor = None   # per-stratum minimum rows
+    offset = 0
+
+    for batch in batches:
+        n = batch.num_rows
+        if n == 0:
+            continue
+        table = pa.Table.from_batches([batch])
+        keys = rng.random(n)
+        table = table.append_column(KEY_COL, pa.array(keys)).append_column(
+            ROW_COL, pa.array(np.arange(offset, offset + n, dtype=np.int64)))
+        offset += n
+
+        if rows is not None:
+            merged = table if picked is None else pa.concat_tables([picked, table])
+            picked = _smallest_keys(merged, rows)
+        else:
+            chosen = table.filter(pa.array(keys < fraction))
+            picked = chosen if picked is None else pa.concat_tables([picked, chosen])
+
+        if stratify_by:
+            merged = table if floor is None else pa.concat_tables([floor, table])
+            floor = _stratum_floor(merged, stratify_by, min_per_stratum)
+
+    if picked is None:
+        return None
+
+    if floor is not None:
+        floor_rows = set(floor.column(ROW_COL).to_pylist())
+        rest = picked.filter(pc.invert(pc.is_in(picked.column(ROW_COL), pa.array(sorted(floor_rows), type=pa.int64()))))
+        if rows is not None:
+            rest = _smallest_keys(rest, max(rows - floor.num_rows, 0))
+        picked = pa.concat_tables([floor, rest])
+
+    picked = picked.take(pc.sort_indices(picked, sort_keys=[(ROW_COL, "ascending")]))
+    picked = picked.drop_columns([KEY_COL, ROW_COL])
+    return picked.select(columns) if columns else picked
+
+def sample_parquet(path, rows=None, fraction=None, columns=None, stratify_by=None,
+                   min_per_stratum=1, seed=42, batch_rows=BATCH_ROWS):
+    """Stream-sample a parquet file (see sample_batches). Only projected and stratum columns are read."""
+    read_columns = None
+    if columns:
+        read_columns = list(columns) + [STRATA[s][0] for s in stratify_by or [] if STRATA[s][0] not in columns]
+    batches = iter_parquet_batches(path, columns=read_columns, batch_rows=batch_rows)
+    return sample_batches(batches, rows=rows, fraction=fraction, columns=columns,
+                          stratify_by=stratify_by, min_per_stratum=min_per_stratum, seed=seed)
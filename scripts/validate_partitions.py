@@ -0,0 +1,305 @@
+"""
+Partition-scoped data quality validation.
+
+Each suite in validation_suites.yml compiles into ONE aggregate query on its table: every check
+becomes a count(*) FILTER (...) column, the rows are grouped by partition, and the WHERE clause
+only touches the partitions in scope (so Postgres prunes the others). Results are written to
+quality.validation_results, one row per run, suite, partition and check.
+
+By default the scope is what was loaded since a suite last validated it: raw files whose
+raw.ingest_manifest entry is newer than their last validation, and the months of those files
+for date-partitioned tables.
+
+Usage:
+  python scripts/validate_partitions.py                      # partitions loaded since the last validation
+  python scripts/validate_partitions.py --months 2024-01     # months (and their raw files)
+  python scripts/validate_partitions.py --dates 2024-01-05   # single days of the date-partitioned tables
+  python scripts/validate_partitions.py --all --suite fact_trips
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+import pandas as pd
+import yaml
+from psycopg2.extras import execute_values
+from sqlalchemy import create_engine
+
+DB_USER = os.getenv("POSTGRES_USER", "admin")
+DB_PASS = os.getenv("POSTGRES_PASSWORD", "adminparams")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+DB_NAME = os.getenv("POSTGRES_DB", "analytics")
+DB_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+SUITES_PATH = Path(__file__).parent / "validation_suites.yml"
+RESULTS_TABLE = "quality.validation_results"
+LOADED_TABLE = "yellow_trips"  # raw.ingest_manifest.table_name of the trip loads
+LOADED_FILE = "yellow_tripdata_{month}.parquet"
+ALL = "all"
+
+INIT_SQL = f"""
+CREATE SCHEMA IF NOT EXISTS quality;
+CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+    run_id UUID NOT NULL,
+    validated_at TIMESTAMP NOT NULL,
+    suite_name VARCHAR(100) NOT NULL,
+    table_name VARCHAR(200) NOT NULL,
+    partition_value VARCHAR(200) NOT NULL, -- file name, YYYY-MM, YYYY-MM-DD or 'all'
+    check_name VARCHAR(200) NOT NULL, -- e.g. between(fare_amount)
+    success BOOLEAN NOT NULL,
+    observed_value DOUBLE PRECISION, -- row count, or share of unexpected values
+    element_count BIGINT,
+    unexpected_count BIGINT,
+    details_json JSONB,
+    PRIMARY KEY (run_id, suite_name, partition_value, check_name)
+);
+CREATE INDEX IF NOT EXISTS idx_validation_results_partition
+    ON {RESULTS_TABLE} (suite_name, partition_value, validated_at);
+"""
+RESULT_COLUMNS = ["run_id", "validated_at", "suite_name", "table_name", "partition_value", "check_name",
+                  "success", "observed_value", "element_count", "unexpected_count", "details_json"]
+
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*(\.[a-z_][a-z0-9_]*)?")
+
+def load_suites(path=SUITES_PATH):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)["suites"]
+
+def _identifier(name):
+    if not IDENTIFIER.fullmatch(name):
+        raise ValueError(f"Invalid table or column name: {name!r}")
+    return name
+
+def check_name(check):
+    return check["check"] if check["check"] == "row_count" else f"{check['check']}({check['column']})"
+
+def month_range(month):
+    """(label, start, end) of a YYYY-MM month."""
+    start = pd.Timestamp(f"{month}-01")
+    return month, start.date(), (start + pd.offsets.MonthBegin(1)).date()
+
+def day_range(day):
+    day = pd.Timestamp(day)
+    return day.date().isoformat(), day.date(), (day + pd.Timedelta(days=1)).date()
+
+def check_disjoint(scope):
+    """Raise ValueError if (label, start, end) date ranges overlap: a row can only count towards one partition."""
+    ranges = sorted(scope, key=lambda r: (r[1], r[2]))
+    for (name, _, end), (next_name, next_start, _) in zip(ranges, ranges[1:]):
+        if next_start < end:
+            raise ValueError(f"Partitions {name} and {next_name} overlap; validate them in separate runs")
+
+def compile_suite(suite, scope=None):
+    """
+    (SQL, params) of the single aggregate query evaluating every check of a suite, one row per
+    partition. scope: None for the whole table; file names for 'file' partitions; (label, start,
+    end) date ranges for 'date' partitions.
+    """
+    table = _identifier(suite["table"])
+    params = {}
+    aggregates = ["count(*) AS element_count"]
+    for i, check in enumerate(suite["checks"]):
+        if check["check"] == "row_count":
+            continue
+        column = _identifier(check["column"])
+        if check["check"] == "not_null":
+            aggregates.append(f"count(*) FILTER (WHERE {column} IS NULL) AS c{i}_unexpected")
+        elif check["check"] == "between":
+            outside = []
+            if check.get("min") is not None:
+                params[f"c{i}_min"] = check["min"]
+                outside.append(f"{column} < %(c{i}_min)s")
+            if check.get("max") is not None:
+                params[f"c{i}_max"] = check["max"]
+                outside.append(f"{column} > %(c{i}_max)s")
+            if not outside:
+                raise ValueError(f"{suite['name']}: between({column}) needs min and/or max")
+            aggregates.append(f"count({column}) AS c{i}_nonnull")
+            aggregates.append(f"count(*) FILTER (WHERE {' OR '.join(outside)}) AS c{i}_unexpected")
+        else:
+            raise ValueError(f"{suite['name']}: unknown check {check['check']!r}")
+
+    if scope is None:
+        label, where = f"'{ALL}'", ""
+    else:
+        column = _identifier(suite["partition"]["column"])
+        if suite["partition"]["kind"] == "file":
+            for j, filename in enumerate(scope):
+                params[f"p{j}"] = filename
+            label = column
+            where = f"WHERE {column} IN ({', '.join(f'%(p{j})s' for j in range(len(scope)))})"
+        else:
+            check_disjoint(scope)
+            cases, ranges = [], []
+            for j, (name, start, end) in enumerate(scope):
+                params.update({f"p{j}_label": name, f"p{j}_start": start, f"p{j}_end": end})
+                in_range = f"{column} >= %(p{j}_start)s AND {column} < %(p{j}_end)s"
+                cases.append(f"WHEN {in_range} THEN %(p{j}_label)s")
+                ranges.append(f"({in_range})")
+            label = f"CASE {' '.join(cases)} END"
+            where = f"WHERE {' OR '.join(ranges)}"
+    query = f"SELECT {label} AS partition_value, {', '.join(aggregates)} FROM {table} {where} GROUP BY 1"
+    return query, params
+
+def partition_labels(suite, scope):
+    if scope is None:
+        return [ALL]
+    return list(scope) if suite["partition"]["kind"] == "file" else [name for name, _, _ in scope]
+
+def evaluate(suite, labels, rows):
+    """
+    Check results for every partition in `labels` from the query rows (dicts keyed by column);
+    a partition without rows has 0 elements.
+    """
+    by_partition = {row["partition_value"]: row for row in rows}
+    results = []
+    for label in labels:
+        row = by_partition.get(label, {})
+        n = row.get("element_count", 0)
+        for i, check in enumerate(suite["checks"]):
+            result = {"partition_value": label, "check_name": check_name(check), "element_count": n}
+            if check["check"] == "row_count":
+                low, high = check.get("min"), check.get("max")
+                success = (low is None or n >= low) and (high is None or n <= high)
+                result.update(success=success, observed_value=float(n), unexpected_count=None,
+                              details={"min": low, "max": high})
+            else:
+                unexpected = row.get(f"c{i}_unexpected", 0)
+                # not_null counts every row, between only the non-null ones
+                total = n if check["check"] == "not_null" else row.get(f"c{i}_nonnull", 0)
+                share = unexpected / total if total else 0.0
+                mostly = check.get("mostly", 1.0)
+                details = {"mostly": mostly}
+                if check["check"] == "between":
+                    details.update(min=check.get("min"), max=check.get("max"))
+                result.update(success=share <= 1 - mostly + 1e-12, observed_value=share,
+                              unexpected_count=unexpected, details=details)
+            results.append(result)
+    return results
+
+def ensure_tables(cursor):
+    cursor.execute(INIT_SQL)
+
+def pending_scopes(cursor, suites):
+    """Per suite, the partitions loaded since that suite last validated them (empty scope: nothing to do)."""
+    cursor.execute("SELECT to_regclass('raw.ingest_manifest')")
+    if cursor.fetchone()[0] is None:
+        return {suite["name"]: [] for suite in suites}
+    cursor.execute(
+        "SELECT filename, updated_at FROM raw.ingest_manifest WHERE table_name = %s AND status = 'loaded'",
+        (LOADED_TABLE,),
+    )
+    loaded = dict(cursor.fetchall())
+    cursor.execute(f"SELECT suite_name, partition_value, max(validated_at) FROM {RESULTS_TABLE} GROUP BY 1, 2")
+    validated = {(suite, partition): at for suite, partition, at in cursor.fetchall()}
+
+    months = {}
+    for filename, loaded_at in loaded.items():
+        match = re.search(r"(\d{4}-\d{2})", filename)
+        if match:
+            months[match.group(1)] = max(loaded_at, months.get(match.group(1), loaded_at))
+    scopes = {}
+    for suite in suites:
+        name = suite["name"]
+        if suite["partition"]["kind"] == "file":
+            scopes[name] = sorted(f for f, at in loaded.items() if (name, f) not in validated or validated[(name, f)] < at)
+        else:
+            scopes[name] = [month_range(m) for m, at in sorted(months.items())
+                            if (name, m) not in validated or validated[(name, m)] < at]
+    return scopes
+
+def requested_scopes(suites, months=None, dates=None, validate_all=False):
+    """
+    Scopes from --all / --months / --dates; file suites get the raw files of the months.
+    Raises ValueError when a day falls inside one of the months (or is given twice).
+    """
+    scopes = {}
+    for suite in suites:
+        if validate_all:
+            scopes[suite["name"]] = None
+        elif suite["partition"]["kind"] == "file":
+            scopes[suite["name"]] = [LOADED_FILE.format(month=m) for m in months or []]
+        else:
+            scopes[suite["name"]] = [month_range(m) for m in months or []] + [day_range(d) for d in dates or []]
+            check_disjoint(scopes[suite["name"]])
+    return scopes
+
+def run_suite(cursor, suite, scope):
+    query, params = compile_suite(suite, scope)
+    started = time.perf_counter()
+    cursor.execute(query, params)
+    columns = [c[0] for c in cursor.description]
+    rows = [dict(zip(columns, values)) for values in cursor.fetchall()]
+    return evaluate(suite, partition_labels(suite, scope), rows), time.perf_counter() - started
+
+def write_results(cursor, run_id, validated_at, suite, results):
+    execute_values(
+        cursor,
+        f"INSERT INTO {RESULTS_TABLE} ({', '.join(RESULT_COLUMNS)}) VALUES %s",
+        [(run_id, validated_at, suite["name"], suite["table"], r["partition_value"], r["check_name"],
+          bool(r["success"]), r["observed_value"], r["element_count"], r["unexpected_count"],
+          json.dumps(r["details"])) for r in results],
+    )
+
+def validate(engine, suites, scopes=None):
+    """Run the suites over their scopes (default: pending partitions) in one transaction; returns all results."""
+    run_id, validated_at = str(uuid.uuid4()), pd.Timestamp.now().to_pydatetime()
+    conn = engine.raw_connection()
+    all_results = []
+    try:
+        with conn.cursor() as cursor:
+            ensure_tables(cursor)
+            scopes = scopes if scopes is not None else pending_scopes(cursor, suites)
+            for suite in suites:
+                scope = scopes.get(suite["name"])
+                if scope is not None and len(scope) == 0:
+                    print(f"⏭️  {suite['name']}: nothing new to validate")
+                    continue
+                results, seconds = run_suite(cursor, suite, scope)
+                write_results(cursor, run_id, validated_at, suite, results)
+                failed = [r for r in results if not r["success"]]
+                partitions = partition_labels(suite, scope)
+                status = "✅" if not failed else "❌"
+                print(f"{status} {suite['name']}: {len(results) - len(failed)}/{len(results)} checks passed "
+                      f"over {len(partitions)} partition(s) {', '.join(partitions)} in {seconds:.2f}s (1 query)")
+                for r in failed:
+                    print(f"   - {r['partition_value']} {r['check_name']}: observed {r['observed_value']:.4g} {r['details']}")
+                all_results.extend({**r, "suite_name": suite["name"]} for r in results)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return all_results
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate newly loaded partitions with one aggregate query per table")
+    parser.add_argument("--suite", type=str, nargs="+", help="Only these suites")
+    parser.add_argument("--months", type=str, nargs="+", help="Months YYYY-MM (date suites) and their raw files")
+    parser.add_argument("--dates", type=str, nargs="+", help="Days YYYY-MM-DD of the date-partitioned tables")
+    parser.add_argument("--all", action="store_true", help="Validate whole tables")
+    args = parser.parse_args()
+
+    suites = [s for s in load_suites() if not args.suite or s["name"] in args.suite]
+    scopes = None
+    if args.all or args.months or args.dates:
+        try:
+            scopes = requested_scopes(suites, args.months, args.dates, args.all)
+        except ValueError as e:
+            parser.error(str(e))
+
+    print(f"🔎 Validating {len(suites)} suite(s)...")
+    results = validate(create_engine(DB_URL), suites, scopes)
+    if any(not r["success"] for r in results):
+        print("❌ Validation Failed!")
+        sys.exit(1)
+    print(f"✅ Validation Success! Results in {RESULTS_TABLE}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import unittest
+import pandas as pd
+import numpy as np
+from alerts.alert_runner import detect_latest
+from alerts.anomaly_detection import AnomalyDetector
+
+class TestDetectLatest(unittest.TestCase):
+    def test_one_query_frame_matches_per_rule_checks(self):
+        rng = np.random.default_rng(3)
+        dates = pd.date_range(start='2024-01-01', periods=60)
+        history = pd.DataFrame({'ds': dates,
+                                'total_trips': 1000 + rng.normal(0, 20, 60),
+                                'total_revenue': 20000 + rng.normal(0, 300, 60)})
+        history.loc[59, 'total_trips'] = 1500  # latest day spikes
+        history.loc[30, 'total_revenue'] = 90000  # old spike, not the latest day
+        rules = [{'metric': 'total_trips', 'grain': 'daily',
+                  'methods': [{'name': 'z_score', 'threshold': 3.0}, {'name': 'dow_baseline', 'threshold_pct': 0.2}]},
+                 {'metric': 'total_revenue', 'grain': 'daily', 'methods': [{'name': 'z_score', 'threshold': 3.0}]}]
+
+        alerts = detect_latest(history, rules)
+
+        self.assertEqual([(a['metric_name'], a['method']) for a in alerts],
+                         [('total_trips', 'dow_baseline'), ('total_trips', 'z_score')])
+        self.assertEqual(len({a['alert_id'] for a in alerts}), 2)
+        detector = AnomalyDetector(history.rename(columns={'total_trips': 'y'})[['ds', 'y']])
+        for alert, result in zip(alerts, [detector.check_dow_baseline(), detector.check_zscore()]):
+            self.assertEqual(alert['alert_date'], result['date'])
+            self.assertAlmostEqual(alert['expected_value'], result['expected'])
+            self.assertEqual(alert['severity'], result['severity'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 import pandas as pd
 import numpy as np
-from alerts.anomaly_detection import AnomalyDetector
+from alerts.anomaly_detection import AnomalyDetector, flag_anomalies, score_history
 
 class TestAnomalyDetector(unittest.TestCase):
     def setUp(self):
@@ -67,5 +67,60 @@ class TestAnomalyDetector(unittest.TestCase):
         self.assertAlmostEqual(result['deviation_pct'], -0.5)
         print("✅ DoW Baseline Test Passed")
 
+class TestBatchScoring(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        dates = pd.date_range(start='2024-01-01', periods=90)
+        trips = 1000 + 200 * (dates.dayofweek >= 5) + rng.normal(0, 30, len(dates))
+        trips[[40, 75]] = [2000, 300]  # spike and drop
+        self.df = pd.DataFrame({'ds': dates, 'total_trips': trips,
+                                'avg_fare': 20 + rng.normal(0, 1, len(dates))})
+        self.rules = [{'metric': 'total_trips', 'grain': 'daily',
+                       'methods': [{'name': 'z_score', 'threshold': 3.0},
+                                   {'name': 'dow_baseline', 'threshold_pct': 0.2}]},
+                      {'metric': 'avg_fare', 'grain': 'daily',
+                       'methods': [{'name': 'z_score', 'threshold': 4.0}]}]
+
+    def test_matches_latest_day_checks(self):
+        """Every batch alert equals what the per-day checks report on the trailing window."""
+        window = 60
+        alerts = flag_anomalies(score_history(self.df, ['total_trips', 'avg_fare'], window=window), self.rules)
+        self.assertFalse(alerts.empty)
+
+        expected = []
+        for rule in self.rules:
+            for end in range(len(self.df)):
+                history = self.df.iloc[max(0, end - window + 1):end + 1]
+                detector = AnomalyDetector(history.rename(columns={rule['metric']: 'y'})[['ds', 'y']])
+                for method in rule['methods']:
+                    if method['name'] == 'z_score':
+                        result = detector.check_zscore(threshold=method['threshold'])
+                    else:
+                        # check_dow_baseline only needs the same-weekday rows, not the window
+                        detector = AnomalyDetector(self.df.iloc[:end + 1].rename(columns={rule['metric']: 'y'})[['ds', 'y']])
+                        result = detector.check_dow_baseline(4, method['threshold_pct'])
+                    if result:
+                        expected.append({**result, 'metric_name': rule['metric']})
+
+        expected = pd.DataFrame(expected).sort_values(['date', 'metric_name', 'method'], ignore_index=True)
+        self.assertEqual(len(alerts), len(expected))
+        for col in ['method', 'severity', 'explanation']:
+            self.assertEqual(list(alerts[col]), list(expected[col]))
+        for col in ['actual', 'expected', 'deviation_pct', 'score']:
+            np.testing.assert_allclose(alerts[col].astype(float), expected[col].astype(float))
+
+    def test_explanation_quotes_scored_lookback(self):
+        scored = score_history(self.df, ['total_trips'], window=60, lookback_weeks=2)
+        alerts = flag_anomalies(scored, self.rules)
+        dow = alerts[alerts['method'] == 'dow_baseline']
+        self.assertFalse(dow.empty)
+        self.assertTrue(dow['explanation'].str.contains('from 2-week avg').all())
+
+    def test_spike_and_drop_flagged(self):
+        scored = AnomalyDetector(self.df.rename(columns={'total_trips': 'y'})[['ds', 'y']]).score_history(window=60)
+        flagged = scored.loc[np.abs(scored['z_score']) > 3, 'ds']
+        self.assertIn(pd.Timestamp('2024-02-10'), set(flagged))
+        self.assertIn(pd.Timestamp('2024-03-16'), set(flagged))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.backtest import (FoldCache, backtest, config_label, leaderboard, load_best_config,
+                              rolling_origin_folds, save_best_config)
+
+def weekday_mean(config, train, future_ds):
+    """Same-weekday mean of the last `weeks` weeks."""
+    recent = train.tail(7 * config["weeks"])
+    by_dow = recent.groupby(recent['ds'].dt.dayofweek)['y'].mean()
+    return np.array([by_dow[pd.Timestamp(d).dayofweek] for d in future_ds])
+
+def history(days=63):
+    ds = pd.date_range("2024-01-01", periods=days, freq="D")
+    y = 100 + 50 * (ds.dayofweek >= 5) + np.arange(days)
+    return pd.DataFrame({"ds": ds, "y": y.astype(float)})
+
+class TestBacktest(unittest.TestCase):
+    def test_folds_are_on_the_calendar_grid(self):
+        ds = pd.date_range("2024-01-01", "2024-03-02")
+        cutoffs = rolling_origin_folds(ds, horizon=7, period=7, min_train=21)
+        self.assertTrue(all(c.dayofweek == 6 for c in cutoffs))
+        self.assertEqual(cutoffs[-1], pd.Timestamp("2024-02-18"))
+        self.assertEqual(cutoffs[0], pd.Timestamp("2024-01-21"))
+        # Appending days keeps the earlier cutoffs
+        later = rolling_origin_folds(pd.date_range("2024-01-01", "2024-03-09"), horizon=7, period=7, min_train=21)
+        self.assertEqual(later[:-1], cutoffs)
+
+    def test_short_history_has_no_folds(self):
+        self.assertEqual(rolling_origin_folds(pd.date_range("2024-01-01", periods=20)), [])
+        results = backtest(history(20), [{"weeks": 1}], weekday_mean, workers=1)
+        self.assertTrue(results.empty)
+
+    def test_backtest_leaderboard_and_cache(self):
+        candidates = [{"weeks": 1}, {"weeks": 3}]
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FoldCache(tmp)
+            first = backtest(history(), candidates, weekday_mean, workers=1, cache=cache)
+            self.assertFalse(first['cached'].any())
+            second = backtest(history(70), candidates, weekday_mean, workers=1, cache=cache)
+            folds = second.drop_duplicates(['config', 'cutoff'])
+            self.assertEqual(int((~folds['cached']).sum()), len(candidates))  # only the new fold
+
+            pd.testing.assert_series_equal(
+                first['yhat'], second[second['cutoff'].isin(first['cutoff'])]['yhat'].reset_index(drop=True))
+            board = leaderboard(second)
+            # The trend makes the most recent week the better baseline
+            self.assertEqual(board['config'].iloc[0], config_label({"weeks": 1}))
+            self.assertLess(board['rmse'].iloc[0], board['rmse'].iloc[1])
+
+            path = f"{tmp}/best.json"
+            save_best_config(path, {"weeks": 1}, board)
+            self.assertEqual(load_best_config(path), {"weeks": 1})
+            self.assertIsNone(load_best_config(f"{tmp}/missing.json"))
+
+    def test_backfilled_test_day_refits_the_fold(self):
+        full = history()
+        gap = full[full['ds'] != pd.Timestamp("2024-02-28")]
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FoldCache(tmp)
+            first = backtest(gap, [{"weeks": 1}], weekday_mean, workers=1, cache=cache)
+            second = backtest(full, [{"weeks": 1}], weekday_mean, workers=1, cache=cache)
+        refit = second.drop_duplicates('cutoff').set_index('cutoff')['cached']
+        self.assertFalse(refit[pd.Timestamp("2024-02-25")])
+        self.assertTrue(refit.drop(pd.Timestamp("2024-02-25")).all())
+        self.assertEqual(len(second), len(first) + 1)
+
+    def test_parallel_matches_serial(self):
+        candidates = [{"weeks": 1}, {"weeks": 2}]
+        serial = backtest(history(), candidates, weekday_mean, workers=1)
+        parallel = backtest(history(), candidates, weekday_mean, workers=2)
+        pd.testing.assert_frame_equal(serial.drop(columns='fit_seconds'), parallel.drop(columns='fit_seconds'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.batch_forecaster import BatchSeasonalForecaster
+
+def seasonal_series(ds, n_series, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    days = (ds - ds[0]) / pd.Timedelta(days=1)
+    level = rng.uniform(50, 150, n_series)
+    weekly = 20 * np.sin(2 * np.pi * np.asarray(days) / 7)
+    Y = level[None, :] + 0.5 * np.asarray(days)[:, None] + weekly[:, None]
+    return Y + rng.normal(0, noise, Y.shape)
+
+class TestBatchSeasonalForecaster(unittest.TestCase):
+    def setUp(self):
+        self.ds = pd.date_range("2024-01-01", periods=56, freq="D")
+        self.future = pd.date_range("2024-02-26", periods=7, freq="D")
+
+    def test_recovers_trend_and_weekly_seasonality(self):
+        Y = seasonal_series(self.ds.append(self.future), 5)
+        model = BatchSeasonalForecaster(weekly_order=1, holidays=False).fit(self.ds, Y[:56])
+        pred = model.predict(self.future)
+        np.testing.assert_allclose(pred["yhat"], Y[56:], atol=1e-6)
+
+    def test_batch_equals_one_series_at_a_time(self):
+        Y = seasonal_series(self.ds, 4, noise=5.0)
+        batch = BatchSeasonalForecaster().fit(self.ds, Y).predict(self.future)
+        for i in range(Y.shape[1]):
+            single = BatchSeasonalForecaster().fit(self.ds, Y[:, i]).predict(self.future)
+            for col in ("yhat", "yhat_lower", "yhat_upper"):
+                np.testing.assert_allclose(batch[col][:, i], single[col][:, 0])
+
+    def test_interval_coverage(self):
+        ds = self.ds.append(self.future)
+        Y = seasonal_series(ds, 2000, noise=10.0, seed=1)
+        pred = BatchSeasonalForecaster(weekly_order=2, holidays=False, interval_width=0.8).fit(
+            self.ds, Y[:56]).predict(self.future)
+        covered = (Y[56:] >= pred["yhat_lower"]) & (Y[56:] <= pred["yhat_upper"])
+        self.assertAlmostEqual(covered.mean(), 0.8, delta=0.03)
+
+    def test_hourly_and_holidays(self):
+        hours = pd.date_range("2024-01-01", periods=21 * 24, freq="h")
+        model = BatchSeasonalForecaster(weekly_order=2, daily_order=3, holidays=True)
+        model.start, model.end = hours.min(), hours.max()
+        X = model.design(hours)
+        self.assertEqual(X.shape, (len(hours), 2 + 4 + 6 + 1))
+        # 2024-01-01 and 2024-01-15 are federal holidays
+        self.assertEqual(X[:, -1].sum(), 48)
+
+        Y = np.abs(seasonal_series(hours, 3)) + 5 * np.sin(2 * np.pi * hours.hour.to_numpy() / 24)[:, None]
+        pred = BatchSeasonalForecaster(daily_order=3, log=True).fit(hours, Y).predict(
+            pd.date_range(hours[-1] + pd.Timedelta(hours=1), periods=24, freq="h"))
+        self.assertEqual(pred["yhat"].shape, (24, 3))
+        self.assertTrue((pred["yhat_lower"] <= pred["yhat"]).all() and (pred["yhat"] <= pred["yhat_upper"]).all())
+
+    def test_missing_values_raise(self):
+        Y = seasonal_series(self.ds, 2)
+        Y[3, 1] = np.nan
+        with self.assertRaises(ValueError):
+            BatchSeasonalForecaster().fit(self.ds, Y)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from datetime import date
+from orchestration.change_detection import node_fingerprints, plan_build, window_months
+
+def make_manifest(stg_sql="select 1", kpi_sql="select 2"):
+    def node(name, fqn, sql, macros=()):
+        return {
+            "name": name, "fqn": ["analytics", *fqn], "checksum": {"checksum": sql},
+            "config": {"materialized": "table"}, "columns": {}, "depends_on": {"macros": list(macros)},
+        }
+    return {
+        "nodes": {
+            "model.analytics.stg_yellow_trips": node("stg_yellow_trips", ["staging", "stg_yellow_trips"], stg_sql),
+            "model.analytics.stg_taxi_zones": node("stg_taxi_zones", ["staging", "stg_taxi_zones"], "z"),
+            "model.analytics.mart_kpis_daily": node("mart_kpis_daily", ["marts", "kpis", "mart_kpis_daily"], kpi_sql,
+                                                    ["macro.analytics.incremental_pickup_dates"]),
+            "test.analytics.unique_mart_kpis_daily_pickup_date": node("unique_mart", ["unique_mart"], "t"),
+        },
+        "sources": {
+            "source.analytics.raw.yellow_trips": {"fqn": ["analytics", "raw", "yellow_trips"], "config": {}},
+            "source.analytics.raw.taxi_zone_lookup": {"fqn": ["analytics", "raw", "taxi_zone_lookup"], "config": {}},
+        },
+        "macros": {
+            "macro.analytics.incremental_pickup_dates": {"macro_sql": "v1", "depends_on": {"macros": []}},
+        },
+        "child_map": {
+            "source.analytics.raw.yellow_trips": ["model.analytics.stg_yellow_trips"],
+            "source.analytics.raw.taxi_zone_lookup": ["model.analytics.stg_taxi_zones"],
+            "model.analytics.stg_yellow_trips": ["model.analytics.mart_kpis_daily"],
+            "model.analytics.stg_taxi_zones": [],
+            "model.analytics.mart_kpis_daily": ["test.analytics.unique_mart_kpis_daily_pickup_date"],
+        },
+    }
+
+def make_raw(files=None, zones_hash="a"):
+    files = files or {"yellow_tripdata_2024-01.parquet": {"version": "h1", "rows": 100}}
+    return {
+        "yellow_trips": {"files": files, "partitions": ["raw.yellow_trips_2024_01"],
+                         "rows": sum(f["rows"] for f in files.values())},
+        "taxi_zone_lookup": {"rows": 265, "hash": zones_hash},
+    }
+
+def state_from(plan):
+    return {"fingerprints": plan["fingerprints"], "raw": plan["raw"]}
+
+class TestChangeDetection(unittest.TestCase):
+    def setUp(self):
+        self.state = state_from(plan_build(make_manifest(), make_raw(), None))
+
+    def test_first_run_builds_everything_but_tests(self):
+        plan = plan_build(make_manifest(), make_raw(), None)
+        self.assertEqual(plan["select"], "mart_kpis_daily stg_taxi_zones stg_yellow_trips")
+
+    def test_no_changes_is_noop(self):
+        plan = plan_build(make_manifest(), make_raw(), self.state)
+        self.assertIsNone(plan["select"])
+        self.assertEqual(plan["reasons"], ["nothing changed"])
+
+    def test_model_change_selects_descendants(self):
+        plan = plan_build(make_manifest(stg_sql="select 1 -- edited"), make_raw(), self.state)
+        self.assertEqual(plan["select"], "mart_kpis_daily stg_yellow_trips")
+        self.assertEqual(plan["exclude"], "stg_taxi_zones")
+
+    def test_macro_change_marks_users_modified(self):
+        manifest = make_manifest()
+        manifest["macros"]["macro.analytics.incremental_pickup_dates"]["macro_sql"] = "v2"
+        self.assertNotEqual(node_fingerprints(manifest)["model.analytics.mart_kpis_daily"],
+                            self.state["fingerprints"]["model.analytics.mart_kpis_daily"])
+        self.assertEqual(plan_build(manifest, make_raw(), self.state)["select"], "mart_kpis_daily")
+
+    def test_zone_lookup_change(self):
+        plan = plan_build(make_manifest(), make_raw(zones_hash="b"), self.state)
+        self.assertEqual(plan["select"], "stg_taxi_zones")
+
+    def test_new_file_scoped_by_month_and_selection(self):
+        files = {"yellow_tripdata_2024-01.parquet": {"version": "h1", "rows": 100},
+                 "yellow_tripdata_2024-02.parquet": {"version": "h2", "rows": 50}}
+        plan = plan_build(make_manifest(), make_raw(files), self.state)
+        self.assertEqual(plan["select"], "mart_kpis_daily stg_yellow_trips")
+        self.assertIn("rows +50", plan["reasons"][0])
+        # Restricted to the kpi models and a month the new file does not cover
+        self.assertEqual(plan_build(make_manifest(), make_raw(files), self.state, select="marts.kpis")["select"],
+                         "mart_kpis_daily")
+        self.assertIsNone(plan_build(make_manifest(), make_raw(files), self.state, months={"2024-01"})["select"])
+
+    def test_window_months_include_neighbours(self):
+        self.assertEqual(window_months(date(2024, 1, 15), date(2024, 1, 16)), {"2023-12", "2024-01", "2024-02"})
+        self.assertEqual(window_months(date(2024, 2, 29), date(2024, 3, 2)),
+                         {"2024-01", "2024-02", "2024-03", "2024-04"})
+        # A February file's stray trips on 2024-01-31 can change January's last day
+        files = {"yellow_tripdata_2024-01.parquet": {"version": "h1", "rows": 100},
+                 "yellow_tripdata_2024-02.parquet": {"version": "h2", "rows": 50}}
+        months = window_months(date(2024, 1, 31), date(2024, 2, 1))
+        self.assertIsNotNone(plan_build(make_manifest(), make_raw(files), self.state, months=months)["select"])
+
+if __name__ == "__main__":
+    unittest.main()
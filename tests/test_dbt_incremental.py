@@ -0,0 +1,153 @@
+"""
+Incremental builds of fact_trips and its marts against a scratch Postgres database.
+
+Runs dbt on the repo's project with POSTGRES_DB pointing at a throwaway database. Opt-in with
+DBT_INTEGRATION_TESTS=1; also skipped when dbt (DBT_BIN or `dbt` on PATH), its packages
+(`dbt deps`) or Postgres are not available.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+import psycopg2
+
+DBT_DIR = Path(__file__).resolve().parent.parent / "dbt"
+DBT_BIN = os.getenv("DBT_BIN") or shutil.which("dbt")
+TEST_DB = "analytics_dbt_test"
+SELECT = "stg_yellow_trips dim_date fact_trips fact_trips_cube mart_kpis_daily"
+MARTS = "dbt_dev_marts"
+
+RAW_DDL = """
+CREATE SCHEMA raw;
+CREATE TABLE raw.yellow_trips (
+    vendorid BIGINT, tpep_pickup_datetime TIMESTAMP, tpep_dropoff_datetime TIMESTAMP,
+    passenger_count DOUBLE PRECISION, trip_distance DOUBLE PRECISION, ratecodeid DOUBLE PRECISION,
+    store_and_fwd_flag TEXT, pulocationid BIGINT, dolocationid BIGINT, payment_type BIGINT,
+    fare_amount DOUBLE PRECISION, extra DOUBLE PRECISION, mta_tax DOUBLE PRECISION,
+    tip_amount DOUBLE PRECISION, tolls_amount DOUBLE PRECISION, improvement_surcharge DOUBLE PRECISION,
+    total_amount DOUBLE PRECISION, congestion_surcharge DOUBLE PRECISION, airport_fee DOUBLE PRECISION,
+    filename TEXT, load_timestamp TIMESTAMP
+);
+"""
+
+def admin_connection(dbname):
+    conn = psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "localhost"), port=os.getenv("POSTGRES_PORT", "5432"),
+        user=os.getenv("POSTGRES_USER", "admin"), password=os.getenv("POSTGRES_PASSWORD", "adminparams"),
+        dbname=dbname, connect_timeout=3,
+    )
+    conn.autocommit = True
+    return conn
+
+def recreate_database(create=True):
+    conn = admin_connection(os.getenv("POSTGRES_DB", "analytics"))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+            if create:
+                cursor.execute(f"CREATE DATABASE {TEST_DB}")
+    finally:
+        conn.close()
+
+def database_available():
+    try:
+        admin_connection(os.getenv("POSTGRES_DB", "analytics")).close()
+        return True
+    except psycopg2.OperationalError:
+        return False
+
+def integration_enabled():
+    return (os.getenv("DBT_INTEGRATION_TESTS") == "1" and DBT_BIN is not None
+            and (DBT_DIR / "dbt_packages").exists() and database_available())
+
+@unittest.skipUnless(integration_enabled(), "set DBT_INTEGRATION_TESTS=1 (needs dbt, dbt deps and Postgres)")
+class TestIncrementalMarts(unittest.TestCase):
+    def setUp(self):
+        recreate_database()
+        self.conn = admin_connection(TEST_DB)
+        self.query(RAW_DDL)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+        recreate_database(create=False)
+
+    def query(self, sql, params=None):
+        with self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def load_file(self, filename, pickups, load_timestamp):
+        """Replace a file's raw rows with one trip per pickup timestamp."""
+        self.query("DELETE FROM raw.yellow_trips WHERE filename = %s", (filename,))
+        for pickup in pickups:
+            self.query(
+                "INSERT INTO raw.yellow_trips (vendorid, tpep_pickup_datetime, tpep_dropoff_datetime, "
+                "passenger_count, trip_distance, pulocationid, dolocationid, payment_type, fare_amount, "
+                "total_amount, filename, load_timestamp) VALUES (1, %s, %s, 1, 2.0, 132, 236, 1, 10, 15, %s, %s)",
+                (pickup, pickup + timedelta(minutes=15), filename, load_timestamp),
+            )
+
+    def dbt_run(self):
+        env = {**os.environ, "POSTGRES_DB": TEST_DB}
+        proc = subprocess.run(
+            [DBT_BIN, "run", "--select", *SELECT.split(), "--vars", json.dumps({"incremental_lookback_days": 0}),
+             "--project-dir", str(DBT_DIR), "--profiles-dir", str(DBT_DIR),
+             "--target-path", f"{self.tmp.name}/target", "--log-path", f"{self.tmp.name}/logs"],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stdout[-4000:])
+
+    def daily_trips(self):
+        """{pickup_date: trips} according to fact_trips, the cube and mart_kpis_daily."""
+        return {
+            model: {d.isoformat(): int(n) for d, n in self.query(sql)}
+            for model, sql in {
+                "fact_trips": f"SELECT pickup_date, count(*) FROM {MARTS}.fact_trips GROUP BY 1",
+                "cube": f"SELECT pickup_date, sum(trip_count) FROM {MARTS}.fact_trips_cube GROUP BY 1",
+                "daily": f"SELECT pickup_date, total_trips FROM {MARTS}.mart_kpis_daily",
+            }.items()
+        }
+
+    def test_reloaded_file_that_lost_rows_on_a_shared_date(self):
+        january = [datetime(2024, 1, 30, 8), datetime(2024, 1, 31, 8), datetime(2024, 1, 31, 9),
+                   datetime(2024, 1, 31, 10)]
+        # February's file first carries stray trips on 2024-01-31 (shared with January) and 2024-01-20
+        february = [datetime(2024, 1, 20, 12), datetime(2024, 1, 31, 23), datetime(2024, 2, 1, 8),
+                    datetime(2024, 2, 2, 9)]
+        self.load_file("yellow_tripdata_2024-01.parquet", january, datetime(2024, 2, 1, 6))
+        self.load_file("yellow_tripdata_2024-02.parquet", february, datetime(2024, 3, 1, 6))
+        self.dbt_run()
+        self.dbt_run()  # incremental, nothing new
+        before = self.daily_trips()
+        self.assertEqual(before["daily"]["2024-01-31"], 4)
+
+        # Reload February without its January strays
+        self.load_file("yellow_tripdata_2024-02.parquet", february[2:], datetime(2024, 3, 2, 6))
+        self.dbt_run()
+        expected = {"2024-01-30": 1, "2024-01-31": 3, "2024-02-01": 1, "2024-02-02": 1}
+        for model, trips in self.daily_trips().items():
+            self.assertEqual(trips, expected, model)
+        # The selected models consumed their queued dates (the other KPI marts keep theirs)
+        consumed = self.query(f"SELECT count(*) FROM {MARTS}.rebuild_dates "
+                              "WHERE model_name IN ('fact_trips_cube', 'mart_kpis_daily')")
+        self.assertEqual(consumed[0][0], 0)
+
+    def test_file_committed_after_a_later_load_was_built(self):
+        # January's load started first (earlier load_timestamp) but commits after February was built
+        self.load_file("yellow_tripdata_2024-02.parquet", [datetime(2024, 2, 1, 8)], datetime(2024, 3, 1, 6))
+        self.dbt_run()
+        self.load_file("yellow_tripdata_2024-01.parquet", [datetime(2024, 1, 10, 8), datetime(2024, 1, 11, 8)],
+                       datetime(2024, 3, 1, 5))
+        self.dbt_run()
+        expected = {"2024-01-10": 1, "2024-01-11": 1, "2024-02-01": 1}
+        for model, trips in self.daily_trips().items():
+            self.assertEqual(trips, expected, model)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scripts.download_tlc_parquet import download_file, download_months
+
+def parquet_bytes(rows):
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(pd.DataFrame({"x": range(rows)})), buf)
+    return buf.getvalue()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves server.files with Range support; paths in server.drop_once are cut off mid-body once."""
+    def do_GET(self):
+        name = self.path.rsplit("/", 1)[-1]
+        body = self.server.files.get(name)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.server.requests.append((name, self.headers.get("Range")))
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"].split("=")[1].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if name in self.server.drop_once:
+            self.server.drop_once.discard(name)
+            self.wfile.write(body[start:start + len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+class TestDownloader(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.files = {
+            "yellow_tripdata_2024-01.parquet": parquet_bytes(5000),
+            "yellow_tripdata_2024-02.parquet": parquet_bytes(3000),
+            "yellow_tripdata_2024-03.parquet": b"not a parquet file",
+        }
+        self.server.drop_once = set()
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_concurrent_download(self):
+        ok = download_months(["2024-01", "2024-02"], output_dir=self.out, workers=2, base_url=self.base_url)
+        self.assertEqual(ok, 2)
+        self.assertEqual(pq.ParquetFile(self.out / "yellow_tripdata_2024-01.parquet").metadata.num_rows, 5000)
+        self.assertFalse(list(self.out.glob("*.part")))
+
+    def test_resume_after_interruption(self):
+        name = "yellow_tripdata_2024-01.parquet"
+        self.server.drop_once.add(name)
+        target = self.out / name
+        self.assertFalse(download_file(f"{self.base_url}/{name}", target))
+        self.assertFalse(target.exists())
+        self.assertTrue((self.out / (name + ".part")).exists())
+
+        self.assertTrue(download_file(f"{self.base_url}/{name}", target))
+        self.assertIsNotNone(self.server.requests[-1][1])  # second request used a Range header
+        self.assertEqual(target.read_bytes(), self.server.files[name])
+
+    def test_invalid_payload_is_not_renamed(self):
+        name = "yellow_tripdata_2024-03.parquet"
+        self.assertFalse(download_file(f"{self.base_url}/{name}", self.out / name))
+        self.assertFalse((self.out / name).exists())
+
+    def test_truncated_existing_file_is_replaced(self):
+        name = "yellow_tripdata_2024-02.parquet"
+        (self.out / name).write_bytes(self.server.files[name][:100])
+        self.assertEqual(download_months(["2024-02"], output_dir=self.out, base_url=self.base_url), 1)
+        self.assertEqual((self.out / name).read_bytes(), self.server.files[name])
+
+if __name__ == '__main__':
+    unittest.main()
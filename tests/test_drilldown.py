@@ -0,0 +1,63 @@
+import time
+import unittest
+import numpy as np
+import pandas as pd
+from alerts.drilldown import DrillDownCube, drilldown_drivers
+
+def synthetic_cube(seed=11):
+    """Alert day 2024-02-26 plus 4 prior Mondays over 265 zones x 6 payment types x 24 hours."""
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(['2024-01-29', '2024-02-05', '2024-02-12', '2024-02-19', '2024-02-26']).date
+    zones = [f"Zone {i}" for i in range(1, 266)]
+    zones[131] = "JFK Airport"
+    boroughs = ["Queens" if z == "JFK Airport" else ["Manhattan", "Brooklyn", "Bronx", "Queens"][i % 4]
+                for i, z in enumerate(zones)]
+    index = pd.MultiIndex.from_product([dates, range(len(zones)), range(1, 7), range(24)],
+                                       names=['pickup_date', 'zone_idx', 'payment_type', 'pickup_hour'])
+    frame = index.to_frame(index=False)
+    frame['zone'] = np.array(zones)[frame['zone_idx']]
+    frame['borough'] = np.array(boroughs)[frame['zone_idx']]
+    # The same daily pattern every Monday, busier at JFK
+    per_cell = rng.poisson(20, len(frame) // len(dates)).astype(float)
+    frame['trips'] = np.tile(per_cell, len(dates))
+    frame.loc[frame['zone'] == 'JFK Airport', 'trips'] *= 10
+    # JFK card trips collapse on the alert day
+    hit = (frame['pickup_date'] == dates[-1]) & (frame['zone'] == 'JFK Airport') & (frame['payment_type'] == 1)
+    frame.loc[hit, 'trips'] = 0
+    frame['revenue'] = frame['trips'] * 25
+    return frame.drop(columns='zone_idx')
+
+class TestDrillDown(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cube = DrillDownCube(synthetic_cube())
+
+    def test_finds_the_injected_segment(self):
+        segments = self.cube.explain('2024-02-26', 'total_trips', {'min_share': 0.2})
+        self.assertEqual(segments[0]['dims'], {'zone': 'JFK Airport', 'payment_type': 1})
+        self.assertEqual(segments[0]['rank'], 1)
+        self.assertLess(segments[0]['delta'], -400)
+        # Coarser segments are dropped because the JFK card segment explains them
+        dims = [s['dims'] for s in segments]
+        for coarser in ({'zone': 'JFK Airport'}, {'payment_type': 1}, {'borough': 'Queens'},
+                        {'borough': 'Queens', 'payment_type': 1}):
+            self.assertNotIn(coarser, dims)
+
+    def test_full_search_is_fast(self):
+        start = time.perf_counter()
+        segments = self.cube.explain('2024-02-26', 'total_revenue',
+                                     {'min_share': -np.inf, 'min_delta': 0, 'specificity': np.inf, 'top_n': 10 ** 6})
+        elapsed = time.perf_counter() - start
+        depth3 = [s for s in segments if len(s['dims']) == 3]
+        self.assertEqual(len(depth3), 265 * 6 * 24 + 4 * 6 * 24)  # zone and borough x payment x hour
+        self.assertLess(elapsed, 10)
+
+    def test_driver_records(self):
+        alerts = [{'alert_id': 'a1', 'alert_date': '2024-02-26', 'metric_name': 'total_trips', 'grain': 'daily'}]
+        drivers = drilldown_drivers(self.cube, alerts, {'min_share': 0.2})
+        self.assertEqual(drivers[0]['dimension'], 'zone x payment_type')
+        self.assertEqual(drivers[0]['segment_value'], 'JFK Airport / 1')
+        self.assertEqual([d['rank'] for d in drivers], list(range(1, len(drivers) + 1)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+import pandas as pd
+from scripts.model_store import ModelStore, config_key, plan_fit, series_fingerprint
+
+def series(start, days, offset=0.0):
+    ds = pd.date_range(start, periods=days, freq="D")
+    return pd.DataFrame({"ds": ds, "y": [100.0 + i + offset for i in range(days)]})
+
+class TestModelStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ModelStore(self.tmp.name)
+        self.df = series("2024-01-01", 30)
+        forecast = pd.DataFrame({"ds": pd.date_range("2024-01-31", periods=2), "yhat": [1.0, 2.0]})
+        self.entry = self.store.save("key", self.df, {"k": 0.1, "delta": [0.0, 0.1]}, forecast)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        entry = self.store.load("key")
+        self.assertEqual(entry["params"], {"k": 0.1, "delta": [0.0, 0.1]})
+        self.assertEqual(entry["data_fingerprint"], series_fingerprint(self.df))
+        self.assertEqual([r["yhat"] for r in entry["forecast"]], [1.0, 2.0])
+        self.assertIsNone(self.store.load("missing"))
+
+    def test_config_key(self):
+        self.assertEqual(config_key({"a": 1, "b": 2}), config_key({"b": 2, "a": 1}))
+        self.assertNotEqual(config_key({"a": 1}), config_key({"a": 2}))
+
+    def test_plan_fit(self):
+        entry = self.store.load("key")
+        self.assertEqual(plan_fit(None, self.df), "cold")
+        self.assertEqual(plan_fit(entry, self.df), "cached")
+        # New days appended, with or without the window sliding forward
+        self.assertEqual(plan_fit(entry, series("2024-01-01", 33)), "warm")
+        self.assertEqual(plan_fit(entry, series("2024-01-01", 33).iloc[3:]), "warm")
+        # Revised history, a window starting earlier, or a truncated series
+        revised = series("2024-01-01", 33)
+        revised.loc[5, "y"] += 1
+        self.assertEqual(plan_fit(entry, revised), "cold")
+        self.assertEqual(plan_fit(entry, series("2023-12-31", 34, offset=-1.0)), "cold")
+        self.assertEqual(plan_fit(entry, self.df.iloc[:-1]), "cold")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import stats
+from alerts.online_detector import OnlineDetector, RollingMedianMAD, consistency_check
+
+class TestRollingMedianMAD(unittest.TestCase):
+    def test_matches_numpy_with_ties_and_gaps(self):
+        rng = np.random.default_rng(5)
+        values = rng.integers(0, 6, 300).astype(float)
+        values[rng.choice(300, 15, replace=False)] = np.nan
+        rolling = RollingMedianMAD(window=25)
+        for i, value in enumerate(values):
+            rolling.push(value)
+            window = values[max(0, i - 24):i + 1]
+            window = window[~np.isnan(window)]
+            if len(window) == 0:
+                continue
+            self.assertEqual(rolling.median(), np.median(window))
+            self.assertAlmostEqual(rolling.mad(), stats.median_abs_deviation(window, scale='normal'))
+
+class TestOnlineDetector(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        self.history = pd.DataFrame({'ds': pd.date_range('2023-06-01', periods=200),
+                                     'total_trips': rng.normal(5000, 300, 200).round(),
+                                     'avg_fare': rng.normal(18, 1, 200)})
+        self.history.loc[[50, 120], 'total_trips'] = [9000, np.nan]
+
+    def test_consistent_with_batch_scores(self):
+        diffs = consistency_check(self.history, ['total_trips', 'avg_fare'], window=60)
+        self.assertEqual(max(diffs.values()), 0.0)
+
+    def test_resumes_from_saved_state(self):
+        straight = OnlineDetector(window=60).advance(self.history, column='total_trips')
+
+        first = OnlineDetector(window=60)
+        first.advance(self.history.iloc[:130], column='total_trips')
+        resumed = OnlineDetector.from_dict(json.loads(json.dumps(first.to_dict())))
+        # Rows up to the watermark are skipped
+        rest = resumed.advance(self.history, column='total_trips')
+
+        self.assertEqual(len(rest), 70)
+        pd.testing.assert_frame_equal(pd.DataFrame(rest), pd.DataFrame(straight[130:]))
+        with self.assertRaises(ValueError):
+            resumed.update(self.history['ds'].iloc[-1], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scripts.parquet_lake import (LakeMonth, build_month, iter_month_batches, month_fingerprint,
+                                  month_fragments, month_stats)
+
+def write_month(path, pickups, vendors):
+    pickups = pd.to_datetime(pickups)
+    table = pa.table({
+        "VendorID": pa.array(vendors, type=pa.int64()),
+        "tpep_pickup_datetime": pa.array(pickups, type=pa.timestamp("us")),
+        "tpep_dropoff_datetime": pa.array(pickups + pd.Timedelta(minutes=10), type=pa.timestamp("us")),
+        "total_amount": pa.array([10.0 + i for i in range(len(pickups))]),
+    })
+    pq.write_table(table, path)
+
+class TestParquetLake(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.lake_dir = os.path.join(self.tmp.name, "lake")
+        self.file_path = os.path.join(self.tmp.name, "yellow_tripdata_2024-01.parquet")
+        # Two stray trips outside January: one in December 2023, one in February
+        write_month(self.file_path,
+                    ["2024-01-02 08:00", "2024-01-01 09:30", "2024-01-02 07:15", "2023-12-31 23:50",
+                     "2024-01-31 23:59", "2024-02-01 00:05"],
+                    [2, 1, 1, 2, 2, 1])
+        self.month = LakeMonth(self.lake_dir, "2024-01", "yellow")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_partition_layout(self):
+        build_month(self.file_path, self.lake_dir)
+        relative = [os.path.relpath(p, self.lake_dir) for p in month_fragments(self.month)]
+        self.assertEqual(relative, [
+            os.path.join("pickup_date=2024-01-01", "vendor_id=1", "2024-01-0.parquet"),
+            os.path.join("pickup_date=2024-01-02", "vendor_id=1", "2024-01-0.parquet"),
+            os.path.join("pickup_date=2024-01-02", "vendor_id=2", "2024-01-0.parquet"),
+            os.path.join("pickup_date=2024-01-31", "vendor_id=2", "2024-01-0.parquet"),
+        ])
+
+    def test_out_of_month_rows_dropped(self):
+        rows, dropped = build_month(self.file_path, self.lake_dir)
+        self.assertEqual((rows, dropped), (4, 2))
+        self.assertFalse(os.path.exists(os.path.join(self.lake_dir, "pickup_date=2023-12-31")))
+        self.assertFalse(os.path.exists(os.path.join(self.lake_dir, "pickup_date=2024-02-01")))
+
+        table = pa.Table.from_batches(list(iter_month_batches(self.month)))
+        pickups = pd.Series(table.column("tpep_pickup_datetime").to_pandas())
+        self.assertEqual(len(pickups), 4)
+        self.assertTrue(((pickups >= "2024-01-01") & (pickups < "2024-02-01")).all())
+        self.assertNotIn("pickup_date", table.column_names)
+
+    def test_rebuild_is_idempotent(self):
+        build_month(self.file_path, self.lake_dir)
+        files, fingerprint = month_fragments(self.month), month_fingerprint(self.month)
+        self.assertEqual(build_month(self.file_path, self.lake_dir), (4, 2))
+        self.assertEqual(month_fragments(self.month), files)
+        self.assertEqual(month_fingerprint(self.month), fingerprint)
+        self.assertEqual(month_stats(self.month), (4, len(files)))
+
+    def test_rebuild_drops_vanished_dates_and_vendors(self):
+        build_month(self.file_path, self.lake_dir)
+        # The corrected file no longer has 2024-01-31 nor vendor 2 on 2024-01-02
+        write_month(self.file_path, ["2024-01-02 08:00", "2024-01-01 09:30"], [1, 1])
+        self.assertEqual(build_month(self.file_path, self.lake_dir), (2, 0))
+        relative = [os.path.relpath(p, self.lake_dir) for p in month_fragments(self.month)]
+        self.assertEqual(relative, [
+            os.path.join("pickup_date=2024-01-01", "vendor_id=1", "2024-01-0.parquet"),
+            os.path.join("pickup_date=2024-01-02", "vendor_id=1", "2024-01-0.parquet"),
+        ])
+        self.assertFalse(os.path.exists(os.path.join(self.lake_dir, "pickup_date=2024-01-31")))
+        self.assertEqual(month_stats(self.month), (2, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scripts.reconciliation import hierarchy, hierarchy_series, is_coherent, reconcile_ols
+
+class TestReconciliation(unittest.TestCase):
+    def setUp(self):
+        self.zone_boroughs = {1: "EWR", 4: "Manhattan", 12: "Manhattan", 7: "Queens"}
+        self.nodes, self.S = hierarchy(self.zone_boroughs)
+
+    def test_hierarchy(self):
+        self.assertEqual(self.nodes[0], ("city", "all"))
+        self.assertEqual(self.nodes[1:4], [("borough", "EWR"), ("borough", "Manhattan"), ("borough", "Queens")])
+        self.assertEqual(self.nodes[4:], [("zone", 1), ("zone", 4), ("zone", 7), ("zone", 12)])
+        # Manhattan = zones 4 + 12
+        np.testing.assert_array_equal(self.S[2], [0, 1, 0, 1])
+        np.testing.assert_array_equal(self.S[0], [1, 1, 1, 1])
+
+    def test_reconcile_ols_is_coherent(self):
+        rng = np.random.default_rng(0)
+        base = rng.uniform(10, 100, size=(len(self.nodes), 7))
+        self.assertFalse(is_coherent(self.S, base))
+        reconciled = reconcile_ols(self.S, base)
+        self.assertTrue(is_coherent(self.S, reconciled))
+
+    def test_reconcile_ols_keeps_coherent_forecasts(self):
+        bottom = np.array([[10.0, 11.0], [20.0, 22.0], [5.0, 4.0], [7.0, 9.0]])
+        coherent = self.S @ bottom
+        np.testing.assert_allclose(reconcile_ols(self.S, coherent), coherent)
+
+    def test_hierarchy_series_fills_missing_days(self):
+        zone_df = pd.DataFrame({
+            "ds": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-01-03"]),
+            "zone": [4, 12, 12],
+            "borough": ["Manhattan", "Manhattan", "Manhattan"],
+            "y": [3, 5, 2],
+        })
+        nodes, S, dates, values = hierarchy_series(zone_df, "2024-01-01", "2024-01-03")
+        self.assertEqual(len(dates), 3)
+        self.assertEqual(nodes, [("city", "all"), ("borough", "Manhattan"), ("zone", 4), ("zone", 12)])
+        np.testing.assert_array_equal(values[0], [8, 0, 2])
+        np.testing.assert_array_equal(values[2], [3, 0, 0])
+        # The window starting before the data does not add leading zero days
+        _, _, dates, values = hierarchy_series(zone_df, "2023-12-01", "2024-01-03")
+        self.assertEqual(dates[0], pd.Timestamp("2024-01-01"))
+        np.testing.assert_array_equal(values[0], [8, 0, 2])
+
+if __name__ == '__main__':
+    unittest.main()
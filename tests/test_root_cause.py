@@ -0,0 +1,62 @@
+import unittest
+from datetime import date
+from unittest import mock
+import pandas as pd
+from alerts.root_cause import RootCauseAnalyzer, rank_drivers
+
+SEGMENTS = pd.DataFrame({
+    'alert_date': [date(2024, 2, 5)] * 2,
+    'segment_id': [1, 2],
+    'segment_name': ['JFK', 'Midtown'],
+    'baseline_total_trips': [100, 50],
+    'current_total_trips': [40, 45],
+    'baseline_total_revenue': [5000, 1000],
+    'current_total_revenue': [1000, 995],
+})
+
+class TestRankDrivers(unittest.TestCase):
+    def test_top_segments_per_alert(self):
+        alerts = pd.DataFrame({
+            'alert_id': ['a1', 'a2', 'a3'],
+            'alert_date': [date(2024, 2, 5), date(2024, 2, 5), date(2024, 2, 6)],
+            'metric_name': ['total_trips', 'total_revenue', 'total_trips'],
+            'metric_value': [900, 15000, 1000],
+            'expected_value': [1000, 20000, 1000],
+        })
+        segments = pd.DataFrame({
+            'alert_date': [date(2024, 2, 5)] * 4 + [date(2024, 2, 6)],
+            'segment_id': [1, 2, 3, 4, 1],
+            'segment_name': ['JFK', 'Midtown', 'SoHo', 'Harlem', 'JFK'],
+            'baseline_total_trips': [100, 50, 30, 12, 10],
+            'current_total_trips': [40, 45, 60, 0, 50],
+            'baseline_total_revenue': [5000, 1000, 500, 200, 100],
+            'current_total_revenue': [1000, 995, 400, 200, 100],
+        })
+
+        drivers = rank_drivers(alerts, segments, 'zone')
+
+        trips = [d for d in drivers if d['alert_id'] == 'a1']
+        # Top 3 by |delta|: JFK -60, SoHo +30, Harlem -12; Midtown (-5) is not in the top 3
+        self.assertEqual([(d['segment_value'], d['rank']) for d in trips], [('JFK', 1), ('SoHo', 2), ('Harlem', 3)])
+        self.assertAlmostEqual(trips[0]['contribution_pct'], 0.6)
+
+        revenue = [d for d in drivers if d['alert_id'] == 'a2']
+        # SoHo (-100) ranks 2nd; Midtown (-5) ranks 3rd but is dropped as noise
+        self.assertEqual([(d['segment_value'], d['rank']) for d in revenue], [('JFK', 1), ('SoHo', 2)])
+        self.assertAlmostEqual(revenue[0]['delta'], -4000.0)
+
+        # No gap between actual and expected: contribution is 0
+        flat = [d for d in drivers if d['alert_id'] == 'a3']
+        self.assertEqual(len(flat), 1)
+        self.assertEqual(flat[0]['contribution_pct'], 0.0)
+
+    def test_alert_without_id(self):
+        alert = {'metric_name': 'total_trips', 'alert_date': '2024-02-05', 'grain': 'daily',
+                 'metric_value': 900, 'expected_value': 1000}
+        with mock.patch.object(RootCauseAnalyzer, '_segment_baselines', return_value=SEGMENTS):
+            drivers = RootCauseAnalyzer(engine=None).analyze(alert)
+        # Once per dimension: JFK (-60) ranked, Midtown (-5) dropped as noise
+        self.assertEqual([(d['alert_id'], d['segment_value'], d['rank']) for d in drivers], [(None, 'JFK', 1)] * 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scripts.sampling import sample_parquet
+
+class TestStreamingSampler(unittest.TestCase):
+    def setUp(self):
+        # 20k trips over 10 days; zone 999 only has 3 trips, all on one quiet day
+        rng = np.random.default_rng(0)
+        n = 20000
+        df = pd.DataFrame({
+            "tpep_pickup_datetime": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10 * 86400, n), unit="s"),
+            "PULocationID": rng.integers(1, 50, n).astype("int32"),
+            "total_amount": rng.uniform(5, 50, n),
+        })
+        df.loc[:2, "PULocationID"] = 999
+        df.loc[:2, "tpep_pickup_datetime"] = pd.Timestamp("2024-01-11 03:00")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "trips.parquet")
+        # Small row groups so the sampler has to stream many batches
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), self.path, row_group_size=1500)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reservoir_size_and_determinism(self):
+        a = sample_parquet(self.path, rows=500, seed=7, batch_rows=1000)
+        b = sample_parquet(self.path, rows=500, seed=7, batch_rows=1000)
+        c = sample_parquet(self.path, rows=500, seed=8, batch_rows=1000)
+        self.assertEqual(a.num_rows, 500)
+        self.assertTrue(a.equals(b))
+        self.assertFalse(a.equals(c))
+
+    def test_bernoulli_fraction(self):
+        sample = sample_parquet(self.path, fraction=0.1, seed=1, batch_rows=1000)
+        self.assertAlmostEqual(sample.num_rows / 20000, 0.1, delta=0.01)
+
+    def test_stratified_keeps_small_zone(self):
+        sample = sample_parquet(self.path, rows=200, stratify_by=["pickup_date", "pickup_zone"],
+                                min_per_stratum=1, seed=3, batch_rows=1000)
+        zones = set(sample.column("PULocationID").to_pylist())
+        self.assertIn(999, zones)
+        self.assertEqual(len(zones), 50)
+
+    def test_projection(self):
+        sample = sample_parquet(self.path, rows=100, columns=["total_amount"], stratify_by=["pickup_zone"])
+        self.assertEqual(sample.column_names, ["total_amount"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from alerts.series_detection import detect_series, grain_query, series_matrix
+
+def zone_hourly_frame(days=60, zones=265, seed=4):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=days).date, range(1, zones + 1), range(24)],
+                                       names=['ds', 'pickup_location_id', 'pickup_hour'])
+    frame = index.to_frame(index=False)
+    frame['total_trips'] = rng.poisson(30, len(frame)).astype(float)
+    last = frame['ds'] == frame['ds'].max()
+    frame.loc[last & (frame['pickup_location_id'] == 132) & (frame['pickup_hour'] == 17), 'total_trips'] = 300
+    # Zone 7 is busy at 3am but has no trips at all on the last day: the row is missing
+    frame.loc[(frame['pickup_location_id'] == 7) & (frame['pickup_hour'] == 3), 'total_trips'] += 100
+    return frame[~(last & (frame['pickup_location_id'] == 7) & (frame['pickup_hour'] == 3))]
+
+RULES = [{'metric': 'total_trips', 'grain': 'zone_hourly',
+          'methods': [{'name': 'z_score', 'threshold': 6.0, 'min_expected': 10}]}]
+
+class TestSeriesDetection(unittest.TestCase):
+    def test_missing_rows_are_zero_trips(self):
+        frame = zone_hourly_frame(days=10, zones=8)
+        days, keys, values = series_matrix(frame, 'zone_hourly', 'total_trips')
+        self.assertEqual(values.shape, (10, 8 * 24))
+        self.assertEqual(values[-1, keys.index('zone=7|hour=3')], 0.0)
+
+    def test_flags_spike_and_dropout_across_workers(self):
+        frame = zone_hourly_frame()
+        with mock.patch('alerts.series_detection.fetch_grain', return_value=frame):
+            inline, timings = detect_series(None, 'zone_hourly', RULES, workers=1)
+            pooled, _ = detect_series(None, 'zone_hourly', RULES, workers=2)
+
+        self.assertEqual(timings['series'], 265 * 24)
+        self.assertLess(timings['score_s'], 60)
+        self.assertEqual(sorted(inline['series_key']), ['zone=132|hour=17', 'zone=7|hour=3'])
+        pd.testing.assert_frame_equal(inline.sort_values('series_key', ignore_index=True),
+                                      pooled.sort_values('series_key', ignore_index=True))
+
+    def test_cube_grain_query_aggregates(self):
+        query = grain_query('zone_hourly', ['total_trips'])
+        self.assertIn('sum(trip_count) AS total_trips', query)
+        self.assertIn('GROUP BY 1, 2, 3', query)
+        self.assertNotIn('GROUP BY', grain_query('zone_daily', ['total_trips']))
+
+if __name__ == '__main__':
+    unittest.main()
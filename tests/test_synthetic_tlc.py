@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import pyarrow.parquet as pq
+from benchmarks.synthetic_tlc import TLC_YELLOW_SCHEMA, generate_month
+
+class TestSyntheticTLC(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def generate(self, name, **kwargs):
+        path = os.path.join(self.tmpdir.name, name)
+        generate_month(path, 25_000, "2024-02", chunk_rows=10_000, **kwargs)
+        return pq.read_table(path)
+
+    def test_deterministic_per_seed(self):
+        a = self.generate("a.parquet", seed=7)
+        b = self.generate("b.parquet", seed=7)
+        c = self.generate("c.parquet", seed=8)
+        self.assertTrue(a.equals(b))
+        self.assertFalse(a.equals(c))
+
+    def test_tlc_shape(self):
+        table = self.generate("t.parquet")
+        self.assertEqual(table.schema, TLC_YELLOW_SCHEMA)
+        self.assertEqual(table.num_rows, 25_000)
+        self.assertEqual(pq.ParquetFile(os.path.join(self.tmpdir.name, "t.parquet")).num_row_groups, 3)
+
+        df = table.to_pandas()
+        in_month = df["tpep_pickup_datetime"].dt.strftime("%Y-%m") == "2024-02"
+        self.assertGreater(in_month.mean(), 0.999)
+        self.assertTrue((df["tpep_dropoff_datetime"] > df["tpep_pickup_datetime"]).all())
+        self.assertTrue(df["PULocationID"].between(1, 265).all())
+        # Card dominates, flex-fare rows carry the TLC nulls, JFK is the busiest pickup zone
+        self.assertAlmostEqual((df["payment_type"] == 1).mean(), 0.76, delta=0.02)
+        flex = df["payment_type"] == 0
+        self.assertTrue(df.loc[flex, "passenger_count"].isna().all())
+        self.assertFalse(df.loc[~flex, "passenger_count"].isna().any())
+        self.assertEqual(df["PULocationID"].value_counts().idxmax(), 132)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import datetime
+import unittest
+from scripts.validate_partitions import (compile_suite, day_range, evaluate, load_suites, month_range,
+                                         partition_labels, requested_scopes)
+
+SUITE = {
+    "name": "trips",
+    "table": "dbt_dev_marts.fact_trips",
+    "partition": {"kind": "date", "column": "pickup_date"},
+    "checks": [
+        {"check": "row_count", "min": 1},
+        {"check": "not_null", "column": "pickup_datetime"},
+        {"check": "between", "column": "fare_amount", "min": 0, "max": 1000, "mostly": 0.99},
+        {"check": "between", "column": "pickup_hour", "max": 23},
+    ],
+}
+
+class TestCompileSuite(unittest.TestCase):
+    def test_one_aggregate_query_for_all_checks(self):
+        query, params = compile_suite(SUITE, [month_range("2024-01"), month_range("2024-02")])
+        self.assertEqual(query.count("SELECT"), 1)
+        self.assertIn("FROM dbt_dev_marts.fact_trips WHERE", query)
+        self.assertIn("count(*) AS element_count", query)
+        self.assertIn("count(*) FILTER (WHERE pickup_datetime IS NULL) AS c1_unexpected", query)
+        self.assertIn("count(fare_amount) AS c2_nonnull", query)
+        self.assertIn("count(*) FILTER (WHERE fare_amount < %(c2_min)s OR fare_amount > %(c2_max)s) AS c2_unexpected", query)
+        self.assertIn("count(*) FILTER (WHERE pickup_hour > %(c3_max)s) AS c3_unexpected", query)
+        self.assertTrue(query.endswith("GROUP BY 1"))
+        # Partition bounds are plain predicates on the partition column (so Postgres can prune)
+        self.assertIn("(pickup_date >= %(p0_start)s AND pickup_date < %(p0_end)s) OR "
+                      "(pickup_date >= %(p1_start)s AND pickup_date < %(p1_end)s)", query)
+        self.assertIn("CASE WHEN pickup_date >= %(p0_start)s AND pickup_date < %(p0_end)s THEN %(p0_label)s", query)
+        self.assertEqual(params["p1_start"], datetime.date(2024, 2, 1))
+        self.assertEqual(params["p1_end"], datetime.date(2024, 3, 1))
+        self.assertEqual(params["p1_label"], "2024-02")
+        self.assertEqual((params["c2_min"], params["c2_max"], params["c3_max"]), (0, 1000, 23))
+        self.assertNotIn("c3_min", params)
+
+    def test_file_partitions_and_whole_table(self):
+        suite = {**SUITE, "table": "raw.yellow_trips", "partition": {"kind": "file", "column": "filename"}}
+        query, params = compile_suite(suite, ["a.parquet", "b.parquet"])
+        self.assertIn("SELECT filename AS partition_value", query)
+        self.assertIn("WHERE filename IN (%(p0)s, %(p1)s)", query)
+        self.assertEqual((params["p0"], params["p1"]), ("a.parquet", "b.parquet"))
+
+        query, params = compile_suite(suite)
+        self.assertIn("SELECT 'all' AS partition_value", query)
+        self.assertNotIn("WHERE filename", query)
+        self.assertEqual(partition_labels(suite, None), ["all"])
+
+    def test_rejects_bad_suites(self):
+        with self.assertRaises(ValueError):
+            compile_suite({**SUITE, "table": "fact_trips; drop table x"})
+        with self.assertRaises(ValueError):
+            compile_suite({**SUITE, "checks": [{"check": "unique", "column": "vendor_id"}]})
+        with self.assertRaises(ValueError):
+            compile_suite({**SUITE, "checks": [{"check": "between", "column": "fare_amount"}]})
+
+    def test_repo_suites_compile(self):
+        for suite in load_suites():
+            scopes = requested_scopes([suite], months=["2024-01"])
+            query, _ = compile_suite(suite, scopes[suite["name"]])
+            self.assertEqual(query.count("SELECT"), 1)
+        scopes = requested_scopes(load_suites(), months=["2024-01"], dates=["2024-02-05"])
+        self.assertEqual(scopes["raw_yellow_trips"], ["yellow_tripdata_2024-01.parquet"])
+        self.assertEqual([s[0] for s in scopes["fact_trips"]], ["2024-01", "2024-02-05"])
+
+    def test_rejects_overlapping_date_partitions(self):
+        with self.assertRaises(ValueError):
+            compile_suite(SUITE, [month_range("2024-01"), day_range("2024-01-05")])
+        with self.assertRaises(ValueError):
+            requested_scopes([SUITE], months=["2024-01"], dates=["2024-01-05"])
+        with self.assertRaises(ValueError):
+            requested_scopes([SUITE], dates=["2024-01-05", "2024-01-05"])
+        # Adjacent ranges are fine
+        compile_suite(SUITE, [month_range("2024-01"), day_range("2024-02-01"), month_range("2023-12")])
+
+class TestEvaluate(unittest.TestCase):
+    def test_results_per_partition_and_check(self):
+        rows = [{"partition_value": "2024-01", "element_count": 1000, "c1_unexpected": 0,
+                 "c2_nonnull": 900, "c2_unexpected": 9, "c3_nonnull": 1000, "c3_unexpected": 1}]
+        results = evaluate(SUITE, ["2024-01", "2024-02"], rows)
+        by_key = {(r["partition_value"], r["check_name"]): r for r in results}
+        self.assertEqual(len(results), 8)
+        self.assertTrue(by_key[("2024-01", "row_count")]["success"])
+        self.assertTrue(by_key[("2024-01", "not_null(pickup_datetime)")]["success"])
+        # 9 of 900 non-null fares outside the range = 1%, allowed by mostly 0.99
+        fare = by_key[("2024-01", "between(fare_amount)")]
+        self.assertTrue(fare["success"])
+        self.assertAlmostEqual(fare["observed_value"], 0.01)
+        self.assertFalse(by_key[("2024-01", "between(pickup_hour)")]["success"])
+        # A partition in scope without rows fails its row count only
+        self.assertFalse(by_key[("2024-02", "row_count")]["success"])
+        self.assertTrue(by_key[("2024-02", "not_null(pickup_datetime)")]["success"])
+
+if __name__ == '__main__':
+    unittest.main()